@@ -9,16 +9,44 @@ SRC = os.path.join(ROOT, 'src')
 if SRC not in sys.path:
     sys.path.insert(0, SRC)
 
-from utils.csv_loader import load_csv_data, load_simple_csv
-from data.analyzer import (
-    calculate_asset_values,
-    calculate_category_distribution,
-    calculate_from_values,
-    get_current_price,
-)
+from data.analyzer import get_current_price, missing_fx_message
+from data.market_calendar import FreshnessPolicy
+from data.pipeline import cached_pipeline, distribution_table
+from data.price_cache import PriceCache
+from data.price_replay import SourceTimer
+from data.risk import PriceHistory, calculate_risk
+from utils.memory_cache import MemoryCache, content_hash
+from utils.profiling import Profiler
+from visualization.plotly_pies import DEFAULT_MAX_SLICES, pie_slices
+from visualization.tables import show_table, table_html
 
 st.set_page_config(page_title='BetBoard', layout='wide')
 
+
+@st.cache_resource
+def get_price_cache():
+    # One warm cache per server process, shared by all sessions. Closed-session prices
+    # are reused until the market reopens instead of being refetched on every rerun.
+    return PriceCache(get_current_price, policy=FreshnessPolicy())
+
+
+@st.cache_resource
+def get_price_history():
+    # Daily closes for the risk section, shared by all sessions and kept on disk like the CLI's
+    return PriceHistory(os.path.join('cache', 'price_history.npz'))
+
+
+@st.cache_resource
+def get_memory_cache():
+    # Parsed uploads, valuations and pie figures keyed by content hash, shared by all
+    # sessions. LRU-evicted past the byte budget so popular inputs stay hot without
+    # the server's memory growing with every distinct upload.
+    return MemoryCache()
+
+
+price_fetcher = get_price_cache()
+memory_cache = get_memory_cache()
+
 st.title('BetBoard')
 
 st.sidebar.header('Input')
@@ -46,129 +74,206 @@ detailed = st.sidebar.checkbox('Detailed Asset Chart', value=False)
 # Show integer percent steps from 0..20 (whole numbers only). Convert to fraction for internal use.
 combine_pct = st.sidebar.slider('Combine threshold (%)', 0, 20, 2, step=1)
 combine_threshold = float(combine_pct) / 100.0
+# Live prices are converted into this currency (quote currencies are detected per ticker)
+base_currency = st.sidebar.selectbox('Base currency', ['USD', 'EUR', 'GBP', 'INR', 'JPY', 'CAD', 'AUD', 'CHF'])
+# Compact rendering keeps the page payload bounded for very large portfolios: pies send at
+# most `max_slices` slices as binary arrays and tables become paginated data grids.
+compact = st.sidebar.checkbox('Compact rendering (large portfolios)', value=True)
+max_slices = st.sidebar.number_input('Max pie slices', min_value=5, max_value=500, value=DEFAULT_MAX_SLICES, step=5, disabled=not compact)
+show_risk = st.sidebar.checkbox('Risk metrics', value=False)
+show_whatif = st.sidebar.checkbox('Rebalance / what-if', value=False)
+
+
+def build_pies(asset_values, category_distribution):
+    """
+    Asset and category pies side by side, following the sidebar's detail, combine and
+    compact settings. Drawn for the portfolio and for its what-if state.
+    """
+    import plotly.graph_objects as go
+    from plotly.subplots import make_subplots
+
+    # apply combine threshold to assets unless detailed view is requested
+    asset_threshold = 0 if detailed else combine_threshold
+    slice_cap = int(max_slices) if compact else 0
+    a_labels, a_values = pie_slices(asset_values, asset_threshold, slice_cap)
+    c_labels, c_values = pie_slices(category_distribution, combine_threshold, slice_cap)
+
+    fig = make_subplots(rows=1, cols=2, specs=[[{'type': 'domain'}, {'type': 'domain'}]],
+                        subplot_titles=['Assets', 'Categories'])
+    fig.add_trace(go.Pie(labels=a_labels, values=a_values, name='Assets'), 1, 1)
+    fig.add_trace(go.Pie(labels=c_labels, values=c_values, name='Categories'), 1, 2)
+
+    # show label + percent with one decimal, and hover shows value with one decimal
+    fig.update_traces(textinfo='none',
+                      texttemplate='%{label}<br>%{percent:.1%}',
+                      hovertemplate='%{label}<br>%{value:,.1f} (%{percent:.1%})')
+    fig.update_layout(margin=dict(t=50, b=0, l=0, r=0))
+    return fig
+
+
+@st.fragment
+def whatif_section(store, position_values):
+    """
+    Rebalance targets and hypothetical trades. Runs as a fragment, so edits rerun only this
+    section: the portfolio is not reloaded or revalued, and trades update a WhatIf
+    state incrementally.
+    """
+    import time
+    from data.rebalance import WhatIf
+
+    start = time.perf_counter()
+    state = st.session_state.get('whatif')
+    if state is None or state[0] is not position_values:
+        # One WhatIf per valuation: another base currency or refreshed prices give a new
+        # values array. The state holds the array, so the identity check stays sound.
+        # Fragment reruns reuse it.
+        state = (position_values, WhatIf(store, position_values))
+        st.session_state['whatif'] = state
+    whatif = state[1]
+
+    dimension = st.selectbox('Rebalance by', ['bucket', 'category', 'account'], format_func=str.title)
+    whatif.dimension = dimension
+    base = whatif.baseline(dimension)
+    base_total = sum(base.values()) or 1.0
+    col1, col2 = st.columns(2)
+    with col1:
+        st.caption('Targets (%)')
+        # Seeded with the exact current weights (shown to one decimal) so they add up to 100
+        targets_df = pd.DataFrame({'Label': list(base), 'Target %': [v / base_total * 100.0 for v in base.values()]})
+        targets_df = st.data_editor(targets_df, num_rows='dynamic', hide_index=True, key=f'targets_{dimension}',
+                                    column_config={'Target %': st.column_config.NumberColumn(format='%.1f')})
+    with col2:
+        st.caption('Hypothetical trades (value; + buy, - sell)')
+        trades_df = pd.DataFrame({'Asset': pd.Series(dtype=str), 'Amount': pd.Series(dtype=float),
+                                  'Category': pd.Series(dtype=str), 'Bucket': pd.Series(dtype=str)})
+        trades_df = st.data_editor(trades_df, num_rows='dynamic', hide_index=True, key='whatif_trades')
+    cash_flow = st.number_input('New cash to deploy', value=0.0, step=1000.0)
+
+    def text(v):
+        return v.strip() if isinstance(v, str) and v.strip() else None
+
+    whatif.reset()
+    try:
+        for row in trades_df.itertuples(index=False):
+            if text(row.Asset) and row.Amount == row.Amount:
+                whatif.trade(text(row.Asset), row.Amount, category=text(row.Category), bucket=text(row.Bucket))
+    except ValueError as e:
+        st.warning(str(e))
+        return
+
+    whatif.targets = {str(k): float(v) for k, v in zip(targets_df['Label'], targets_df['Target %'])
+                      if isinstance(k, str) and k and v == v}
+    try:
+        trades = whatif.trades(cash_flow=cash_flow)
+    except ValueError as e:
+        # Bad targets only hide the rebalance table; the post-trade view below still shows
+        st.warning(str(e))
+    else:
+        result_df = pd.DataFrame([{dimension.title(): k, 'Value': r['value'], 'Current %': r['current_pct'],
+                                   'Target %': r['target_pct'], 'Trade': r['trade']} for k, r in trades.items()])
+        st.dataframe(result_df, hide_index=True, use_container_width=True,
+                     column_config={c: st.column_config.NumberColumn(format='%.1f') for c in ('Value', 'Current %', 'Target %', 'Trade')})
+
+    if whatif.applied:
+        # The portfolio after the hypothetical trades, as tables and pies like the ones above
+        after = whatif.distributions()
+        st.caption('After hypothetical trades')
+        col1, col2 = st.columns(2)
+        for col, key, label in ((col1, 'asset_values', 'Asset'), (col2, 'category_distribution', 'Category')):
+            with col:
+                table = distribution_table(after[key], label)
+                if compact:
+                    show_table(table, key=f'whatif_{label.lower()}_page')
+                else:
+                    st.markdown(table_html(table), unsafe_allow_html=True)
+        st.plotly_chart(build_pies(after['asset_values'], after['category_distribution']),
+                        use_container_width=True, key='whatif_pies')
+    st.caption(f'Updated in {(time.perf_counter() - start) * 1000:.1f} ms')
+
 
 if csv_path:
     # st.header('Portfolio')
+    # Per-rerun stage timings, shown in the 'Timings' expander at the bottom
+    profiler = Profiler()
     try:
-        if mode.startswith('Simple'):
-            rows = load_simple_csv(csv_path)
-            result = calculate_from_values(rows)
-            asset_values = result['asset_values']
-            category_distribution = result['category_distribution']
+        simple = mode.startswith('Simple')
+        if isinstance(csv_path, str):
+            with open(csv_path, 'rb') as f:
+                data = f.read()
         else:
-            data = load_csv_data(csv_path)
-            # default: live fetcher uses get_current_price which will hit network
-            asset_values = calculate_asset_values(data, price_fetcher=get_current_price)
-            category_distribution = calculate_category_distribution(data, price_fetcher=get_current_price)
-
-        # Show distributions in tables (with headers) and format numbers to 1 decimal place
-        # Use HTML output to reliably hide the index column and center-align text
-        assets_df = pd.DataFrame(sorted(asset_values.items(), key=lambda x: x[1], reverse=True), columns=['Asset', 'Value'])
-        # Append Total row summing the Value column
-        try:
-            assets_total = float(assets_df['Value'].sum()) if not assets_df.empty else 0.0
-        except Exception:
-            assets_total = 0.0
-        assets_df = pd.concat([assets_df, pd.DataFrame([{'Asset': 'Total', 'Value': assets_total}])], ignore_index=True)
-        assets_html = (
-            "<style>table.dataframe td, table.dataframe th { text-align: center; }</style>"
-            + assets_df.to_html(index=False, float_format='%.1f')
-        )
-
-        cats_df = pd.DataFrame(sorted(category_distribution.items(), key=lambda x: x[1], reverse=True), columns=['Category', 'Value'])
-        # Append Total row summing the Value column
-        try:
-            cats_total = float(cats_df['Value'].sum()) if not cats_df.empty else 0.0
-        except Exception:
-            cats_total = 0.0
-        cats_df = pd.concat([cats_df, pd.DataFrame([{'Category': 'Total', 'Value': cats_total}])], ignore_index=True)
-        cats_html = (
-            "<style>table.dataframe td, table.dataframe th { text-align: center; }</style>"
-            + cats_df.to_html(index=False, float_format='%.1f')
-        )
+            data = csv_path.getvalue()
+        # One pricing pass yields the distributions, P&L (Live mode only; Simple CSVs carry
+        # no cost basis), the tables and the per-position values for risk/what-if
+        with SourceTimer(profiler):
+            portfolio = cached_pipeline(data, simple=simple, base_currency=base_currency, cache=memory_cache,
+                                        price_fetcher=price_fetcher, profiler=profiler)
+        profiler.lap('memory cache')
+        if portfolio.result.get('missing_fx'):
+            st.warning(missing_fx_message(portfolio.result['missing_fx']))
+        rows, position_values = portfolio.store, portfolio.value
+        asset_values = portfolio.result['asset_values']
+        category_distribution = portfolio.result['category_distribution']
 
+        # Show distributions in tables (with headers) and format numbers to 1 decimal place.
         # Render the two tables side-by-side so they align with the plots below
         col1, col2 = st.columns(2)
-        with col1:
-            st.subheader('Asset Distribution')
-            st.markdown(assets_html, unsafe_allow_html=True)
-        with col2:
-            st.subheader('Category Distribution')
-            st.markdown(cats_html, unsafe_allow_html=True)
+        for col, title, key in ((col1, 'Asset Distribution', 'asset'), (col2, 'Category Distribution', 'category')):
+            with col:
+                st.subheader(title)
+                if compact:
+                    show_table(portfolio.tables[key], key=f'{key}_page')
+                else:
+                    st.markdown(table_html(portfolio.tables[key]), unsafe_allow_html=True)
+
+        profiler.lap('table render')
 
         # Prepare and render Plotly pies directly for better Streamlit UX
         import plotly.graph_objects as go
-        from plotly.subplots import make_subplots
-
-        def prepare_pie_data(data_dict, combine_threshold, respect_existing_other=True):
-            """
-            Return labels and values applying combining logic similar to plot_pie.
-            If combine_threshold == 0, do not combine.
-            """
-            items = [(k, float(v)) for k, v in data_dict.items() if float(v) > 0]
-            total = sum(v for _, v in items)
-            if total == 0:
-                return [], []
-
-            # detect existing other
-            existing_other = None
-            for k, _ in items:
-                if 'other' in str(k).strip().lower():
-                    existing_other = k
-                    break
-
-            # split
-            if combine_threshold and combine_threshold > 0:
-                big = []
-                small_sum = 0.0
-                for k, v in items:
-                    # Always keep 'Cash' separate regardless of threshold
-                    if str(k).strip().lower() == 'cash':
-                        big.append((k, v))
-                        continue
-                    if v / total < combine_threshold:
-                        small_sum += v
-                    else:
-                        big.append((k, v))
-                if small_sum > 0:
-                    if existing_other is not None:
-                        # add to existing other
-                        for i, (k, v) in enumerate(big):
-                            if 'other' in str(k).strip().lower():
-                                big[i] = (k, v + small_sum)
-                                break
-                        else:
-                            big.append((existing_other, small_sum))
-                    else:
-                        big.append(('Other', small_sum))
-                labels = [k for k, _ in big]
-                values = [v for _, v in big]
-            else:
-                labels = [k for k, _ in items]
-                values = [v for _, v in items]
-
-            # sort descending
-            pairs = list(zip(labels, values))
-            pairs.sort(key=lambda x: x[1], reverse=True)
-            labels, values = zip(*pairs) if pairs else ([], [])
-            return list(labels), list(values)
-
-        # apply combine threshold to assets unless detailed view is requested
-        asset_threshold = 0 if detailed else combine_threshold
-        a_labels, a_values = prepare_pie_data(asset_values, asset_threshold)
-        c_labels, c_values = prepare_pie_data(category_distribution, combine_threshold)
-
-        fig = make_subplots(rows=1, cols=2, specs=[[{'type': 'domain'}, {'type': 'domain'}]],
-                            subplot_titles=['Assets', 'Categories'])
-        fig.add_trace(go.Pie(labels=a_labels, values=a_values, name='Assets'), 1, 1)
-        fig.add_trace(go.Pie(labels=c_labels, values=c_values, name='Categories'), 1, 2)
-
-        # show label + percent with one decimal, and hover shows value with one decimal
-        fig.update_traces(textinfo='none',
-                          texttemplate='%{label}<br>%{percent:.1%}',
-                          hovertemplate='%{label}<br>%{value:,.1f} (%{percent:.1%})')
-        fig.update_layout(margin=dict(t=50, b=0, l=0, r=0))
+
+        figure_key = content_hash(asset_values, category_distribution, detailed, combine_threshold,
+                                  compact, int(max_slices))
+        fig = memory_cache.get_or_compute(('figure', figure_key),
+                                          lambda: build_pies(asset_values, category_distribution))
+        profiler.lap('figure build')
 
         st.plotly_chart(fig, use_container_width=True)
+        profiler.lap('render')
+
+        if show_risk:
+            with SourceTimer(profiler):
+                risk = calculate_risk(rows, position_values, get_price_history(),
+                                      base_currency=None if simple else base_currency)
+            st.subheader('Risk & Concentration')
+            m1, m2, m3 = st.columns(3)
+            m1.metric('Volatility (annualized)', f"{risk['volatility'] * 100:.1f}%")
+            m2.metric('HHI', f"{risk['hhi']:.3f}")
+            m3.metric('Effective holdings', f"{risk['effective_holdings']:.1f}")
+            risk_df = pd.DataFrame([{'Category': k, 'Weight %': r['weight'] * 100, 'Risk share %': r['risk_share'] * 100}
+                                    for k, r in risk['category_risk'].items()]).sort_values('Risk share %', ascending=False)
+            col1, col2 = st.columns(2)
+            with col1:
+                st.dataframe(risk_df, hide_index=True, use_container_width=True,
+                             column_config={c: st.column_config.NumberColumn(format='%.1f') for c in ('Weight %', 'Risk share %')})
+            with col2:
+                corr = risk['correlation']
+                if len(corr['labels']) > 1:
+                    heatmap = go.Figure(go.Heatmap(z=corr['matrix'], x=corr['labels'], y=corr['labels'],
+                                                   zmin=-1, zmax=1, colorscale='RdBu_r'))
+                    heatmap.update_layout(title='Correlation (largest holdings)', margin=dict(t=40, b=0, l=0, r=0))
+                    st.plotly_chart(heatmap, use_container_width=True)
+            if risk['missing']:
+                st.caption('No price history (treated as flat): ' + ', '.join(risk['missing']))
+            profiler.lap('risk')
+
+        if show_whatif:
+            st.subheader('Rebalance / What-if')
+            whatif_section(rows, position_values)
+
+        with st.expander('Timings'):
+            st.dataframe(pd.DataFrame(profiler.rows()), hide_index=True)
+            stats = memory_cache.stats()
+            st.caption(f"Memory cache: {stats['entries']} entries, {stats['bytes'] / 2**20:.1f} of "
+                       f"{stats['max_bytes'] / 2**20:.0f} MB, {stats['hits']} hits / {stats['misses']} misses, "
+                       f"{stats['evictions']} evictions")
     except Exception as e:
         st.error(f'Failed to load or render CSV: {e}')
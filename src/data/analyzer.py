@@ -1,7 +1,12 @@
 import yfinance as yf
 from pycoingecko import CoinGeckoAPI
 import requests
-from typing import Callable, Dict, List
+import warnings
+from typing import Callable, Dict, List, Optional, Tuple, Union
+
+import numpy as np
+
+from data.positions import DEFAULT_ACCOUNT, PositionStore, group_sum
 
 cg = CoinGeckoAPI()
 # Set a modest request timeout on the CoinGecko client to avoid long blocking calls
@@ -11,6 +16,37 @@ except Exception:
     # Older/newer versions may not expose this; it's a best-effort setting
     pass
 
+# Shared HTTP session so the Yahoo fallback reuses pooled keep-alive connections
+# across lookups instead of opening a new TCP/TLS connection per ticker.
+http = requests.Session()
+http.mount('https://', requests.adapters.HTTPAdapter(pool_connections=4, pool_maxsize=16))
+
+
+# Price sources used by get_current_price. Each performs exactly one network request and
+# either returns a price, returns None (no data) or raises. They are looked up at call
+# time, so `data.price_replay` can wrap them to record or replay responses.
+
+def fetch_coingecko_price(cg_id: str) -> float:
+    return float(cg.get_price(ids=cg_id, vs_currencies='usd')[cg_id]['usd'])
+
+
+def fetch_yfinance_close(ticker: str) -> Optional[float]:
+    stock = yf.Ticker(ticker)
+    hist = stock.history(period="1d")
+    if not hist.empty:
+        return float(hist['Close'].iloc[-1])
+    return None
+
+
+def fetch_yahoo_quote(ticker: str) -> Optional[float]:
+    url = f"https://query1.finance.yahoo.com/v7/finance/quote?symbols={ticker}"
+    response = http.get(url, timeout=5)
+    data = response.json()
+    results = data.get('quoteResponse', {}).get('result', [])
+    if results and 'regularMarketPrice' in results[0]:
+        return float(results[0]['regularMarketPrice'])
+    return None
+
 
 def get_current_price(ticker: str, asset: str) -> float:
     """
@@ -34,39 +70,119 @@ def get_current_price(ticker: str, asset: str) -> float:
     cg_ids = {"BTC": "bitcoin", "ETH": "ethereum"}
     if ticker and ticker.upper() in cg_ids:
         try:
-            cg_id = cg_ids[ticker.upper()]
-            return float(cg.get_price(ids=cg_id, vs_currencies='usd')[cg_id]['usd'])
+            return fetch_coingecko_price(cg_ids[ticker.upper()])
         except Exception:
             pass
 
     # Try yfinance
     try:
-        stock = yf.Ticker(ticker)
-        hist = stock.history(period="1d")
-        if not hist.empty:
-            return float(hist['Close'].iloc[-1])
+        price = fetch_yfinance_close(ticker)
+        if price is not None:
+            return price
     except Exception:
         pass
 
     # Fallback: Yahoo Finance unofficial API
     try:
-        url = f"https://query1.finance.yahoo.com/v7/finance/quote?symbols={ticker}"
-        response = requests.get(url, timeout=5)
-        data = response.json()
-        results = data.get('quoteResponse', {}).get('result', [])
-        if results and 'regularMarketPrice' in results[0]:
-            return float(results[0]['regularMarketPrice'])
+        price = fetch_yahoo_quote(ticker)
+        if price is not None:
+            return price
     except Exception:
         pass
 
     return 0.0
 
 
-def calculate_asset_values(data: List[dict], price_fetcher: Callable[[str, str], float] = get_current_price) -> Dict[str, float]:
+def price_key(ticker: str, asset: str):
+    """
+    Identity of the price `get_current_price(ticker, asset)` resolves to. Asset only
+    matters for CASH and 'Other', and tickers are sanitized the same way, so '$AAPL' held
+    as 'Apple' in one account and 'aapl' held as 'Apple Inc' in another share one lookup.
+    """
+    if str(asset).upper() == 'CASH':
+        return ('', 'CASH')
+    t = str(ticker or '').lstrip('$').strip()
+    if str(asset).strip().lower() == 'other' or t.lower() == 'other':
+        return ('', 'OTHER')
+    return (t.upper(), '')
+
+
+def unique_pairs(store: PositionStore):
+    """
+    Distinct (Ticker, Asset) pairs in `store` and the inverse index back to positions,
+    so per-instrument work (pricing, FX, history symbols) runs once per pair.
+    """
+    n_assets = max(len(store.asset.labels), 1)
+    pair_ids = store.ticker.codes.astype(np.int64) * n_assets + store.asset.codes
+    unique_pairs, inverse = np.unique(pair_ids, return_inverse=True)
+    tickers, assets = store.ticker.labels, store.asset.labels
+    pairs = [(tickers[pid // n_assets], assets[pid % n_assets]) for pid in unique_pairs.tolist()]
+    return pairs, inverse
+
+
+def fx_factors(store: PositionStore, base_currency: str, fx=None, pairs=None) -> Tuple[np.ndarray, List[str]]:
+    """
+    Per-position multiplier converting each instrument's quote currency (see
+    `data.fx.quote_currency`) into `base_currency`. All needed pairs are resolved
+    with one batched request through `fx` (default: the process-wide `data.fx.fx_rates`).
+    `pairs` is the `unique_pairs(store)` result when the caller already has it.
+
+    Returns (factors, missing). `missing` lists the 'CCY/BASE' pairs no rate could be
+    resolved for; positions quoted in them get a factor of 0, like a failed price
+    lookup, so callers must report them. Tickers with an unknown exchange suffix are
+    assumed to be quoted in USD, with a warning.
+    """
+    from data.fx import fx_rates, quote_currency, unknown_suffix
+
+    pairs, inverse = pairs if pairs is not None else unique_pairs(store)
+    currencies = [quote_currency(t, a) for t, a in pairs]
+    unknown = sorted({t for t, a in pairs if unknown_suffix(t, a)})
+    if unknown:
+        warnings.warn(f"Unknown exchange suffix, assuming USD quotes: {', '.join(unknown)}", stacklevel=2)
+    rates = (fx or fx_rates).rates(currencies, base_currency)
+    missing = sorted({f'{c}/{base_currency.upper()}' for c in currencies if not rates[c]})
+    return np.array([rates[c] for c in currencies], dtype=np.float64)[inverse], missing
+
+
+def missing_fx_message(missing: List[str]) -> str:
+    return f"No FX rate for {', '.join(missing)}; positions quoted in them are valued at 0"
+
+
+def price_positions(store: PositionStore, price_fetcher: Callable[[str, str], float] = get_current_price,
+                    base_currency: Optional[str] = None, fx=None, pairs=None) -> np.ndarray:
+    """
+    Return a float64 array with the current price of every position in `store`.
+    Each distinct instrument (see `price_key`) is priced exactly once, however many
+    accounts or rows hold it. If `base_currency` is given, prices are converted into it
+    (see `fx_factors`; unresolved FX pairs are warned about).
+    """
+    pairs = pairs if pairs is not None else unique_pairs(store)
+    unique, inverse = pairs
+    keys: Dict[tuple, int] = {}
+    lookups = []
+    pair_to_key = np.empty(len(unique), dtype=np.int64)
+    for i, (t, a) in enumerate(unique):
+        k = keys.setdefault(price_key(t, a), len(lookups))
+        if k == len(lookups):
+            lookups.append((t, a))
+        pair_to_key[i] = k
+    unique_prices = np.array([float(price_fetcher(t, a)) for t, a in lookups], dtype=np.float64)
+    prices = unique_prices[pair_to_key][inverse]
+    if base_currency:
+        factors, missing = fx_factors(store, base_currency, fx=fx, pairs=pairs)
+        if missing:
+            warnings.warn(missing_fx_message(missing), stacklevel=2)
+        prices = prices * factors
+    return prices
+
+
+def calculate_asset_values(data: Union[List[dict], PositionStore], price_fetcher: Callable[[str, str], float] = get_current_price) -> Dict[str, float]:
     """
     Calculate total value per asset.
     `price_fetcher` is injectable for testing.
     """
+    if isinstance(data, PositionStore):
+        return group_sum(data.asset, data.quantity * price_positions(data, price_fetcher))
     asset_values: Dict[str, float] = {}
     for entry in data:
         asset = entry.get('Asset', '') or ''
@@ -77,46 +193,145 @@ def calculate_asset_values(data: List[dict], price_fetcher: Callable[[str, str],
     return asset_values
 
 
-def calculate_category_distribution(data: List[dict], price_fetcher: Callable[[str, str], float] = get_current_price) -> Dict[str, float]:
+def calculate_category_distribution(data: Union[List[dict], PositionStore], price_fetcher: Callable[[str, str], float] = get_current_price) -> Dict[str, float]:
     """
     Aggregate values by category.
     """
-    category_distribution: Dict[str, float] = {}
-    for entry in data:
-        category = entry.get('Category', '') or 'Uncategorized'
-        asset = entry.get('Asset', '') or ''
-        ticker = entry.get('Ticker', '') or asset
-        quantity = float(entry.get('Quantity', 0) or 0)
-        price = price_fetcher(ticker, asset)
-        category_distribution[category] = category_distribution.get(category, 0.0) + quantity * price
-    return category_distribution
+    store = data if isinstance(data, PositionStore) else PositionStore.from_records(data)
+    return group_sum(store.category, store.quantity * price_positions(store, price_fetcher))
 
 
-def calculate_bucket_distribution(data: List[dict], price_fetcher: Callable[[str, str], float] = get_current_price) -> Dict[str, float]:
+def calculate_bucket_distribution(data: Union[List[dict], PositionStore], price_fetcher: Callable[[str, str], float] = get_current_price) -> Dict[str, float]:
     """
     Aggregate values by Bucket (optional column). If Bucket is missing or empty,
     group under 'Unbucketed'.
     """
-    bucket_distribution: Dict[str, float] = {}
+    store = data if isinstance(data, PositionStore) else PositionStore.from_records(data)
+    return group_sum(store.bucket, store.quantity * price_positions(store, price_fetcher))
+
+
+def calculate_account_distribution(data: Union[List[dict], PositionStore], price_fetcher: Callable[[str, str], float] = get_current_price) -> Dict[str, float]:
+    """
+    Aggregate values by Account (see `utils.csv_loader.load_accounts`). Positions without
+    an account are grouped under 'Default'.
+    """
+    if isinstance(data, PositionStore):
+        return group_sum(data.account, data.quantity * price_positions(data, price_fetcher))
+    account_distribution: Dict[str, float] = {}
     for entry in data:
-        bucket = entry.get('Bucket', '') or 'Unbucketed'
+        account = entry.get('Account', '') or DEFAULT_ACCOUNT
         asset = entry.get('Asset', '') or ''
         ticker = entry.get('Ticker', '') or asset
         quantity = float(entry.get('Quantity', 0) or 0)
         price = price_fetcher(ticker, asset)
-        bucket_distribution[bucket] = bucket_distribution.get(bucket, 0.0) + quantity * price
-    return bucket_distribution
+        account_distribution[account] = account_distribution.get(account, 0.0) + quantity * price
+    return account_distribution
+
+
+def _pnl_table(column, value: np.ndarray, cost: np.ndarray) -> Dict[str, Dict[str, float]]:
+    """
+    P&L per label over the positions that have both a resolved price and a cost basis.
+    A failed price lookup (value 0) is not a -100% loss and a blank Avg Buy Price is not
+    a 100% gain, so such positions are left out of 'cost' and 'pnl'. The value of priced
+    positions without a cost basis is reported as 'no_basis'. 'pnl' and 'pnl_pct' are
+    None when no position of the label qualifies.
+    """
+    n = len(column.labels)
+    covered = (cost != 0) & (value != 0)
+    values = np.bincount(column.codes, weights=value, minlength=n)
+    costs = np.bincount(column.codes, weights=np.where(covered, cost, 0.0), minlength=n)
+    pnl = np.bincount(column.codes, weights=np.where(covered, value - cost, 0.0), minlength=n)
+    counted = np.bincount(column.codes[covered], minlength=n)
+    no_basis = np.bincount(column.codes, weights=np.where((cost == 0) & (value != 0), value, 0.0), minlength=n)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        pct = np.where(costs > 0, pnl / costs * 100.0, np.nan)
+    table: Dict[str, Dict[str, float]] = {}
+    for label, v, c, p, pp, k, nb in zip(column.labels, values.tolist(), costs.tolist(), pnl.tolist(), pct.tolist(),
+                                         counted.tolist(), no_basis.tolist()):
+        # Undefined P&L is None rather than NaN so the result stays JSON-safe
+        table[label] = {'value': v, 'cost': c, 'pnl': p if k else None,
+                        'pnl_pct': None if (pp != pp or not k) else pp, 'no_basis': nb}
+    return table
 
 
-def calculate_from_values(data: List[dict]) -> Dict[str, Dict[str, float]]:
+def position_values(store: PositionStore, price_fetcher: Callable[[str, str], float] = get_current_price,
+                    base_currency: Optional[str] = None, fx=None, missing_fx: Optional[List[str]] = None) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Return (value, cost) float64 arrays for every position in `store`: value is
+    Quantity * current price, cost is Quantity * Avg Buy Price. Every distinct ticker is
+    priced once.
+
+    With `base_currency`, both are converted to that currency (see `fx_factors`).
+    Avg Buy Price is taken to be in the instrument's quote currency and converted at the
+    current rate, so P&L reflects price moves rather than FX moves. FX pairs without a
+    rate are appended to `missing_fx` if given, else warned about.
+    """
+    pairs = unique_pairs(store)
+    value = store.quantity * price_positions(store, price_fetcher, pairs=pairs)
+    cost = store.quantity * store.avg_buy_price
+    if base_currency:
+        factors, missing = fx_factors(store, base_currency, fx=fx, pairs=pairs)
+        if missing_fx is not None:
+            missing_fx.extend(missing)
+        elif missing:
+            warnings.warn(missing_fx_message(missing), stacklevel=2)
+        value = value * factors
+        cost = cost * factors
+    return value, cost
+
+
+def summarize(store: PositionStore, value: np.ndarray, cost: Optional[np.ndarray] = None) -> Dict[str, Dict]:
+    """
+    Group per-position `value` into the asset/category/bucket/account distributions and,
+    when `cost` is given, the matching '*_pnl' tables (see `calculate_valuation`).
+    """
+    result = {
+        'asset_values': group_sum(store.asset, value),
+        'category_distribution': group_sum(store.category, value),
+        'bucket_distribution': group_sum(store.bucket, value),
+        'account_distribution': group_sum(store.account, value),
+    }
+    if cost is not None:
+        result.update({
+            'asset_pnl': _pnl_table(store.asset, value, cost),
+            'category_pnl': _pnl_table(store.category, value, cost),
+            'bucket_pnl': _pnl_table(store.bucket, value, cost),
+            'account_pnl': _pnl_table(store.account, value, cost),
+        })
+    return result
+
+
+def calculate_valuation(data: Union[List[dict], PositionStore], price_fetcher: Callable[[str, str], float] = get_current_price,
+                        base_currency: Optional[str] = None, fx=None) -> Dict[str, Dict]:
+    """
+    Value a portfolio in a single pass: every distinct ticker is priced once and the same
+    price vector yields the asset/category/bucket distributions and unrealized P&L.
+
+    Cost basis is Quantity * Avg Buy Price. Returns the four distribution dicts (same
+    shape as `calculate_from_values`) plus 'asset_pnl', 'category_pnl', 'bucket_pnl' and
+    'account_pnl', each mapping label -> {'value', 'cost', 'pnl', 'pnl_pct', 'no_basis'}.
+    P&L only covers positions with a price and a cost basis (see `_pnl_table`). Values are in `base_currency` when given (see
+    `position_values`); 'missing_fx' lists the FX pairs that could not be resolved.
+    """
+    store = data if isinstance(data, PositionStore) else PositionStore.from_records(data)
+    missing_fx: List[str] = []
+    value, cost = position_values(store, price_fetcher, base_currency=base_currency, fx=fx, missing_fx=missing_fx)
+    return dict(summarize(store, value, cost), base_currency=base_currency, missing_fx=missing_fx)
+
+
+def calculate_from_values(data: Union[List[dict], PositionStore]) -> Dict[str, Dict[str, float]]:
     """
     Given rows with keys 'Asset', 'Category', 'Amount' where 'Amount' is the current value,
-    return two dicts: asset_values and category_distribution.
+    return asset_values, category_distribution, bucket_distribution and account_distribution.
     This function does not fetch any live prices.
     """
+    if isinstance(data, PositionStore):
+        return summarize(data, data.amount)
+
     asset_values: Dict[str, float] = {}
     category_distribution: Dict[str, float] = {}
     bucket_distribution: Dict[str, float] = {}
+    account_distribution: Dict[str, float] = {}
     for entry in data:
         asset = entry.get('Asset', '') or ''
         category = entry.get('Category', '') or 'Uncategorized'
@@ -126,5 +341,8 @@ def calculate_from_values(data: List[dict]) -> Dict[str, Dict[str, float]]:
         # Bucket aggregation for simple flow
         bucket = entry.get('Bucket', '') or 'Unbucketed'
         bucket_distribution[bucket] = bucket_distribution.get(bucket, 0.0) + amount
+        account = entry.get('Account', '') or DEFAULT_ACCOUNT
+        account_distribution[account] = account_distribution.get(account, 0.0) + amount
 
-    return {'asset_values': asset_values, 'category_distribution': category_distribution, 'bucket_distribution': bucket_distribution}
\ No newline at end of file
+    return {'asset_values': asset_values, 'category_distribution': category_distribution,
+            'bucket_distribution': bucket_distribution, 'account_distribution': account_distribution}
\ No newline at end of file
@@ -0,0 +1,218 @@
+import json
+import os
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from data.market_calendar import FreshnessPolicy
+
+# What a failed quote request raises: network errors (requests' exceptions are OSErrors),
+# malformed or partial responses, and replay misses (LookupError) or recorded errors
+# (RuntimeError) from data.price_replay. Anything else is a bug and propagates.
+FETCH_ERRORS = (OSError, ValueError, TypeError, LookupError, RuntimeError)
+
+# Quote currency by exchange suffix (Yahoo Finance conventions). Tickers without a
+# known suffix are assumed to be quoted in USD (see `unknown_suffix`).
+SUFFIX_CURRENCIES = {
+    '.NS': 'INR', '.BO': 'INR',
+    '.L': 'GBp', '.IL': 'USD',
+    '.T': 'JPY', '.HK': 'HKD', '.SS': 'CNY', '.SZ': 'CNY', '.KS': 'KRW', '.KQ': 'KRW',
+    '.TW': 'TWD', '.SI': 'SGD', '.AX': 'AUD', '.NZ': 'NZD',
+    '.TO': 'CAD', '.V': 'CAD', '.NE': 'CAD',
+    '.DE': 'EUR', '.F': 'EUR', '.PA': 'EUR', '.AS': 'EUR', '.BR': 'EUR', '.MI': 'EUR', '.MC': 'EUR',
+    '.LS': 'EUR', '.HE': 'EUR', '.IR': 'EUR', '.VI': 'EUR',
+    '.SW': 'CHF', '.ST': 'SEK', '.OL': 'NOK', '.CO': 'DKK',
+    '.SA': 'BRL', '.MX': 'MXN', '.JO': 'ZAc', '.TA': 'ILA',
+}
+
+_SUFFIX_LOOKUP = {k.upper(): v for k, v in SUFFIX_CURRENCIES.items()}
+
+# Some venues quote in minor units (pence, cents, agorot): currency -> (major currency, factor)
+MINOR_UNITS = {'GBp': ('GBP', 0.01), 'GBX': ('GBP', 0.01), 'ZAc': ('ZAR', 0.01), 'ILA': ('ILS', 0.01)}
+
+# Instruments priced in USD regardless of suffix (see get_current_price)
+_USD_ASSETS = {'CASH'}
+_USD_TICKERS = {'BTC', 'ETH'}
+
+
+def quote_currency(ticker: str, asset: str) -> str:
+    """
+    Return the currency `get_current_price` reports for this instrument, without any
+    network calls: CASH and CoinGecko crypto are USD, otherwise the exchange suffix decides.
+    """
+    if str(asset or '').strip().upper() in _USD_ASSETS:
+        return 'USD'
+    t = str(ticker or asset or '').lstrip('$').strip().upper()
+    if t in _USD_TICKERS:
+        return 'USD'
+    dot = t.rfind('.')
+    if dot > 0:
+        return _SUFFIX_LOOKUP.get(t[dot:], 'USD')
+    return 'USD'
+
+
+def unknown_suffix(ticker: str, asset: str) -> Optional[str]:
+    """
+    Return the exchange suffix of `ticker` if `quote_currency` does not know it and
+    therefore assumed USD, else None. Single-letter suffixes outside SUFFIX_CURRENCIES
+    are US share classes (BRK.B, BF.A) and count as known.
+    """
+    if quote_currency(ticker, asset) != 'USD':
+        return None
+    t = str(ticker or asset or '').lstrip('$').strip().upper()
+    dot = t.rfind('.')
+    if dot <= 0 or t[dot:] in _SUFFIX_LOOKUP or len(t) - dot == 2:
+        return None
+    return t[dot:]
+
+
+def fx_symbol(currency: str, base: str) -> str:
+    """Yahoo Finance symbol whose price is `base` units per 1 `currency` (e.g. INRUSD=X)."""
+    return f'{currency}{base}=X'
+
+
+def fetch_fx_quotes(symbols: List[str]) -> Dict[str, float]:
+    """
+    Fetch the latest rate for several Yahoo FX symbols in one batched request.
+    Returns only the symbols that resolved.
+    """
+    rates: Dict[str, float] = {}
+    if not symbols:
+        return rates
+
+    try:
+        import yfinance as yf
+
+        frame = yf.download(list(symbols), period='5d', progress=False, auto_adjust=False, threads=False)
+        closes = frame['Close'] if 'Close' in frame else frame
+        if hasattr(closes, 'columns'):
+            for sym in symbols:
+                if sym in closes.columns:
+                    series = closes[sym].dropna()
+                    if not series.empty:
+                        rates[sym] = float(series.iloc[-1])
+        else:
+            series = closes.dropna()
+            if len(symbols) == 1 and not series.empty:
+                rates[symbols[0]] = float(series.iloc[-1])
+    except (ImportError,) + FETCH_ERRORS:
+        pass
+
+    missing = [s for s in symbols if s not in rates]
+    if missing:
+        # Fallback: one Yahoo quote request for every still-missing pair
+        try:
+            from data.analyzer import http
+
+            url = 'https://query1.finance.yahoo.com/v7/finance/quote?symbols=' + ','.join(missing)
+            results = http.get(url, timeout=5).json().get('quoteResponse', {}).get('result', [])
+            for row in results:
+                if row.get('symbol') in missing and 'regularMarketPrice' in row:
+                    rates[row['symbol']] = float(row['regularMarketPrice'])
+        except FETCH_ERRORS:
+            pass
+
+    return rates
+
+
+class FxRates:
+    """
+    Cache of FX rates. `rates()` resolves every currency a valuation needs with at
+    most one batched `fetcher` call; fresh pairs are served from memory.
+
+    Freshness is a plain `ttl` unless a `policy` (see
+    `data.market_calendar.FreshnessPolicy`) is given, which keeps weekend rates until
+    FX reopens. With `path`, rates are loaded from and saved to a JSON file like
+    `PriceCache`, so separate CLI runs reuse them.
+    """
+
+    def __init__(self, fetcher: Callable[[List[str]], Dict[str, float]] = fetch_fx_quotes, ttl: float = 3600.0,
+                 policy=None, path: Optional[str] = None):
+        self.fetcher = fetcher
+        self.ttl = float(ttl)
+        self.policy = policy
+        self.path = path
+        self._lock = threading.Lock()
+        self._entries: Dict[Tuple[str, str], Tuple[float, float]] = {}
+        if path:
+            self.load()
+
+    def rates(self, currencies: Iterable[str], base: str) -> Dict[str, float]:
+        """
+        Map each currency in `currencies` to the multiplier that converts a price quoted
+        in it to `base` (minor units included). Unresolvable currencies map to 0.0,
+        matching how `get_current_price` reports a failed lookup.
+        """
+        base = base.upper()
+        now = time.time()
+        wanted = {}
+        for ccy in set(currencies):
+            major, factor = MINOR_UNITS.get(ccy, (ccy.upper(), 1.0))
+            wanted[ccy] = (major, factor)
+
+        with self._lock:
+            stale = sorted({major for major, _ in wanted.values()
+                            if major != base and not self._fresh((major, base), now)})
+        if stale:
+            try:
+                fetched = self.fetcher([fx_symbol(ccy, base) for ccy in stale])
+            except FETCH_ERRORS:
+                # A failed batch leaves those currencies unresolved, like a failed price
+                fetched = {}
+            with self._lock:
+                for ccy in stale:
+                    rate = fetched.get(fx_symbol(ccy, base))
+                    if rate and rate > 0:
+                        self._entries[(ccy, base)] = (float(rate), now)
+
+        out: Dict[str, float] = {}
+        with self._lock:
+            for ccy, (major, factor) in wanted.items():
+                if major == base:
+                    out[ccy] = factor
+                else:
+                    entry = self._entries.get((major, base))
+                    out[ccy] = entry[0] * factor if entry else 0.0
+        return out
+
+    def _fresh(self, key: Tuple[str, str], now: float) -> bool:
+        entry = self._entries.get(key)
+        if entry is None:
+            return False
+        if self.policy is not None:
+            return self.policy.is_fresh(fx_symbol(*key), '', entry[1], now)
+        return (now - entry[1]) < self.ttl
+
+    def load(self) -> None:
+        """Merge rates from `path` (missing or unreadable files are ignored)."""
+        try:
+            with open(self.path, 'r', encoding='utf-8') as fh:
+                rows = json.load(fh)
+        except (OSError, ValueError):
+            return
+        with self._lock:
+            for row in rows:
+                try:
+                    self._entries[(row['currency'], row['base'])] = (float(row['rate']), float(row['fetched_at']))
+                except (KeyError, TypeError, ValueError):
+                    continue
+
+    def save(self) -> None:
+        """Write all rates to `path` atomically (no-op without a path)."""
+        if not self.path:
+            return
+        with self._lock:
+            rows = [{'currency': c, 'base': b, 'rate': r, 'fetched_at': ts} for (c, b), (r, ts) in self._entries.items()]
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        tmp = self.path + '.tmp'
+        with open(tmp, 'w', encoding='utf-8') as fh:
+            json.dump(rows, fh)
+        os.replace(tmp, self.path)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+# Process-wide default so repeated valuations share warm FX rates
+fx_rates = FxRates(policy=FreshnessPolicy())
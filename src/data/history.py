@@ -0,0 +1,159 @@
+import os
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from data.pipeline import TABLES
+
+# One fixed-width column file per field, appended in lockstep. Labels and portfolio
+# names longer than 64 UTF-8 bytes are truncated.
+COLUMNS = {
+    'date': np.dtype('datetime64[D]'),
+    'portfolio': np.dtype('S64'),
+    'dimension': np.dtype('u1'),
+    'label': np.dtype('S64'),
+    'value': np.dtype('f8'),
+    'currency': np.dtype('S3'),
+}
+# Dimension codes stored in the 'dimension' column (append only: never reorder)
+DIMENSIONS = ('asset', 'category', 'bucket', 'account')
+
+
+def _partition(date) -> str:
+    return str(np.datetime64(date, 'M'))
+
+
+def _encode(text: str, width: int = 64) -> bytes:
+    return str(text).encode('utf-8')[:width]
+
+
+class AllocationHistory:
+    """
+    Append-only columnar history of allocation totals, one row per (date, portfolio,
+    dimension, label).
+
+    Rows are partitioned by month of the snapshot date, `<root>/YYYY-MM/`. Each partition
+    holds one raw fixed-width file per column (see COLUMNS), so a snapshot appends a few
+    hundred bytes per column and never rewrites earlier rows. Readers memory-map the
+    columns they need, so months of history are one sequential scan with no parsing and
+    no price lookups. Partitions outside a date range are skipped by name. A write cut
+    short (e.g. the job was killed) leaves columns of unequal length. Readers only see
+    complete rows, and the next append trims the partial one.
+    """
+
+    def __init__(self, root: str):
+        self.root = root
+
+    def partitions(self, start=None, end=None) -> List[str]:
+        """Partition folders overlapping [start, end], oldest first."""
+        if not os.path.isdir(self.root):
+            return []
+        lo = _partition(start) if start is not None else None
+        hi = _partition(end) if end is not None else None
+        names = sorted(n for n in os.listdir(self.root) if os.path.isfile(os.path.join(self.root, n, 'value.bin')))
+        return [os.path.join(self.root, n) for n in names if (lo is None or n >= lo) and (hi is None or n <= hi)]
+
+    @staticmethod
+    def _rows(part: str) -> int:
+        sizes = []
+        for name, dtype in COLUMNS.items():
+            path = os.path.join(part, f'{name}.bin')
+            sizes.append(os.path.getsize(path) // dtype.itemsize if os.path.exists(path) else 0)
+        return min(sizes)
+
+    def _columns(self, part: str, names) -> Dict[str, np.ndarray]:
+        n = self._rows(part)
+        if not n:
+            return {name: np.empty(0, dtype=COLUMNS[name]) for name in names}
+        return {name: np.memmap(os.path.join(part, f'{name}.bin'), dtype=COLUMNS[name], mode='r', shape=(n,))
+                for name in names}
+
+    def has(self, date, portfolio: str) -> bool:
+        """True if a snapshot of `portfolio` for `date` is already recorded."""
+        part = os.path.join(self.root, _partition(date))
+        if not os.path.isdir(part):
+            return False
+        cols = self._columns(part, ('date', 'portfolio'))
+        return bool(np.any((cols['date'] == np.datetime64(date, 'D')) & (cols['portfolio'] == _encode(portfolio))))
+
+    def append(self, date, portfolio: str, result: Dict, currency: Optional[str] = None) -> int:
+        """
+        Append the asset/category/bucket/account totals from a valuation `result` (see
+        `data.pipeline.run_pipeline`) for `portfolio` on `date`. Returns rows written.
+        """
+        dims, labels, values = [], [], []
+        for code, dim in enumerate(DIMENSIONS):
+            for label, value in result.get(TABLES[dim][0], {}).items():
+                dims.append(code)
+                labels.append(_encode(label))
+                values.append(value)
+        n = len(values)
+        if not n:
+            return 0
+        data = {
+            'date': np.full(n, np.datetime64(date, 'D')),
+            'portfolio': np.full(n, _encode(portfolio), dtype=COLUMNS['portfolio']),
+            'dimension': np.array(dims, dtype=COLUMNS['dimension']),
+            'label': np.array(labels, dtype=COLUMNS['label']),
+            'value': np.array(values, dtype=COLUMNS['value']),
+            'currency': np.full(n, _encode(currency or '', 3), dtype=COLUMNS['currency']),
+        }
+        part = os.path.join(self.root, _partition(date))
+        os.makedirs(part, exist_ok=True)
+        complete = self._rows(part)
+        for name, dtype in COLUMNS.items():
+            with open(os.path.join(part, f'{name}.bin'), 'ab') as fh:
+                # Drop any partial row left by an interrupted append before adding ours
+                fh.truncate(complete * dtype.itemsize)
+                fh.write(data[name].tobytes())
+        return n
+
+    def _scan(self, start, end, portfolio: Optional[str], dimension: Optional[str], names) -> Dict[str, np.ndarray]:
+        """Raw (undecoded) `names` columns of the rows matching the filters."""
+        lo = np.datetime64(start, 'D') if start is not None else None
+        hi = np.datetime64(end, 'D') if end is not None else None
+        filters = {'date'} | ({'portfolio'} if portfolio is not None else set()) | ({'dimension'} if dimension is not None else set())
+        chunks = {name: [] for name in names}
+        for part in self.partitions(start, end):
+            cols = self._columns(part, set(names) | filters)
+            mask = np.ones(len(cols['date']), dtype=bool)
+            if lo is not None:
+                mask &= cols['date'] >= lo
+            if hi is not None:
+                mask &= cols['date'] <= hi
+            if portfolio is not None:
+                mask &= cols['portfolio'] == _encode(portfolio)
+            if dimension is not None:
+                mask &= cols['dimension'] == DIMENSIONS.index(dimension)
+            for name in names:
+                chunks[name].append(np.asarray(cols[name][mask]))
+        return {name: np.concatenate(parts) if parts else np.empty(0, dtype=COLUMNS[name]) for name, parts in chunks.items()}
+
+    def read(self, start=None, end=None, portfolio: Optional[str] = None, dimension: Optional[str] = None) -> Dict[str, np.ndarray]:
+        """
+        Rows in [start, end] (dates inclusive), optionally for one portfolio and/or one
+        dimension. Returns column -> array with 'portfolio', 'label' and 'currency' decoded
+        to str, and 'dimension' as names.
+        """
+        out = self._scan(start, end, portfolio, dimension, tuple(COLUMNS))
+        for name in ('portfolio', 'label', 'currency'):
+            # Few distinct strings over many rows: decode each once
+            uniques, inverse = np.unique(out[name], return_inverse=True)
+            out[name] = np.array([u.decode('utf-8', errors='ignore') for u in uniques.tolist()], dtype=object)[inverse]
+        out['dimension'] = np.array(DIMENSIONS, dtype=object)[out['dimension']].astype(str)
+        return out
+
+    def frame(self, dimension: str = 'category', portfolio: Optional[str] = None, start=None, end=None):
+        """
+        Totals for one dimension as a DataFrame: one row per date, one column per label.
+        Several portfolios on the same date add up.
+        """
+        import pandas as pd
+
+        rows = self._scan(start, end, portfolio, dimension, ('date', 'label', 'value'))
+        dates, date_idx = np.unique(rows['date'], return_inverse=True)
+        labels, label_idx = np.unique(rows['label'], return_inverse=True)
+        totals = np.bincount(date_idx * len(labels) + label_idx, weights=rows['value'],
+                             minlength=len(dates) * len(labels)).reshape(len(dates), len(labels))
+        return pd.DataFrame(totals, index=pd.Index(dates, name='date'),
+                            columns=pd.Index([u.decode('utf-8', errors='ignore') for u in labels.tolist()], name='label'))
@@ -0,0 +1,173 @@
+import time
+from datetime import date, datetime, time as dtime, timedelta
+from typing import Dict, Iterable, NamedTuple, Optional, Set
+from zoneinfo import ZoneInfo
+
+
+class Exchange(NamedTuple):
+    name: str
+    tz: str
+    open: dtime
+    close: dtime
+
+
+US = Exchange('US', 'America/New_York', dtime(9, 30), dtime(16, 0))
+
+# Regular trading sessions by Yahoo ticker suffix. Tickers without a suffix trade in the US.
+# Lunch breaks are ignored: treating them as "open" only costs an extra fetch.
+EXCHANGES = {
+    '.NS': Exchange('NSE', 'Asia/Kolkata', dtime(9, 15), dtime(15, 30)),
+    '.BO': Exchange('BSE', 'Asia/Kolkata', dtime(9, 15), dtime(15, 30)),
+    '.L': Exchange('LSE', 'Europe/London', dtime(8, 0), dtime(16, 30)),
+    '.IL': Exchange('LSE', 'Europe/London', dtime(8, 0), dtime(16, 30)),
+    '.T': Exchange('TSE', 'Asia/Tokyo', dtime(9, 0), dtime(15, 30)),
+    '.HK': Exchange('HKEX', 'Asia/Hong_Kong', dtime(9, 30), dtime(16, 0)),
+    '.SS': Exchange('SSE', 'Asia/Shanghai', dtime(9, 30), dtime(15, 0)),
+    '.SZ': Exchange('SZSE', 'Asia/Shanghai', dtime(9, 30), dtime(15, 0)),
+    '.KS': Exchange('KRX', 'Asia/Seoul', dtime(9, 0), dtime(15, 30)),
+    '.AX': Exchange('ASX', 'Australia/Sydney', dtime(10, 0), dtime(16, 0)),
+    '.TO': Exchange('TSX', 'America/Toronto', dtime(9, 30), dtime(16, 0)),
+    '.V': Exchange('TSXV', 'America/Toronto', dtime(9, 30), dtime(16, 0)),
+    '.DE': Exchange('XETRA', 'Europe/Berlin', dtime(9, 0), dtime(17, 30)),
+    '.F': Exchange('FWB', 'Europe/Berlin', dtime(8, 0), dtime(22, 0)),
+    '.PA': Exchange('Euronext', 'Europe/Paris', dtime(9, 0), dtime(17, 30)),
+    '.AS': Exchange('Euronext', 'Europe/Amsterdam', dtime(9, 0), dtime(17, 30)),
+    '.BR': Exchange('Euronext', 'Europe/Brussels', dtime(9, 0), dtime(17, 30)),
+    '.MI': Exchange('Borsa', 'Europe/Rome', dtime(9, 0), dtime(17, 30)),
+    '.MC': Exchange('BME', 'Europe/Madrid', dtime(9, 0), dtime(17, 30)),
+    '.SW': Exchange('SIX', 'Europe/Zurich', dtime(9, 0), dtime(17, 30)),
+    '.SA': Exchange('B3', 'America/Sao_Paulo', dtime(10, 0), dtime(17, 0)),
+}
+
+# Assets that trade around the clock (priced via CoinGecko in get_current_price)
+CRYPTO_TICKERS = {'BTC', 'ETH'}
+
+# Spot FX (Yahoo '=X' symbols) trades around the clock from Sunday 17:00 to Friday 17:00
+# New York time. Holidays are ignored: treating them as "open" only costs an extra fetch.
+FX_TZ = 'America/New_York'
+FX_ROLL = dtime(17, 0)
+
+
+def _normalize(ticker: str) -> str:
+    return str(ticker or '').lstrip('$').strip().upper()
+
+
+def exchange_for(ticker: str) -> Optional[Exchange]:
+    """
+    Exchange whose session governs `ticker`, or None when it has no fixed session
+    (crypto, FX and unknown suffixes).
+    """
+    t = _normalize(ticker)
+    if not t or t in CRYPTO_TICKERS or t.endswith('=X'):
+        return None
+    dot = t.rfind('.')
+    if dot > 0:
+        return EXCHANGES.get(t[dot:])
+    return US
+
+
+def _is_trading_day(d: date, holidays: Set[date]) -> bool:
+    return d.weekday() < 5 and d not in holidays
+
+
+def is_open(exchange: Exchange, now: float, holidays: Iterable[date] = ()) -> bool:
+    """True if `exchange` is in its regular session at epoch time `now`."""
+    local = datetime.fromtimestamp(now, ZoneInfo(exchange.tz))
+    if not _is_trading_day(local.date(), set(holidays)):
+        return False
+    return exchange.open <= local.time() < exchange.close
+
+
+def last_close(exchange: Exchange, now: float, holidays: Iterable[date] = ()) -> float:
+    """Epoch time of the most recent regular-session close at or before `now`."""
+    tz = ZoneInfo(exchange.tz)
+    holidays = set(holidays)
+    local = datetime.fromtimestamp(now, tz)
+    d = local.date()
+    if local.time() < exchange.close:
+        d -= timedelta(days=1)
+    while not _is_trading_day(d, holidays):
+        d -= timedelta(days=1)
+    return datetime.combine(d, exchange.close, tzinfo=tz).timestamp()
+
+
+def last_session(tickers: Iterable[str], now: Optional[float] = None,
+                 holidays: Optional[Dict[str, Iterable[date]]] = None) -> date:
+    """
+    Date of the most recent completed regular session on the exchanges that trade
+    `tickers`, each taken in its exchange's local time. Crypto, FX and unknown suffixes
+    have no session and are skipped; with none left the US session is used. A run on a
+    weekend or before the open therefore gives the previous trading day.
+    """
+    now = time.time() if now is None else now
+    holidays = holidays or {}
+    exchanges = {e for e in (exchange_for(t) for t in tickers) if e is not None} or {US}
+    return max(datetime.fromtimestamp(last_close(e, now, holidays.get(e.name, ())), ZoneInfo(e.tz)).date()
+               for e in exchanges)
+
+
+def fx_is_open(now: float) -> bool:
+    """True if spot FX is trading at epoch time `now` (it only closes over the weekend)."""
+    local = datetime.fromtimestamp(now, ZoneInfo(FX_TZ))
+    weekday = local.weekday()
+    if weekday == 4:
+        return local.time() < FX_ROLL
+    if weekday == 5:
+        return False
+    if weekday == 6:
+        return local.time() >= FX_ROLL
+    return True
+
+
+def fx_last_close(now: float) -> float:
+    """Epoch time of the most recent weekly FX close (Friday 17:00 New York) at or before `now`."""
+    tz = ZoneInfo(FX_TZ)
+    local = datetime.fromtimestamp(now, tz)
+    d = local.date() - timedelta(days=(local.weekday() - 4) % 7)
+    if d == local.date() and local.time() < FX_ROLL:
+        d -= timedelta(days=7)
+    return datetime.combine(d, FX_ROLL, tzinfo=tz).timestamp()
+
+
+class FreshnessPolicy:
+    """
+    Decides whether a cached price can be reused instead of refetching.
+
+    - CASH never changes (always fresh).
+    - Crypto trades 24/7 and uses `crypto_ttl`.
+    - FX symbols ('INRUSD=X') use `fx_ttl` while FX trades. A rate fetched after the
+      Friday close stays fresh until the market reopens on Sunday.
+    - Exchange-listed tickers use `ttl` while their market is open. Once it is closed,
+      a price fetched at least `settle` seconds after the last session close is that
+      session's close and stays fresh until the next open (overnight, weekends, and any
+      `holidays` given per exchange name).
+    - Tickers without a known session fall back to `ttl`.
+    """
+
+    def __init__(self, ttl: float = 60.0, crypto_ttl: float = 60.0, settle: float = 900.0,
+                 holidays: Optional[Dict[str, Iterable[date]]] = None, fx_ttl: float = 3600.0):
+        self.ttl = float(ttl)
+        self.crypto_ttl = float(crypto_ttl)
+        self.fx_ttl = float(fx_ttl)
+        self.settle = float(settle)
+        self.holidays = {k: set(v) for k, v in (holidays or {}).items()}
+
+    def is_fresh(self, ticker: str, asset: str, fetched_at: float, now: Optional[float] = None) -> bool:
+        now = time.time() if now is None else now
+        if str(asset or '').strip().upper() == 'CASH':
+            return True
+        if _normalize(ticker) in CRYPTO_TICKERS:
+            return (now - fetched_at) < self.crypto_ttl
+        if _normalize(ticker).endswith('=X'):
+            if fx_is_open(now):
+                return (now - fetched_at) < self.fx_ttl
+            return fetched_at >= fx_last_close(now) + self.settle
+
+        exchange = exchange_for(ticker)
+        if exchange is None:
+            return (now - fetched_at) < self.ttl
+
+        holidays = self.holidays.get(exchange.name, ())
+        if is_open(exchange, now, holidays):
+            return (now - fetched_at) < self.ttl
+        return fetched_at >= last_close(exchange, now, holidays) + self.settle
@@ -0,0 +1,200 @@
+from typing import Callable, Dict, List, NamedTuple, Optional
+
+import numpy as np
+
+from data.analyzer import get_current_price, position_values, summarize
+from data.positions import PositionStore
+from utils.profiling import NULL_PROFILER
+
+# Seconds a cached live valuation is reused before prices are looked up again
+VALUATION_TTL = 60.0
+
+# Largest portfolio (rows) covered by the scaling bounds in src/scaling.py. Services
+# that accept holdings from clients reject anything bigger (see read_input's max_rows).
+MAX_ROWS = 1_000_000
+
+# Distribution tables built for every front end: key -> (result key, label column, P&L key)
+TABLES = {
+    'asset': ('asset_values', 'Asset', 'asset_pnl'),
+    'category': ('category_distribution', 'Category', 'category_pnl'),
+    'bucket': ('bucket_distribution', 'Bucket', 'bucket_pnl'),
+    'account': ('account_distribution', 'Account', 'account_pnl'),
+}
+
+
+class Portfolio(NamedTuple):
+    """
+    Everything a front end needs from one pipeline run.
+
+    - store: the loaded positions.
+    - value / cost: per-position value (base currency in live mode) and cost basis
+      (None in simple mode).
+    - result: the distribution dicts (and '*_pnl' tables in live mode), shaped like
+      `calculate_valuation` / `calculate_from_values`.
+    - valuation: `result` in live mode, None in simple mode (no cost basis, so no P&L).
+    - tables: 'asset'/'category'/'bucket'/'account' -> DataFrame sorted by value with a
+      Total row (plus Cost, P&L and P&L % in live mode).
+    - key: content hash of the input when it came through `cached_pipeline`, for caches
+      of anything derived from the holdings.
+    """
+    store: PositionStore
+    value: np.ndarray
+    cost: Optional[np.ndarray]
+    result: Dict
+    valuation: Optional[Dict]
+    tables: Dict
+    key: Optional[str] = None
+
+
+def read_input(source, simple: bool = False, max_rows: Optional[int] = None) -> PositionStore:
+    """
+    Read holdings exactly once into a `PositionStore`. `source` may be a CSV path, an
+    uploaded file object, a DataFrame, a list of row dicts, or a list of account files
+    to consolidate (see `utils.csv_loader.load_accounts`). In simple mode a detailed CSV
+    is valued at cost (see `utils.csv_loader.frame_positions`).
+
+    With `max_rows`, inputs with more rows raise ValueError. A CSV is never parsed past
+    the limit.
+    """
+    import pandas as pd
+    from utils.csv_loader import frame_positions, load_accounts
+
+    if isinstance(source, PositionStore):
+        store = source
+    elif isinstance(source, pd.DataFrame):
+        _check_rows(len(source), max_rows)
+        store = frame_positions(source, simple=simple)
+    elif isinstance(source, (list, tuple)):
+        if source and isinstance(source[0], dict):
+            _check_rows(len(source), max_rows)
+            store = frame_positions(pd.DataFrame(list(source)), simple=simple)
+        elif len(source) == 1:
+            store = read_input(source[0], simple=simple, max_rows=max_rows)
+        else:
+            store = load_accounts(source, simple=simple)
+    else:
+        if hasattr(source, 'seek'):
+            # Uploaded files persist across Streamlit reruns; start from the top each time
+            source.seek(0)
+        # One row past the limit is enough to know it is too big
+        df = pd.read_csv(source, nrows=max_rows + 1 if max_rows else None)
+        _check_rows(len(df), max_rows)
+        store = frame_positions(df, simple=simple)
+    _check_rows(len(store), max_rows)
+    return store
+
+
+def _check_rows(rows: int, max_rows: Optional[int]) -> None:
+    if max_rows and rows > max_rows:
+        raise ValueError(f'Portfolio has more than {max_rows:,} rows; split it or raise the limit')
+
+
+def distribution_table(distribution: Dict[str, float], label: str, pnl: Optional[Dict[str, Dict]] = None):
+    """
+    One distribution as a DataFrame sorted by value, with a Total row. With `pnl`
+    (from `calculate_valuation`), Cost, P&L and P&L % columns are added; they cover only
+    positions with both a price and a cost basis.
+    """
+    import pandas as pd
+
+    items = sorted(distribution.items(), key=lambda x: x[1], reverse=True)
+    labels = [k for k, _ in items] + ['Total']
+    values = [v for _, v in items]
+    values.append(float(sum(values)))
+    df = pd.DataFrame({label: labels, 'Value': values})
+    if pnl is not None:
+        costs = [pnl.get(k, {}).get('cost', 0.0) for k, _ in items]
+        gains = [pnl.get(k, {}).get('pnl') for k, _ in items]
+        costs.append(sum(costs))
+        # Rows without a price or cost basis have no P&L and stay out of the Total
+        known = [g for g in gains if g is not None]
+        gains.append(sum(known) if known else None)
+        df['Cost'] = costs
+        df['P&L'] = [float('nan') if g is None else g for g in gains]
+        df['P&L %'] = [(g / c * 100.0) if g is not None and c else float('nan') for g, c in zip(gains, costs)]
+    return df
+
+
+def build_tables(result: Dict) -> Dict:
+    """Distribution tables (see `distribution_table`) for every dimension in `result`."""
+    live = 'asset_pnl' in result
+    return {key: distribution_table(result[dist], label, result[pnl] if live else None)
+            for key, (dist, label, pnl) in TABLES.items() if dist in result}
+
+
+def run_pipeline(source, simple: bool = False, price_fetcher: Callable[[str, str], float] = get_current_price,
+                 base_currency: Optional[str] = None, fx=None, profiler=NULL_PROFILER) -> Portfolio:
+    """
+    Load, value and tabulate a portfolio: the one code path behind the CLI and both
+    Streamlit apps.
+
+    The input is read once (see `read_input`), and every distinct ticker is priced once
+    through `price_fetcher`. The resulting per-position values feed the distributions,
+    P&L, tables and any later analysis (risk, rebalancing, per-bucket breakdowns)
+    without further price lookups. Stages are timed through `profiler`. In live mode
+    `result['missing_fx']` lists FX pairs without a rate (those positions are valued at 0).
+    """
+    with profiler.stage('csv load'):
+        store = read_input(source, simple=simple)
+    missing_fx: List[str] = []
+    if simple:
+        value, cost = store.amount, None
+    else:
+        with profiler.stage('price resolution'):
+            value, cost = position_values(store, price_fetcher, base_currency=base_currency, fx=fx, missing_fx=missing_fx)
+    with profiler.stage('aggregation'):
+        result = summarize(store, value, cost)
+        if not simple:
+            result['base_currency'] = base_currency
+            result['missing_fx'] = missing_fx
+    with profiler.stage('tables'):
+        tables = build_tables(result)
+    return Portfolio(store, value, cost, result, None if simple else result, tables)
+
+
+def cached_pipeline(raw: bytes, simple: bool = False, base_currency: Optional[str] = None, cache=None,
+                    price_fetcher: Callable[[str, str], float] = get_current_price, ttl: float = VALUATION_TTL,
+                    records: Optional[List[dict]] = None, fx=None, max_rows: Optional[int] = None,
+                    profiler=NULL_PROFILER) -> Portfolio:
+    """
+    `run_pipeline` over a raw CSV upload or request body, through a shared
+    `utils.memory_cache.MemoryCache`: the caching layer behind both Streamlit apps and
+    the HTTP service.
+
+    The parsed holdings are kept by a content hash of `raw` and the mode, and the
+    valuation by that hash plus `base_currency`. Live valuations expire after `ttl`
+    seconds, since prices move; simple ones never do. `records` (rows already decoded
+    from a JSON body `raw`) replaces CSV parsing. Without a `cache` nothing is kept.
+    """
+    import io
+
+    import pandas as pd
+    from utils.memory_cache import MemoryCache, content_hash
+
+    cache = cache if cache is not None else MemoryCache(0)
+    key = content_hash(raw, records is not None, simple)
+
+    def parse():
+        with profiler.stage('csv load'):
+            source = pd.DataFrame(records) if records is not None else io.StringIO(raw.decode('utf-8-sig'))
+            return read_input(source, simple=simple, max_rows=max_rows)
+
+    def value():
+        store = cache.get_or_compute(('input', key), parse)
+        portfolio = run_pipeline(store, simple=simple, price_fetcher=price_fetcher, base_currency=base_currency,
+                                 fx=fx, profiler=profiler)
+        return portfolio._replace(key=key)
+
+    return cache.get_or_compute(('valuation', key, base_currency), value, ttl=None if simple else ttl)
+
+
+def bucket_breakdown(portfolio: Portfolio, bucket: str) -> Dict[str, float]:
+    """Value per asset within one bucket, from the already-computed position values."""
+    store = portfolio.store
+    try:
+        code = store.bucket.labels.index(bucket)
+    except ValueError:
+        return {}
+    mask = store.bucket.codes == code
+    totals = np.bincount(store.asset.codes[mask], weights=portfolio.value[mask], minlength=len(store.asset.labels))
+    return {label: v for label, v in zip(store.asset.labels, totals.tolist()) if v}
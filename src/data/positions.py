@@ -0,0 +1,217 @@
+import sys
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+# Values treated as "no label" for the categorical columns. The CSV loaders stringify
+# Bucket with astype(str), so NaN can arrive as the literal 'nan'.
+_MISSING = (None, '', 'nan', 'None', 'NaN')
+
+# Fallback labels, matching the defaults used by the dict-based analyzer functions
+DEFAULT_CATEGORY = 'Uncategorized'
+DEFAULT_BUCKET = 'Unbucketed'
+# Account label for positions loaded from a single file without an Account column
+DEFAULT_ACCOUNT = 'Default'
+
+
+def _clean(value) -> Optional[str]:
+    if value is None:
+        return None
+    if isinstance(value, float) and value != value:  # NaN
+        return None
+    text = str(value)
+    return None if text in _MISSING else text
+
+
+class Codes:
+    """
+    Interned categorical column: `codes[i]` indexes into `labels`.
+    """
+
+    __slots__ = ('codes', 'labels')
+
+    def __init__(self, codes: np.ndarray, labels: Tuple[str, ...]):
+        self.codes = codes
+        self.labels = labels
+
+    @classmethod
+    def from_values(cls, values: Iterable) -> 'Codes':
+        import pandas as pd
+
+        codes, uniques = pd.factorize(pd.Series(list(values), dtype=object), sort=False)
+        labels = tuple(sys.intern(str(u)) for u in uniques)
+        return cls(codes.astype(np.int32, copy=False), labels)
+
+    @classmethod
+    def concat(cls, parts: List['Codes']) -> 'Codes':
+        """Concatenate columns, merging label sets and remapping codes (no string work per row)."""
+        index: Dict[str, int] = {}
+        labels: List[str] = []
+        remapped = []
+        for part in parts:
+            mapping = np.empty(len(part.labels), dtype=np.int32)
+            for i, label in enumerate(part.labels):
+                code = index.get(label)
+                if code is None:
+                    code = index[label] = len(labels)
+                    labels.append(label)
+                mapping[i] = code
+            remapped.append(mapping[part.codes] if len(part.codes) else part.codes.astype(np.int32))
+        codes = np.concatenate(remapped) if remapped else np.empty(0, dtype=np.int32)
+        return cls(codes, tuple(labels))
+
+    @classmethod
+    def from_column(cls, values, default: Optional[str] = None) -> 'Codes':
+        """
+        Intern a DataFrame column, cleaning each distinct value once rather than once per
+        row (see `_clean`): factorize, clean the uniques, then merge uniques that clean to
+        the same label. Missing values become `default`; with `default=None` they keep a
+        None label, for callers that fill them per row. Labels stay in order of first
+        appearance, as with `from_values`.
+        """
+        import pandas as pd
+
+        codes, uniques = pd.factorize(values, sort=False, use_na_sentinel=False)
+        index: Dict[Optional[str], int] = {}
+        labels: List[Optional[str]] = []
+        mapping = np.empty(len(uniques), dtype=np.int32)
+        for i, value in enumerate(uniques.tolist()):
+            label = _clean(value)
+            label = default if label is None else sys.intern(label)
+            code = index.get(label)
+            if code is None:
+                code = index[label] = len(labels)
+                labels.append(label)
+            mapping[i] = code
+        return cls(mapping[codes] if len(codes) else np.empty(0, dtype=np.int32), tuple(labels))
+
+    @classmethod
+    def constant(cls, n: int, label: str) -> 'Codes':
+        return cls(np.zeros(n, dtype=np.int32), (label,) if n else ())
+
+    def __len__(self) -> int:
+        return len(self.codes)
+
+    def values(self) -> List[str]:
+        labels = self.labels
+        return [labels[c] for c in self.codes]
+
+
+class PositionStore:
+    """
+    Compact, column-oriented holdings.
+
+    Asset, Ticker, Category, Bucket and Account are stored as int32 codes into interned
+    label tuples; Quantity, Avg Buy Price and Amount are float64 arrays. A position costs
+    roughly 44 bytes instead of a few hundred for a row dict, and the analyzer
+    functions can aggregate with array operations instead of per-row `.get` lookups.
+
+    Account is the brokerage/account a position is held in. It defaults to
+    DEFAULT_ACCOUNT for every position when not given.
+    """
+
+    __slots__ = ('asset', 'ticker', 'category', 'bucket', 'quantity', 'avg_buy_price', 'amount', 'has_bucket', 'account')
+
+    def __init__(self, asset: Codes, ticker: Codes, category: Codes, bucket: Codes,
+                 quantity: np.ndarray, avg_buy_price: np.ndarray, amount: np.ndarray, has_bucket: bool = False,
+                 account: Optional[Codes] = None):
+        self.asset = asset
+        self.ticker = ticker
+        self.category = category
+        self.bucket = bucket
+        self.quantity = quantity
+        self.avg_buy_price = avg_buy_price
+        self.amount = amount
+        self.has_bucket = has_bucket
+        if account is None:
+            account = Codes(np.zeros(len(quantity), dtype=np.int32), (DEFAULT_ACCOUNT,))
+        self.account = account
+
+    @classmethod
+    def from_frame(cls, df, account: Optional[str] = None) -> 'PositionStore':
+        """
+        Build a store from a normalized DataFrame (see `utils.csv_loader`). Missing
+        Ticker falls back to Asset; missing Category/Bucket fall back to
+        'Uncategorized'/'Unbucketed', mirroring the dict-based analyzer. Rows without
+        an Account value are assigned to `account` (default DEFAULT_ACCOUNT).
+        """
+        import pandas as pd
+
+        n = len(df)
+
+        def column(name, default):
+            if name not in df.columns:
+                return Codes.constant(n, default)
+            return Codes.from_column(df[name], default)
+
+        assets = column('Asset', '')
+        if 'Ticker' in df.columns:
+            tickers = Codes.from_column(df['Ticker'])
+            if None in tickers.labels:
+                # Rows without a ticker fall back to their asset (per row, only when needed)
+                rows = np.array(tickers.labels, dtype=object)[tickers.codes]
+                missing = tickers.codes == tickers.labels.index(None)
+                rows[missing] = np.array(assets.labels, dtype=object)[assets.codes[missing]]
+                tickers = Codes.from_values(rows)
+        else:
+            tickers = assets
+        categories = column('Category', DEFAULT_CATEGORY)
+        buckets = column('Bucket', DEFAULT_BUCKET)
+        # A column of only missing (or explicitly 'Unbucketed') values carries no buckets
+        has_bucket = any(b != DEFAULT_BUCKET for b in buckets.labels)
+        accounts = column('Account', account or DEFAULT_ACCOUNT)
+
+        def numeric(name):
+            if name not in df.columns:
+                return np.zeros(n, dtype=np.float64)
+            return pd.to_numeric(df[name], errors='coerce').fillna(0).to_numpy(dtype=np.float64)
+
+        return cls(assets, tickers, categories, buckets, numeric('Quantity'), numeric('Avg Buy Price'),
+                   numeric('Amount'), has_bucket=has_bucket, account=accounts)
+
+    @classmethod
+    def from_records(cls, records: Iterable[dict], account: Optional[str] = None) -> 'PositionStore':
+        import pandas as pd
+
+        return cls.from_frame(pd.DataFrame(list(records)), account=account)
+
+    @classmethod
+    def concat(cls, stores: List['PositionStore']) -> 'PositionStore':
+        """Combine several stores (e.g. one per holdings file or account) into one."""
+        return cls(
+            Codes.concat([s.asset for s in stores]),
+            Codes.concat([s.ticker for s in stores]),
+            Codes.concat([s.category for s in stores]),
+            Codes.concat([s.bucket for s in stores]),
+            np.concatenate([s.quantity for s in stores]) if stores else np.empty(0),
+            np.concatenate([s.avg_buy_price for s in stores]) if stores else np.empty(0),
+            np.concatenate([s.amount for s in stores]) if stores else np.empty(0),
+            has_bucket=any(s.has_bucket for s in stores),
+            account=Codes.concat([s.account for s in stores]),
+        )
+
+    def __len__(self) -> int:
+        return len(self.quantity)
+
+    @property
+    def nbytes(self) -> int:
+        """Bytes held by the per-position arrays (labels are shared and excluded)."""
+        return sum(a.nbytes for a in (self.asset.codes, self.ticker.codes, self.category.codes, self.bucket.codes,
+                                      self.account.codes, self.quantity, self.avg_buy_price, self.amount))
+
+    def to_records(self) -> List[dict]:
+        """Expand back into row dicts for code that still expects the list-of-dicts shape."""
+        rows = []
+        for asset, ticker, category, bucket, account, qty, abp, amount in zip(
+                self.asset.values(), self.ticker.values(), self.category.values(), self.bucket.values(),
+                self.account.values(), self.quantity.tolist(), self.avg_buy_price.tolist(), self.amount.tolist()):
+            rows.append({'Asset': asset, 'Ticker': ticker, 'Category': category,
+                         'Bucket': bucket if self.has_bucket else None, 'Account': account,
+                         'Quantity': qty, 'Avg Buy Price': abp, 'Amount': amount})
+        return rows
+
+
+def group_sum(column: Codes, weights: np.ndarray) -> Dict[str, float]:
+    """Sum `weights` per label of `column`, preserving first-appearance label order."""
+    totals = np.bincount(column.codes, weights=weights, minlength=len(column.labels))
+    return dict(zip(column.labels, totals.tolist()))
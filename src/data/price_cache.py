@@ -0,0 +1,112 @@
+import json
+import os
+import threading
+import time
+from typing import Callable, Dict, Optional, Tuple
+
+from data.analyzer import get_current_price
+
+
+class PriceCache:
+    """
+    Process-wide, thread-safe price cache.
+
+    Instances are callables with the same `(ticker, asset) -> float` signature as
+    `get_current_price`, so they can be passed anywhere a `price_fetcher` is accepted.
+    Long-running processes (the HTTP service, watch mode) keep one instance warm so
+    repeated valuations skip the network for recently priced tickers.
+
+    Freshness is a plain `ttl` unless a `policy` (see `data.market_calendar.FreshnessPolicy`)
+    is given. With `path`, entries are loaded from and saved to a JSON file so separate
+    CLI runs can reuse a closed session's prices.
+    """
+
+    def __init__(self, price_fetcher: Callable[[str, str], float] = get_current_price, ttl: float = 60.0,
+                 policy=None, path: Optional[str] = None):
+        self.price_fetcher = price_fetcher
+        self.ttl = float(ttl)
+        self.policy = policy
+        self.path = path
+        self._lock = threading.Lock()
+        self._entries: Dict[Tuple[str, str], Tuple[float, float]] = {}
+        self.hits = 0
+        self.misses = 0
+        if path:
+            self.load()
+
+    @staticmethod
+    def _key(ticker: str, asset: str) -> Tuple[str, str]:
+        # Mirror the sanitizing done by get_current_price so '$AAPL' and 'AAPL ' share an entry
+        t = str(ticker or '').lstrip('$').strip().upper()
+        a = str(asset or '').strip().upper()
+        return t, a
+
+    def _is_fresh(self, key: Tuple[str, str], fetched_at: float, now: float) -> bool:
+        if self.policy is not None:
+            return self.policy.is_fresh(key[0], key[1], fetched_at, now)
+        return (now - fetched_at) < self.ttl
+
+    def get(self, ticker: str, asset: str) -> Optional[float]:
+        """Return the cached price if it is still fresh, otherwise None (no fetch)."""
+        key = self._key(ticker, asset)
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry is None:
+            return None
+        price, fetched_at = entry
+        return price if self._is_fresh(key, fetched_at, time.time()) else None
+
+    def put(self, ticker: str, asset: str, price: float) -> None:
+        with self._lock:
+            self._entries[self._key(ticker, asset)] = (float(price), time.time())
+
+    def __call__(self, ticker: str, asset: str) -> float:
+        price = self.get(ticker, asset)
+        if price is not None:
+            with self._lock:
+                self.hits += 1
+            return price
+
+        with self._lock:
+            self.misses += 1
+        price = float(self.price_fetcher(ticker, asset))
+        # Don't pin failed lookups (0.0) in the cache; the next request should retry
+        if price > 0:
+            self.put(ticker, asset, price)
+        return price
+
+    def load(self) -> None:
+        """Merge entries from `path` (missing or unreadable files are ignored)."""
+        try:
+            with open(self.path, 'r', encoding='utf-8') as fh:
+                rows = json.load(fh)
+        except Exception:
+            return
+        with self._lock:
+            for row in rows:
+                try:
+                    self._entries[(row['ticker'], row['asset'])] = (float(row['price']), float(row['fetched_at']))
+                except Exception:
+                    continue
+
+    def save(self) -> None:
+        """Write all entries to `path` atomically (no-op without a path)."""
+        if not self.path:
+            return
+        with self._lock:
+            rows = [{'ticker': t, 'asset': a, 'price': p, 'fetched_at': ts} for (t, a), (p, ts) in self._entries.items()]
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        tmp = self.path + '.tmp'
+        with open(tmp, 'w', encoding='utf-8') as fh:
+            json.dump(rows, fh)
+        os.replace(tmp, self.path)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            return {'entries': len(self._entries), 'hits': self.hits, 'misses': self.misses, 'ttl': self.ttl}
@@ -0,0 +1,174 @@
+import abc
+import json
+import os
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+
+import data.analyzer as analyzer
+import data.fx as fx
+import data.risk as risk
+
+# Recordable sources: name -> (module, attribute). The analyzer sources back
+# get_current_price; 'history' is the batched daily-close request behind
+# `risk.PriceHistory`; 'fx' is the batched FX request behind the shared `fx.fx_rates`.
+SOURCES = {
+    'coingecko': (analyzer, 'fetch_coingecko_price'),
+    'yfinance': (analyzer, 'fetch_yfinance_close'),
+    'yahoo_http': (analyzer, 'fetch_yahoo_quote'),
+    'history': (risk, 'fetch_price_history'),
+}
+
+FIXTURE_VERSION = 1
+LATENCY_MODES = ('zero', 'recorded')
+
+
+def _args_key(args) -> str:
+    return json.dumps(list(args), sort_keys=True)
+
+
+class _SourcePatch(abc.ABC):
+    """
+    Swap every source (and the shared FX fetcher) for wrappers; restore on exit.
+    Patches nest: an inner patch wraps whatever the outer one installed.
+    """
+
+    @abc.abstractmethod
+    def _wrap(self, name, original):
+        """Return the callable installed in place of source `name`, wrapping `original`."""
+
+    def __enter__(self):
+        self._originals = []
+        for name, (module, attr) in SOURCES.items():
+            original = getattr(module, attr)
+            self._originals.append((module, attr, original))
+            setattr(module, attr, self._wrap(name, original))
+        self._fx_original = fx.fx_rates.fetcher
+        fx.fx_rates.fetcher = self._wrap('fx', self._fx_original)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        for module, attr, original in self._originals:
+            setattr(module, attr, original)
+        fx.fx_rates.fetcher = self._fx_original
+        return False
+
+
+class PriceRecorder(_SourcePatch):
+    """
+    Record every CoinGecko, yfinance, Yahoo HTTP, price history and FX request made inside
+    the `with` block, with its result (or error) and wall-clock latency, to a JSON fixture
+    at `path`.
+
+        with PriceRecorder('fixtures/prices.json'):
+            calculate_valuation(store, price_fetcher=get_current_price)
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.calls: List[dict] = []
+        self._lock = threading.Lock()
+
+    def _wrap(self, name, original):
+        def recorded(*args):
+            start = time.perf_counter()
+            try:
+                result = original(*args)
+            except Exception as exc:
+                self._append(name, args, None, f'{type(exc).__name__}: {exc}', time.perf_counter() - start)
+                raise
+            self._append(name, args, result, None, time.perf_counter() - start)
+            return result
+        return recorded
+
+    def _append(self, source, args, result, error, elapsed):
+        with self._lock:
+            self.calls.append({'source': source, 'args': list(args), 'result': result, 'error': error, 'elapsed': elapsed})
+
+    def save(self) -> None:
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        with self._lock:
+            fixture = {
+                'version': FIXTURE_VERSION,
+                'recorded_at': datetime.now(timezone.utc).isoformat(),
+                'calls': list(self.calls),
+            }
+        with open(self.path, 'w', encoding='utf-8') as fh:
+            json.dump(fixture, fh, indent=1)
+
+    def __exit__(self, exc_type, exc, tb):
+        super().__exit__(exc_type, exc, tb)
+        self.save()
+        return False
+
+
+class PriceReplayer(_SourcePatch):
+    """
+    Serve recorded responses instead of hitting the network. Inside the `with` block the
+    real `get_current_price` logic runs unchanged; only the source calls are replayed.
+
+    - latency='zero' returns immediately; 'recorded' sleeps for each call's recorded time.
+    - Repeated identical requests replay their recordings in order, then repeat the last.
+    - Requests missing from the fixture raise LookupError, which the price chain treats
+      like any other source failure.
+    """
+
+    def __init__(self, path: str, latency: str = 'zero'):
+        if latency not in LATENCY_MODES:
+            raise ValueError(f"latency must be one of {LATENCY_MODES}, got '{latency}'")
+        with open(path, 'r', encoding='utf-8') as fh:
+            fixture = json.load(fh)
+        if fixture.get('version') != FIXTURE_VERSION:
+            raise ValueError(f"Unsupported price fixture version: {fixture.get('version')}")
+        self.path = path
+        self.latency = latency
+        self._lock = threading.Lock()
+        self._responses: Dict[Tuple[str, str], List[dict]] = defaultdict(list)
+        for call in fixture.get('calls', []):
+            self._responses[(call['source'], _args_key(call['args']))].append(call)
+        self._cursor: Dict[Tuple[str, str], int] = defaultdict(int)
+        self.misses: List[Tuple[str, list]] = []
+
+    def _next(self, source: str, args) -> Optional[dict]:
+        key = (source, _args_key(args))
+        with self._lock:
+            recorded = self._responses.get(key)
+            if not recorded:
+                self.misses.append((source, list(args)))
+                return None
+            idx = min(self._cursor[key], len(recorded) - 1)
+            self._cursor[key] += 1
+            return recorded[idx]
+
+    def _wrap(self, name, original):
+        def replayed(*args):
+            call = self._next(name, args)
+            if call is None:
+                raise LookupError(f'No recorded {name} response for {list(args)}')
+            if self.latency == 'recorded':
+                time.sleep(call.get('elapsed') or 0.0)
+            if call.get('error'):
+                raise RuntimeError(call['error'])
+            return call['result']
+        return replayed
+
+
+class SourceTimer(_SourcePatch):
+    """
+    Time every source request made inside the `with` block and report each one to
+    `profiler` (see `utils.profiling.Profiler`) as a 'source' span named after the source.
+    """
+
+    def __init__(self, profiler):
+        self.profiler = profiler
+
+    def _wrap(self, name, original):
+        def timed(*args):
+            start = time.perf_counter()
+            try:
+                return original(*args)
+            finally:
+                self.profiler.add(name, time.perf_counter() - start, start=start, category='source')
+        return timed
@@ -0,0 +1,149 @@
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from data.positions import DEFAULT_ACCOUNT, DEFAULT_BUCKET, DEFAULT_CATEGORY, PositionStore, group_sum
+
+# Group-by dimensions a target allocation can be set on, as PositionStore attributes
+DIMENSIONS = ('bucket', 'category', 'account')
+
+
+def load_targets(path: str):
+    """
+    Load target allocations from a CSV with a Bucket, Category or Account column and a
+    Target column in percent, e.g.
+
+        Bucket,Target
+        Long-Term,70
+        Trade,20
+        Cash,10
+
+    Returns (dimension, {label: target_pct}).
+    """
+    import pandas as pd
+
+    df = pd.read_csv(path)
+    df.columns = [str(c).strip() for c in df.columns]
+    columns = {c.lower(): c for c in df.columns}
+    dimension = next((d for d in DIMENSIONS if d in columns), None)
+    if dimension is None or 'target' not in columns:
+        raise ValueError(f"Targets CSV must contain a Bucket, Category or Account column and a Target column. Found: {df.columns.tolist()}")
+    labels = df[columns[dimension]].astype(str).str.strip()
+    pcts = pd.to_numeric(df[columns['target']].astype(str).str.rstrip('%'), errors='coerce').fillna(0)
+    return dimension, dict(zip(labels.tolist(), pcts.astype(float).tolist()))
+
+
+def rebalance_trades(distribution: Dict[str, float], targets: Dict[str, float], cash_flow: float = 0.0) -> Dict[str, Dict[str, float]]:
+    """
+    Trades that move `distribution` (label -> value) to `targets` (label -> percent).
+
+    Targets must add up to 100%. Labels held but not targeted get a 0% target (sell
+    all), and targeted labels not held start from 0 (buy in). `cash_flow` is new money
+    (positive) or a withdrawal (negative) to deploy while rebalancing. Returns label ->
+    {'value', 'current_pct', 'target_pct', 'target_value', 'trade'}, where a positive
+    trade means buy.
+    """
+    total_pct = float(sum(targets.values()))
+    if abs(total_pct - 100.0) > 0.01:
+        raise ValueError(f'Targets must add up to 100%, got {total_pct:g}%')
+    current_total = float(sum(distribution.values()))
+    new_total = current_total + cash_flow
+    out: Dict[str, Dict[str, float]] = {}
+    for label in list(distribution) + [k for k in targets if k not in distribution]:
+        value = float(distribution.get(label, 0.0))
+        target_pct = float(targets.get(label, 0.0))
+        target_value = new_total * target_pct / 100.0
+        out[label] = {
+            'value': value,
+            'current_pct': value / current_total * 100.0 if current_total else 0.0,
+            'target_pct': target_pct,
+            'target_value': target_value,
+            'trade': target_value - value,
+        }
+    return out
+
+
+class WhatIf:
+    """
+    Incremental what-if state over a valued portfolio.
+
+    Built once from a store and its per-position values (one O(positions) pass). After
+    that, `trade()` only touches the four totals the position belongs to, and
+    `set_target()` only touches one entry. `distributions()` and `trades()` therefore
+    cost O(groups), not O(positions), and need no price lookups. That keeps each tweak
+    in the Streamlit app at a few milliseconds on large books.
+    """
+
+    def __init__(self, store: PositionStore, value: np.ndarray, dimension: str = 'bucket',
+                 targets: Optional[Dict[str, float]] = None):
+        if dimension not in DIMENSIONS:
+            raise ValueError(f"dimension must be one of {DIMENSIONS}, got '{dimension}'")
+        value = np.asarray(value, dtype=np.float64)
+        self.dimension = dimension
+        self._base = {
+            'asset': group_sum(store.asset, value),
+            'category': group_sum(store.category, value),
+            'bucket': group_sum(store.bucket, value),
+            'account': group_sum(store.account, value),
+        }
+        # Default membership of each asset (its first position) for trades that don't say
+        first = {}
+        asset_codes = store.asset.codes
+        _, idx = np.unique(asset_codes, return_index=True)
+        for i in idx.tolist():
+            first[store.asset.labels[asset_codes[i]]] = {
+                'category': store.category.labels[store.category.codes[i]],
+                'bucket': store.bucket.labels[store.bucket.codes[i]],
+                'account': store.account.labels[store.account.codes[i]],
+            }
+        self._membership = first
+        self.targets: Dict[str, float] = dict(targets or {})
+        self.reset()
+
+    def baseline(self, dimension: str) -> Dict[str, float]:
+        """Pre-trade totals for `dimension` ('asset' or one of DIMENSIONS)."""
+        return self._base[dimension]
+
+    def reset(self) -> None:
+        """Drop all hypothetical trades."""
+        self._totals = {dim: dict(values) for dim, values in self._base.items()}
+        self.applied: List[dict] = []
+
+    def trade(self, asset: str, amount: float, category: Optional[str] = None,
+              bucket: Optional[str] = None, account: Optional[str] = None) -> None:
+        """
+        Apply a hypothetical buy (positive `amount`, in value terms) or sell (negative).
+        An asset already held defaults to the category/bucket/account of its first
+        position. A new asset must name at least its category or bucket.
+        """
+        member = self._membership.get(asset)
+        if member is None and category is None and bucket is None:
+            raise ValueError(f"New asset '{asset}' needs a category or bucket")
+        member = member or {}
+        row = {
+            'asset': asset,
+            'category': category or member.get('category') or DEFAULT_CATEGORY,
+            'bucket': bucket or member.get('bucket') or DEFAULT_BUCKET,
+            'account': account or member.get('account') or DEFAULT_ACCOUNT,
+        }
+        amount = float(amount)
+        for dim, label in row.items():
+            totals = self._totals[dim]
+            totals[label] = totals.get(label, 0.0) + amount
+        self.applied.append(dict(row, amount=amount))
+
+    def set_target(self, label: str, pct: float) -> None:
+        self.targets[label] = float(pct)
+
+    def distributions(self) -> Dict[str, Dict[str, float]]:
+        """Current (post-trade) distributions, in the shape of `calculate_from_values`."""
+        return {
+            'asset_values': self._totals['asset'],
+            'category_distribution': self._totals['category'],
+            'bucket_distribution': self._totals['bucket'],
+            'account_distribution': self._totals['account'],
+        }
+
+    def trades(self, cash_flow: float = 0.0) -> Dict[str, Dict[str, float]]:
+        """Trades from the post-trade state to `targets` (see `rebalance_trades`)."""
+        return rebalance_trades(self._totals[self.dimension], self.targets, cash_flow=cash_flow)
@@ -0,0 +1,324 @@
+import os
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from data.analyzer import price_key, unique_pairs
+from data.fx import FETCH_ERRORS, MINOR_UNITS, fx_symbol, quote_currency
+from data.positions import PositionStore, group_sum
+
+TRADING_DAYS = 252
+# Risk window in calendar days. Returns are annualized by how many closes a year the
+# window actually holds (about 252 for equities alone, 365 once crypto trades weekends).
+LOOKBACK_DAYS = 365
+# Tickers whose Yahoo daily history lives under a different symbol (same map as the
+# CoinGecko lookup in get_current_price)
+HISTORY_SYMBOLS = {'BTC': 'BTC-USD', 'ETH': 'ETH-USD'}
+
+
+def history_symbol(ticker: str, asset: str) -> Optional[str]:
+    """
+    Yahoo symbol with the daily history for a holding, or None when it has no market
+    price history (CASH, 'Other'). CASH is treated as riskless rather than missing.
+    """
+    t, special = price_key(ticker, asset)
+    if special or not t:
+        return None
+    return HISTORY_SYMBOLS.get(t, t)
+
+
+def fetch_price_history(symbols: List[str], period: str = '1y') -> Dict[str, Dict[str, float]]:
+    """
+    Fetch daily closes for several Yahoo symbols in one batched request.
+    Returns {symbol: {'YYYY-MM-DD': close}} for the symbols that resolved.
+    """
+    out: Dict[str, Dict[str, float]] = {}
+    if not symbols:
+        return out
+    try:
+        import yfinance as yf
+
+        frame = yf.download(list(symbols), period=period, interval='1d', progress=False, auto_adjust=True, threads=True)
+        closes = frame['Close'] if 'Close' in frame else frame
+        if not hasattr(closes, 'columns'):
+            closes = closes.to_frame(symbols[0])
+        dates = [d.strftime('%Y-%m-%d') for d in closes.index]
+        for sym in symbols:
+            if sym in closes.columns:
+                series = {d: float(v) for d, v in zip(dates, closes[sym].tolist()) if v == v}
+                if series:
+                    out[sym] = series
+    except Exception:
+        pass
+    return out
+
+
+class PriceHistory:
+    """
+    Local cache of daily closes for every symbol a portfolio holds.
+
+    Closes are kept as one (dates x symbols) float64 matrix with NaN gaps. The matrix is
+    stored in a single `.npz` file, so loading the history of a few thousand symbols is
+    one read. Symbols that are missing or older than `max_age` seconds are refreshed with
+    one batched `fetch_price_history` call. Failed symbols are not retried until `max_age`
+    has passed.
+    """
+
+    def __init__(self, path: Optional[str] = None, period: str = '1y', max_age: float = 12 * 3600.0):
+        self.path = path
+        self.period = period
+        self.max_age = float(max_age)
+        self._lock = threading.Lock()
+        self.dates = np.empty(0, dtype='datetime64[D]')
+        self.symbols: List[str] = []
+        self.closes = np.empty((0, 0), dtype=np.float64)
+        self.fetched_at = np.empty(0, dtype=np.float64)
+        if path:
+            self.load()
+
+    def load(self) -> None:
+        """Load the cached matrix from `path` (missing or unreadable files are ignored)."""
+        try:
+            with np.load(self.path, allow_pickle=False) as cached:
+                dates, symbols = cached['dates'], cached['symbols'].tolist()
+                closes, fetched_at = cached['closes'], cached['fetched_at']
+        except Exception:
+            return
+        with self._lock:
+            self.dates, self.symbols, self.closes, self.fetched_at = dates, symbols, closes, fetched_at
+
+    def save(self) -> None:
+        """Write the matrix to `path` atomically (no-op without a path)."""
+        if not self.path:
+            return
+        with self._lock:
+            arrays = {'dates': self.dates, 'symbols': np.array(self.symbols, dtype=str),
+                      'closes': self.closes, 'fetched_at': self.fetched_at}
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        tmp = self.path + '.tmp.npz'
+        np.savez(tmp, **arrays)
+        os.replace(tmp, self.path)
+
+    def _merge(self, fetched: Dict[str, Dict[str, float]], requested: List[str], now: float) -> None:
+        new_dates = {d for series in fetched.values() for d in series}
+        dates = np.union1d(self.dates, np.array(sorted(new_dates), dtype='datetime64[D]'))
+        known = set(self.symbols)
+        symbols = list(self.symbols) + [s for s in requested if s not in known]
+        index = {s: i for i, s in enumerate(symbols)}
+        closes = np.full((len(dates), len(symbols)), np.nan)
+        fetched_at = np.zeros(len(symbols))
+        if self.closes.size:
+            rows = np.searchsorted(dates, self.dates)
+            closes[np.ix_(rows, np.arange(len(self.symbols)))] = self.closes
+        fetched_at[:len(self.fetched_at)] = self.fetched_at
+        for sym in requested:
+            col = index[sym]
+            fetched_at[col] = now
+            series = fetched.get(sym)
+            if not series:
+                continue
+            rows = np.searchsorted(dates, np.array(list(series), dtype='datetime64[D]'))
+            closes[:, col] = np.nan
+            closes[rows, col] = list(series.values())
+        self.dates, self.symbols, self.closes, self.fetched_at = dates, symbols, closes, fetched_at
+
+    def matrix(self, symbols: List[str], refresh: bool = False) -> np.ndarray:
+        """
+        Return the (dates x len(symbols)) close matrix for `symbols`, fetching stale or
+        missing ones first. Columns for symbols with no history are all-NaN.
+        """
+        return self.frame(symbols, refresh=refresh)[1]
+
+    def frame(self, symbols: List[str], refresh: bool = False) -> Tuple[np.ndarray, np.ndarray]:
+        """`matrix` together with its row dates, read consistently under the lock."""
+        now = time.time()
+        with self._lock:
+            index = {s: i for i, s in enumerate(self.symbols)}
+            stale = sorted({s for s in symbols
+                            if refresh or s not in index or now - self.fetched_at[index[s]] > self.max_age})
+        if stale:
+            # Positional call so data.price_replay can record/replay it like the price sources
+            try:
+                fetched = fetch_price_history(stale, self.period)
+            except FETCH_ERRORS:
+                # A failed batch (e.g. a replay miss) leaves those symbols without history
+                fetched = {}
+            with self._lock:
+                self._merge(fetched, stale, now)
+            self.save()
+        with self._lock:
+            index = {s: i for i, s in enumerate(self.symbols)}
+            cols = np.array([index[s] for s in symbols], dtype=np.int64)
+            return self.dates, self.closes[:, cols] if len(cols) else np.empty((len(self.dates), 0))
+
+
+def _forward_fill(closes: np.ndarray) -> np.ndarray:
+    """Forward-fill NaNs column-wise (leading NaNs stay NaN)."""
+    valid = ~np.isnan(closes)
+    last = np.where(valid, np.arange(closes.shape[0])[:, None], 0)
+    np.maximum.accumulate(last, axis=0, out=last)
+    return closes[last, np.arange(closes.shape[1])]
+
+
+def daily_returns(closes: np.ndarray, dates: np.ndarray, lookback_days: int = LOOKBACK_DAYS) -> Tuple[np.ndarray, float]:
+    """
+    Daily returns over the last `lookback_days` calendar days of a (dates x symbols)
+    close matrix, and the number of return periods per year in that window.
+
+    Dates on which none of the symbols closed are dropped. Each symbol's return runs
+    from its own previous close, so on days it does not trade (weekends for equities
+    held next to crypto, holidays) its return is zero and the next one spans the gap.
+    A year of rows therefore sums to each symbol's own annual variance, whatever its
+    calendar, which is why variances are annualized by rows per year, not a fixed 252.
+    """
+    traded = ~np.isnan(closes).all(axis=1)
+    closes, dates = closes[traded], dates[traded]
+    if len(dates):
+        recent = dates > dates[-1] - np.timedelta64(lookback_days, 'D')
+        closes, dates = closes[recent], dates[recent]
+    if closes.shape[0] < 2:
+        return np.zeros((0, closes.shape[1])), float(TRADING_DAYS)
+    filled = _forward_fill(closes)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        returns = filled[1:] / filled[:-1] - 1.0
+    returns[~np.isfinite(returns)] = 0.0
+    span = int((dates[-1] - dates[0]).astype(np.int64))
+    return returns, returns.shape[0] * 365.25 / span
+
+
+def _hhi(weights: np.ndarray) -> float:
+    return float(np.sum(weights ** 2))
+
+
+def calculate_risk(store: PositionStore, value: np.ndarray, history: PriceHistory,
+                   lookback_days: int = LOOKBACK_DAYS, max_correlation: int = 25, refresh: bool = False,
+                   base_currency: Optional[str] = None) -> Dict:
+    """
+    Risk and concentration for a whole book from daily returns, in one vectorized pass.
+
+    `value` is the current value of every position in `store` (e.g. Quantity * price, or
+    Amount in simple mode). Positions are pooled per instrument, so a ticker held in
+    several accounts or categories counts once. Returns are measured in each
+    instrument's quote currency unless `base_currency` is given. In that case each
+    instrument's daily FX close (e.g. INRUSD=X) is fetched in the same batched history
+    request, and the instrument's closes are converted before computing returns, so FX
+    moves count as risk. Returns:
+
+    - 'volatility': annualized portfolio volatility (fraction, e.g. 0.18).
+    - 'category_risk': category -> {'weight', 'risk_contribution', 'risk_share'}.
+      Euler contributions (w_i * (Σw)_i / σ) sum to the portfolio volatility, so
+      'risk_share' sums to 1.
+    - 'hhi' / 'effective_holdings': Herfindahl index of instrument weights and its
+      inverse; 'category_hhi' is the same over categories.
+    - 'correlation': {'labels', 'matrix'} for the `max_correlation` largest instruments.
+    - 'missing': symbols without price history, treated as zero-return. FX symbols
+      without history are listed too; their holdings keep quote-currency returns.
+    - 'periods' / 'periods_per_year': daily returns used, and how many a year the
+      window holds (the annualization factor, see `daily_returns`).
+
+    The covariance matrix is never materialized: Σw is computed as Rᵀ(Rw)/(T-1) on the
+    demeaned returns matrix R, which is O(T·N) for N instruments and T days.
+    """
+    value = np.asarray(value, dtype=np.float64)
+    total = float(value.sum())
+    keys: Dict[str, int] = {}
+    symbols: List[str] = []
+    labels: List[str] = []
+    pairs, inverse = unique_pairs(store)
+    pair_inst = np.empty(len(pairs), dtype=np.int64)
+    for i, (t, a) in enumerate(pairs):
+        sym = history_symbol(t, a)
+        key = sym if sym is not None else price_key(t, a)[1] or a
+        j = keys.get(key)
+        if j is None:
+            j = keys[key] = len(labels)
+            labels.append(key)
+            symbols.append(sym)
+        pair_inst[i] = j
+    inst = pair_inst[inverse]
+
+    n = len(labels)
+    weights = np.bincount(inst, weights=value, minlength=n) / total if total else np.zeros(n)
+    priced = [j for j, s in enumerate(symbols) if s is not None]
+    # FX symbol converting each priced instrument's quote currency into base_currency
+    fx_symbols: List[Optional[str]] = [None] * len(priced)
+    if base_currency:
+        base = base_currency.upper()
+        currency = {}
+        for (t, a), j in zip(pairs, pair_inst.tolist()):
+            currency.setdefault(j, quote_currency(t, a))
+        for k, j in enumerate(priced):
+            major = MINOR_UNITS.get(currency[j], (currency[j].upper(), 1.0))[0]
+            fx_symbols[k] = fx_symbol(major, base) if major != base else None
+    conversions = sorted({s for s in fx_symbols if s})
+
+    returns = np.zeros((0, n))
+    missing: List[str] = []
+    periods_per_year = float(TRADING_DAYS)
+    if priced:
+        # One batched history request covers the instruments and their FX pairs
+        dates, matrix = history.frame([symbols[j] for j in priced] + conversions, refresh=refresh)
+        closes, fx_closes = matrix[:, :len(priced)], matrix[:, len(priced):]
+        missing = [symbols[j] for j, col in zip(priced, closes.T) if np.isnan(col).all()]
+        missing += [s for s, col in zip(conversions, fx_closes.T) if np.isnan(col).all()]
+        if conversions:
+            # Convert at the latest FX close on or before each close; minor-unit scaling
+            # is a constant factor and does not change returns
+            fx_index = {s: i for i, s in enumerate(conversions)}
+            fx_filled = _forward_fill(fx_closes)
+            for k, sym in enumerate(fx_symbols):
+                if sym and sym not in missing:
+                    closes[:, k] = closes[:, k] * fx_filled[:, fx_index[sym]]
+        priced_returns, periods_per_year = daily_returns(closes, dates, lookback_days)
+        returns = np.zeros((priced_returns.shape[0], n))
+        returns[:, priced] = priced_returns
+
+    periods = returns.shape[0]
+    if periods > 1:
+        demeaned = returns - returns.mean(axis=0)
+        sigma_w = demeaned.T @ (demeaned @ weights) / (periods - 1) * periods_per_year
+    else:
+        demeaned = returns
+        sigma_w = np.zeros(n)
+    variance = float(weights @ sigma_w)
+    volatility = variance ** 0.5 if variance > 0 else 0.0
+
+    # Euler allocation per position, then grouped by category
+    marginal = sigma_w / volatility if volatility else np.zeros(n)
+    position_weight = value / total if total else np.zeros(len(store))
+    contribution = position_weight * marginal[inst]
+    category_weight = group_sum(store.category, position_weight)
+    category_contribution = group_sum(store.category, contribution)
+    category_risk = {
+        cat: {'weight': category_weight[cat], 'risk_contribution': category_contribution[cat],
+              'risk_share': category_contribution[cat] / volatility if volatility else 0.0}
+        for cat in category_weight
+    }
+
+    # Largest priced instruments only; CASH has no returns to correlate
+    ranked = np.argsort(-weights)
+    top = np.array([j for j in ranked.tolist() if weights[j] > 0 and symbols[j] is not None][:max_correlation], dtype=np.int64)
+    if periods > 1 and len(top):
+        std = demeaned[:, top].std(axis=0, ddof=1)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            corr = np.corrcoef(demeaned[:, top], rowvar=False) if len(top) > 1 else np.ones((1, 1))
+        corr = np.where(np.outer(std, std) > 0, corr, 0.0)
+        np.fill_diagonal(corr, 1.0)
+    else:
+        corr = np.eye(len(top))
+
+    category_weights = np.array(list(category_weight.values()))
+    hhi = _hhi(weights)
+    return {
+        'volatility': volatility,
+        'category_risk': category_risk,
+        'hhi': hhi,
+        'effective_holdings': 1.0 / hhi if hhi else 0.0,
+        'category_hhi': _hhi(category_weights),
+        'correlation': {'labels': [labels[j] for j in top.tolist()], 'matrix': np.atleast_2d(corr).tolist()},
+        'missing': missing,
+        'periods': periods,
+        'periods_per_year': periods_per_year,
+    }
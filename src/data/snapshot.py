@@ -0,0 +1,69 @@
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from data.analyzer import unique_pairs
+from data.fx import MINOR_UNITS, FxRates, fx_rates, fx_symbol, quote_currency
+from data.pipeline import Portfolio, run_pipeline
+from data.positions import PositionStore
+from data.risk import history_symbol
+
+
+def session_symbols(stores: Dict[str, PositionStore], base_currency: Optional[str] = None) -> List[str]:
+    """
+    Daily-history symbols (see `data.risk.history_symbol`) of every instrument the
+    portfolios hold, plus each FX pair into `base_currency`.
+    """
+    pairs = {p for store in stores.values() for p in unique_pairs(store)[0]}
+    symbols = {sym for t, a in pairs for sym in [history_symbol(t, a)] if sym}
+    if base_currency:
+        majors = {MINOR_UNITS.get(c, (c.upper(), 1.0))[0] for c in {quote_currency(t, a) for t, a in pairs}}
+        symbols |= {fx_symbol(c, base_currency) for c in majors if c != base_currency}
+    return sorted(symbols)
+
+
+def session_closes(symbols: List[str], session: str, price_history) -> Dict[str, float]:
+    """
+    Symbol -> last close on or before `session`, from one batched `price_history`
+    request (see `data.risk.PriceHistory`). Symbols without a close are left out.
+    """
+    dates, matrix = price_history.frame(symbols, refresh=True) if symbols else (None, None)
+    if matrix is None or not matrix.size:
+        return {}
+    # Crypto and FX also trade after the session; keep only closes up to its date
+    matrix = matrix[dates <= np.datetime64(session)]
+    valid = ~np.isnan(matrix)
+    last = np.where(valid.any(axis=0), matrix.shape[0] - 1 - np.argmax(valid[::-1], axis=0), -1)
+    return {sym: float(matrix[row, col]) for col, (sym, row) in enumerate(zip(symbols, last.tolist())) if row >= 0}
+
+
+def value_at_close(stores: Dict[str, PositionStore], session: str, price_history,
+                   price_fetcher: Callable[[str, str], float], base_currency: Optional[str] = None,
+                   simple: bool = False, fx_fetcher=None) -> Iterator[Tuple[str, Optional[Portfolio], Optional[Exception]]]:
+    """
+    Value each portfolio at the `session` close. Yields (name, portfolio, None), or
+    (name, None, error) for a portfolio that failed to value.
+
+    Every instrument and FX pair is priced from one batched daily-close request (see
+    `session_closes`). Holdings without a daily history (CASH, funds Yahoo has no chart
+    for) fall back to `price_fetcher`, and FX pairs without one to `fx_fetcher` (live
+    rates from `data.fx.fx_rates` by default).
+    """
+    closes = session_closes(session_symbols(stores, base_currency), session, price_history) if not simple and stores else {}
+
+    def fx_closes(fx_syms):
+        live = [s for s in fx_syms if s not in closes]
+        fetch = fx_fetcher or fx_rates.fetcher
+        return {**(fetch(live) if live else {}), **{s: closes[s] for s in fx_syms if s in closes}}
+
+    def eod_price(ticker, asset):
+        sym = history_symbol(ticker, asset)
+        return closes[sym] if sym in closes else price_fetcher(ticker, asset)
+
+    session_fx = FxRates(fx_closes)
+    for name, store in stores.items():
+        try:
+            yield name, run_pipeline(store, simple=simple, price_fetcher=eod_price, base_currency=base_currency,
+                                     fx=session_fx), None
+        except Exception as exc:
+            yield name, None, exc
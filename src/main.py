@@ -1,3 +1,6 @@
+import time
+_IMPORT_START = time.perf_counter()
+
 import os
 import argparse
 # If DISPLAY is not set, switch Matplotlib to a non-interactive backend to avoid hangs on headless systems
@@ -5,47 +8,373 @@ if os.environ.get('DISPLAY', '') == '':
     import matplotlib
     matplotlib.use('Agg')
 
-from utils.csv_loader import load_csv_data
-from data.analyzer import calculate_asset_values, calculate_category_distribution
-from visualization.pie_charts import generate_pie_charts
+from data.pipeline import run_pipeline
+from visualization.pie_charts import build_pie_figure, save_figure, show_or_save_figure
+from data.risk import calculate_risk
+from utils.profiling import NULL_PROFILER, Profiler
+
+_IMPORT_SECONDS = time.perf_counter() - _IMPORT_START
+
+
+def _format_pct(pct):
+    return 'n/a' if pct is None else f'{pct:+.1f}%'
+
+
+def print_pnl(result):
+    """
+    Print unrealized P&L (cost, value, P&L, P&L %) per asset, category and bucket,
+    and per account when several accounts were consolidated.
+    """
+    sections = [('ASSET P&L', 'asset_pnl'), ('CATEGORY P&L', 'category_pnl'), ('BUCKET P&L', 'bucket_pnl')]
+    if len(result.get('account_pnl', {})) > 1:
+        sections.append(('ACCOUNT P&L', 'account_pnl'))
+    for title, key in sections:
+        print(f'\n{title} (cost value pnl pnl%)')
+        for k, row in result[key].items():
+            pnl = 'n/a' if row['pnl'] is None else round(row['pnl'], 2)
+            print(k, round(row['cost'], 2), round(row['value'], 2), pnl, _format_pct(row['pnl_pct']))
+
+
+def print_risk(risk):
+    """
+    Print portfolio volatility, concentration and per-category risk contribution.
+    """
+    print('\nRISK')
+    print(f"Volatility (annualized) {risk['volatility'] * 100:.1f}% over {risk['periods']} days")
+    print(f"HHI {risk['hhi']:.4f} (effective holdings {risk['effective_holdings']:.1f}), category HHI {risk['category_hhi']:.4f}")
+    print('\nCATEGORY RISK (weight risk-share)')
+    for k, row in sorted(risk['category_risk'].items(), key=lambda x: x[1]['risk_share'], reverse=True):
+        print(k, f"{row['weight'] * 100:.1f}%", f"{row['risk_share'] * 100:.1f}%")
+    if risk['missing']:
+        print(f"No price history (treated as flat): {', '.join(risk['missing'])}")
+
+
+def print_rebalance(trades, dimension):
+    """
+    Print current vs target allocation and the trade (buy +, sell -) per group.
+    """
+    print(f'\nREBALANCE BY {dimension.upper()} (current% target% trade)')
+    for k, row in trades.items():
+        print(k, f"{row['current_pct']:.1f}%", f"{row['target_pct']:.1f}%", f"{row['trade']:+.2f}")
 
 
 def main():
     parser = argparse.ArgumentParser(description="BetBoard")
-    parser.add_argument("csv_path", help="Path to portfolio CSV file")
+    parser.add_argument("csv_path", nargs="+", help="Path to portfolio CSV file; several files (one per account) are consolidated into one portfolio (with --watch: a folder of CSV files)")
     parser.add_argument("--no-show", action="store_true", help="Do not display plots; print distributions instead")
     parser.add_argument("--simple", action="store_true", help="Use simple CSV format where Amount is current value (columns: Asset,Category,Amount[,Bucket])")
     parser.add_argument("--detailed", action="store_true", help="Do not club small asset slices into 'Other' on the Asset chart")
+    parser.add_argument("--refresh-prices", action="store_true", help="Ignore the on-disk price cache and fetch every price")
+    parser.add_argument("--base-currency", default="USD", help="Currency to convert live prices into (default: USD); use 'none' to skip FX conversion")
+    parser.add_argument("--record", metavar="FIXTURE", help="Record every price/FX source request and response (with timing) to a JSON fixture")
+    parser.add_argument("--replay", metavar="FIXTURE", help="Serve price/FX source responses from a recorded fixture instead of the network")
+    parser.add_argument("--replay-latency", choices=["zero", "recorded"], default="zero", help="With --replay: answer instantly or sleep for each recorded latency")
+    parser.add_argument("--profile", action="store_true", help="Time each stage (import, load, prices per source, aggregation, pies, savefig) and print a breakdown")
+    parser.add_argument("--profile-pstats", metavar="PATH", help="Also run under cProfile and dump pstats to PATH (implies --profile)")
+    parser.add_argument("--profile-trace", metavar="PATH", help="Also write a Chrome trace-event JSON (Perfetto/speedscope) to PATH (implies --profile)")
+    parser.add_argument("--risk", action="store_true", help="Also compute volatility, per-category risk contribution, correlations and HHI from cached daily price history")
+    parser.add_argument("--targets", metavar="CSV", help="Target allocation CSV (a Bucket, Category or Account column and Target in percent); prints the trades needed to reach it")
+    parser.add_argument("--cash-flow", type=float, default=0.0, help="With --targets: new money to deploy (negative to withdraw) while rebalancing")
+    parser.add_argument("--watch", action="store_true", help="Watch the csv_path folder and revalue whenever a CSV in it changes")
+    parser.add_argument("--interval", type=float, default=0.5, help="With --watch: seconds between folder polls (default: 0.5)")
+    parser.add_argument("--json-out", metavar="PATH", help="Write the distributions (and P&L) as JSON to PATH instead of printing or plotting")
+    parser.add_argument("--snapshot", metavar="DIR", help="End-of-day job: value each csv_path as its own portfolio (a folder is one portfolio of account files) at the latest session close and append the totals to the allocation history in DIR")
     args = parser.parse_args()
+    if args.record and args.replay:
+        parser.error("--record and --replay are mutually exclusive")
+
+    if args.snapshot:
+        raise SystemExit(snapshot(args))
+
+    if args.watch:
+        if len(args.csv_path) != 1 or not os.path.isdir(args.csv_path[0]):
+            parser.error("--watch expects csv_path to be a single folder")
+        args.csv_path = args.csv_path[0]
+        watch(args)
+        return
 
-    # default: live price fetcher
-    from data.analyzer import get_current_price as price_fetcher
-
-    if args.simple:
-        # load and compute directly from provided amounts
-        from utils.csv_loader import load_simple_csv
-        simple_rows = load_simple_csv(args.csv_path)
-        from data.analyzer import calculate_from_values
-        result = calculate_from_values(simple_rows)
-        asset_values = result['asset_values']
-        category_distribution = result['category_distribution']
-        bucket_distribution = result.get('bucket_distribution', None)
+    if not (args.profile or args.profile_pstats or args.profile_trace):
+        run(args, NULL_PROFILER)
+        return
+
+    profiler = Profiler()
+    profiler.add('import', _IMPORT_SECONDS, start=_IMPORT_START)
+    if args.profile_pstats:
+        import cProfile
+        cprofile = cProfile.Profile()
+        cprofile.runcall(run, args, profiler)
+        cprofile.dump_stats(args.profile_pstats)
     else:
-        data = load_csv_data(args.csv_path)
-        asset_values = calculate_asset_values(data, price_fetcher=price_fetcher)
-        category_distribution = calculate_category_distribution(data, price_fetcher=price_fetcher)
-        from data.analyzer import calculate_bucket_distribution
-        bucket_distribution = calculate_bucket_distribution(data, price_fetcher=price_fetcher)
+        run(args, profiler)
+
+    print('\n' + profiler.report())
+    if args.profile_pstats:
+        print(f'pstats ➜ {args.profile_pstats}')
+    if args.profile_trace:
+        profiler.write_trace(args.profile_trace)
+        print(f'trace ➜ {args.profile_trace}')
+
+
+def _price_sources(args, profiler=NULL_PROFILER):
+    """Context that records, replays and/or times price source calls, per the CLI flags."""
+    from contextlib import ExitStack
+    from data.price_replay import PriceRecorder, PriceReplayer, SourceTimer
+    price_sources = ExitStack()
+    if args.record:
+        price_sources.enter_context(PriceRecorder(args.record))
+    elif args.replay:
+        price_sources.enter_context(PriceReplayer(args.replay, latency=args.replay_latency))
+    if profiler is not NULL_PROFILER:
+        # Entered last so it times whatever the recorder/replayer serves
+        price_sources.enter_context(SourceTimer(profiler))
+    return price_sources
+
+
+def _fx_rates(args):
+    """
+    The shared FX rates (see `data.fx.fx_rates`), persisted to cache/fx.json like the
+    price cache so closed-market runs reuse the last rates. Recording/replaying keeps
+    them in memory only, since those runs must see every FX call.
+    """
+    from data.fx import fx_rates
+    if not (args.record or args.replay):
+        fx_rates.path = os.path.join(os.getcwd(), 'cache', 'fx.json')
+        fx_rates.load()
+    if args.refresh_prices:
+        fx_rates.clear()
+    return fx_rates
+
+
+def _price_cache(args, policy=None):
+    """
+    The live price fetcher behind an on-disk cache (cache/prices.json) that skips
+    refetching a closed session's prices (overnight, weekends) and keeps short TTLs while
+    markets are open. Recording/replaying must see every source call, so the cache is
+    kept in memory only. --refresh-prices starts it empty.
+    """
+    from data.analyzer import get_current_price
+    from data.market_calendar import FreshnessPolicy
+    from data.price_cache import PriceCache
+    path = None if (args.record or args.replay) else os.path.join(os.getcwd(), 'cache', 'prices.json')
+    price_cache = PriceCache(get_current_price, policy=policy or FreshnessPolicy(), path=path)
+    if args.refresh_prices:
+        price_cache.clear()
+    return price_cache
+
+
+def _base_currency(args):
+    """--base-currency as an upper-case code, or None for 'none' (no conversion)."""
+    return None if args.base_currency.lower() == 'none' else args.base_currency.upper()
+
 
-    if args.no_show:
+def run(args, profiler):
+    """
+    Load, value and output one portfolio. Stages are timed through `profiler`
+    (NULL_PROFILER when --profile is off).
+    """
+    price_cache = _price_cache(args)
+    fx_rates = _fx_rates(args)
+
+    # Simple CSVs carry current values only, so there is no cost basis for P&L.
+    # In live mode one price lookup per ticker feeds values, P&L, risk and rebalancing.
+    base_currency = _base_currency(args)
+    with _price_sources(args, profiler):
+        portfolio = run_pipeline(args.csv_path, simple=args.simple, price_fetcher=price_cache,
+                                 base_currency=base_currency, fx=fx_rates, profiler=profiler)
+        if not args.simple:
+            price_cache.save()
+            fx_rates.save()
+        result = portfolio.result
+        if args.risk:
+            with profiler.stage('risk'):
+                risk = calculate_risk(portfolio.store, portfolio.value, _price_history(args),
+                                      base_currency=None if args.simple else base_currency)
+                result = dict(result, risk=risk)
+
+    if args.targets:
+        from data.rebalance import load_targets, rebalance_trades
+        dimension, targets = load_targets(args.targets)
+        result = dict(result, rebalance={'dimension': dimension, 'trades': rebalance_trades(
+            result[f'{dimension}_distribution'], targets, cash_flow=args.cash_flow)})
+
+    write_outputs(args, result, portfolio.valuation, profiler)
+
+
+def _price_history(args):
+    """Daily close history for --risk, cached in cache/ like prices (in memory when recording/replaying)."""
+    from data.risk import PriceHistory
+    path = None if (args.record or args.replay) else os.path.join(os.getcwd(), 'cache', 'price_history.npz')
+    return PriceHistory(path)
+
+
+def _snapshot_sources(paths):
+    """
+    Portfolio name -> input for --snapshot: a CSV is one portfolio, a folder's CSVs are one
+    portfolio's accounts. Clashing names are qualified by folder (see `account_names`).
+    """
+    import glob
+    from utils.csv_loader import account_names
+    return {name: sorted(glob.glob(os.path.join(path, '*.csv'))) if os.path.isdir(path) else [path]
+            for path, name in zip(paths, account_names(paths))}
+
+
+def snapshot(args) -> int:
+    """
+    Value every portfolio once at the latest session close and append its asset,
+    category, bucket and account totals to the allocation history (see
+    `data.history.AllocationHistory`). Meant for cron / Task Scheduler after the close.
+
+    The snapshot is dated by the last completed session of the exchanges the portfolios
+    trade on (see `data.market_calendar.last_session`), so a weekend or repeated run
+    finds it already recorded and appends nothing, without fetching prices. Pricing at
+    the close is `data.snapshot.value_at_close`. Returns the process exit code: 1 if any
+    portfolio failed.
+    """
+    from data.history import AllocationHistory
+    from data.market_calendar import FreshnessPolicy, last_session
+    from data.pipeline import read_input
+    from data.snapshot import value_at_close
+
+    history = AllocationHistory(args.snapshot)
+    base_currency = _base_currency(args)
+    stores, failed = {}, 0
+    for name, files in _snapshot_sources(args.csv_path).items():
+        try:
+            stores[name] = read_input(files, simple=args.simple)
+        except Exception as exc:
+            print(f'{name}: failed to load ({exc})')
+            failed += 1
+
+    policy = FreshnessPolicy()
+    session = str(last_session({t for store in stores.values() for t in store.ticker.labels}, holidays=policy.holidays))
+    for name in [n for n in stores if history.has(session, n)]:
+        print(f'{name}: {session} already recorded')
+        del stores[name]
+    price_cache = _price_cache(args, policy=policy)
+    with _price_sources(args):
+        for name, portfolio, exc in value_at_close(stores, session, _price_history(args), price_cache,
+                                                   base_currency=base_currency, simple=args.simple):
+            if exc is not None:
+                print(f'{name}: failed to value ({exc})')
+                failed += 1
+                continue
+            rows = history.append(session, name, portfolio.result, currency=None if args.simple else base_currency)
+            print(f"{name}: {session} total {sum(portfolio.result['asset_values'].values()):,.2f} ({rows} rows) ➜ {args.snapshot}")
+        if not args.simple and stores:
+            price_cache.save()
+    return 1 if failed else 0
+
+
+def write_outputs(args, result, valuation, profiler=NULL_PROFILER, interactive=True):
+    """
+    Emit one valuation: JSON file (--json-out), stdout (--no-show) or the pie charts.
+    `result` holds the distributions; `valuation` is the full live valuation (None in
+    simple mode). With `interactive=False` (watch mode) charts are always saved, never shown.
+    """
+    asset_values = result['asset_values']
+    category_distribution = result['category_distribution']
+    if result.get('missing_fx'):
+        print(f"No FX rate (valued at 0): {', '.join(result['missing_fx'])}")
+    if args.json_out:
+        import json
+        payload = dict(result)
+        payload['updated_at'] = time.strftime('%Y-%m-%dT%H:%M:%S%z')
+        tmp = args.json_out + '.tmp'
+        with open(tmp, 'w', encoding='utf-8') as fh:
+            json.dump(payload, fh, indent=1)
+        # Atomic replace so dashboards polling the file never read a partial write
+        os.replace(tmp, args.json_out)
+        print(f'Saved ➜ {args.json_out}')
+    elif args.no_show:
         print('ASSETS')
         for k, v in asset_values.items():
             print(k, v)
         print('\nCATEGORIES')
         for k, v in category_distribution.items():
             print(k, v)
+        account_distribution = result.get('account_distribution', {})
+        if len(account_distribution) > 1:
+            print('\nACCOUNTS')
+            for k, v in account_distribution.items():
+                print(k, v)
+        if valuation is not None:
+            print_pnl(valuation)
+        if 'risk' in result:
+            print_risk(result['risk'])
+        if 'rebalance' in result:
+            print_rebalance(result['rebalance']['trades'], result['rebalance']['dimension'])
     else:
-        generate_pie_charts(asset_values, category_distribution, bucket_distribution=bucket_distribution, detailed=args.detailed)
+        if 'risk' in result:
+            print_risk(result['risk'])
+        if 'rebalance' in result:
+            print_rebalance(result['rebalance']['trades'], result['rebalance']['dimension'])
+        fig = build_pie_figure(asset_values, category_distribution, bucket_distribution=result.get('bucket_distribution'), detailed=args.detailed, profiler=profiler)
+        with profiler.stage('savefig'):
+            if interactive:
+                show_or_save_figure(fig)
+            else:
+                import matplotlib.pyplot as plt
+                save_figure(fig)
+                plt.close(fig)
+
+
+def watch(args):
+    """
+    Revalue the portfolio in the `args.csv_path` folder whenever a CSV in it is added,
+    changed or removed. Only changed files are re-parsed; the combined book is revalued
+    against a warm in-process price cache and the outputs are rewritten.
+    """
+    from utils.watcher import FolderWatcher
+
+    price_cache = _price_cache(args)
+    fx_rates = _fx_rates(args)
+    base_currency = _base_currency(args)
+    watcher = FolderWatcher(args.csv_path)
+    stores = {}
+
+    print(f'Watching {args.csv_path} every {args.interval:g}s (Ctrl+C to stop)')
+    try:
+        with _price_sources(args):
+            _watch_loop(args, watcher, stores, price_cache, fx_rates, base_currency)
+    except KeyboardInterrupt:
+        pass
+
+
+def _watch_loop(args, watcher, stores, price_cache, fx_rates, base_currency):
+    """
+    Poll forever, re-parsing changed files and rewriting outputs after each change.
+    Each file is one account, named after the file (see `load_accounts`).
+    """
+    from data.positions import PositionStore
+    from utils.csv_loader import account_name, load_positions, load_simple_positions
+
+    loader = load_simple_positions if args.simple else load_positions
+
+    while True:
+        changed, removed = watcher.poll()
+        if changed or removed:
+            start = time.perf_counter()
+            for path in removed:
+                stores.pop(path, None)
+            for path in changed:
+                try:
+                    stores[path] = loader(path, account=account_name(path))
+                except Exception as exc:
+                    # Keep the last good parse (e.g. the export is still being written)
+                    print(f'Skipped {os.path.basename(path)}: {exc}')
+
+            if stores:
+                book = PositionStore.concat([stores[p] for p in sorted(stores)])
+                portfolio = run_pipeline(book, simple=args.simple, price_fetcher=price_cache, base_currency=base_currency, fx=fx_rates)
+                if not args.simple:
+                    price_cache.save()
+                    fx_rates.save()
+                write_outputs(args, portfolio.result, portfolio.valuation, interactive=False)
+                names = ', '.join(os.path.basename(p) for p in changed + removed)
+                print(f'Revalued {len(book)} positions from {len(stores)} file(s) in {time.perf_counter() - start:.2f}s [{names}]')
+            else:
+                print('No holdings files to value')
+        time.sleep(args.interval)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,135 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, List, Optional
+
+MAIN = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'main.py')
+
+# Upper bounds per portfolio size: rows -> (seconds, peak RSS in MB) for one CLI run,
+# end to end (interpreter start, CSV load, pricing, aggregation, output). Roughly 3x
+# what a laptop measures, so they catch regressions rather than slow machines. Sizes
+# above the largest bound are not known to be safe (see server.py --max-rows).
+BOUNDS = {
+    1_000: (10.0, 750.0),
+    10_000: (10.0, 800.0),
+    100_000: (15.0, 900.0),
+    1_000_000: (30.0, 2000.0),
+}
+MODES = ('no-show', 'render')
+CATEGORIES = ('Taxable equity', '401K', 'IRA', 'Bonds', 'International', 'Cash')
+BUCKETS = ('Long-Term', 'Trade', 'Cash')
+
+
+def generate_portfolio(rows: int, folder: str, tickers: int = 5000, seed: int = 0):
+    """
+    Write a detailed CSV with `rows` positions over min(rows, `tickers`) instruments, and
+    a price replay fixture (see data.price_replay) answering every ticker's lookup.
+    Returns (csv_path, fixture_path).
+    """
+    import numpy as np
+    import pandas as pd
+
+    rng = np.random.default_rng(seed)
+    n_tickers = min(rows, tickers)
+    # 'T' prefix keeps generated symbols clear of the crypto/CASH special cases
+    symbols = np.array([f'T{i:06d}' for i in range(n_tickers)])
+    pick = rng.integers(0, n_tickers, rows)
+    df = pd.DataFrame({
+        'Asset': np.char.add('Asset ', symbols)[pick],
+        'Ticker': symbols[pick],
+        'Quantity': rng.integers(1, 500, rows),
+        'Category': np.array(CATEGORIES)[pick % len(CATEGORIES)],
+        'Avg Buy Price': np.round(rng.uniform(5, 500, rows), 2),
+        'Bucket': np.array(BUCKETS)[pick % len(BUCKETS)],
+    })
+    csv_path = os.path.join(folder, f'portfolio-{rows}.csv')
+    df.to_csv(csv_path, index=False)
+
+    prices = np.round(rng.uniform(5, 500, n_tickers), 2).tolist()
+    fixture = {'version': 1, 'calls': [{'source': 'yfinance', 'args': [s], 'result': p, 'error': None, 'elapsed': 0.0}
+                                       for s, p in zip(symbols.tolist(), prices)]}
+    fixture_path = os.path.join(folder, f'prices-{rows}.json')
+    with open(fixture_path, 'w', encoding='utf-8') as fh:
+        json.dump(fixture, fh)
+    return csv_path, fixture_path
+
+
+def _run(cmd: List[str], cwd: str):
+    """Run `cmd` headless; return (seconds, peak RSS in MB or None, returncode, stderr tail)."""
+    env = {k: v for k, v in os.environ.items() if k != 'DISPLAY'}
+    env['MPLBACKEND'] = 'Agg'
+    start = time.perf_counter()
+    proc = subprocess.Popen(cmd, cwd=cwd, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+    peak = None
+    if hasattr(os, 'wait4'):
+        # Per-child rusage, so each run reports its own peak (POSIX only)
+        stderr = proc.stderr.read()
+        _, status, usage = os.wait4(proc.pid, 0)
+        proc.returncode = os.waitstatus_to_exitcode(status)
+        # ru_maxrss is KiB on Linux, bytes on macOS
+        peak = usage.ru_maxrss / (2**20 if sys.platform == 'darwin' else 2**10)
+    else:
+        _, stderr = proc.communicate()
+    seconds = time.perf_counter() - start
+    return seconds, peak, proc.returncode, stderr.decode('utf-8', errors='replace')[-2000:]
+
+
+def run_scaling(sizes: List[int], modes=MODES, folder: Optional[str] = None, tickers: int = 5000) -> List[Dict]:
+    """
+    Run the CLI once per size and mode on generated portfolios with replayed prices and
+    check each run against BOUNDS. 'no-show' prints the distributions and P&L; 'render'
+    also builds the pie charts and saves the PNG headlessly. Returns one row per run.
+    """
+    folder = folder or tempfile.mkdtemp(prefix='betboard-scaling-')
+    results = []
+    for rows in sizes:
+        csv_path, fixture = generate_portfolio(rows, folder, tickers=tickers)
+        for mode in modes:
+            cmd = [sys.executable, MAIN, csv_path, '--replay', fixture, '--base-currency', 'none']
+            if mode == 'no-show':
+                cmd.append('--no-show')
+            seconds, peak, code, stderr = _run(cmd, folder)
+            max_seconds, max_mb = BOUNDS.get(rows, (None, None))
+            failures = []
+            if code != 0:
+                failures.append(f'exit code {code}: {stderr.strip().splitlines()[-1] if stderr.strip() else ""}')
+            if max_seconds is not None and seconds > max_seconds:
+                failures.append(f'{seconds:.1f}s > {max_seconds:g}s')
+            if max_mb is not None and peak is not None and peak > max_mb:
+                failures.append(f'{peak:.0f} MB > {max_mb:g} MB')
+            results.append({'rows': rows, 'mode': mode, 'seconds': seconds, 'peak_mb': peak,
+                            'max_seconds': max_seconds, 'max_mb': max_mb, 'failures': failures})
+            status = 'FAIL ' + '; '.join(failures) if failures else 'ok'
+            peak_text = f'{peak:8.0f}' if peak is not None else '     n/a'
+            print(f'{rows:>10,} {mode:<8} {seconds:8.2f}s {peak_text} MB  {status}', flush=True)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="BetBoard scaling run: time and peak memory of the CLI on generated portfolios")
+    parser.add_argument("--sizes", type=int, nargs="+", default=sorted(BOUNDS), help="Portfolio sizes in rows (default: 1k 10k 100k 1M)")
+    parser.add_argument("--modes", nargs="+", choices=MODES, default=list(MODES), help="CLI modes to run per size (default: both)")
+    parser.add_argument("--tickers", type=int, default=5000, help="Distinct instruments per portfolio (default: 5000, capped at the row count)")
+    parser.add_argument("--keep", metavar="DIR", help="Generate portfolios and outputs in DIR instead of a temporary folder")
+    parser.add_argument("--json-out", metavar="PATH", help="Also write the results as JSON to PATH")
+    args = parser.parse_args()
+
+    if args.keep:
+        os.makedirs(args.keep, exist_ok=True)
+    print(f"{'rows':>10} {'mode':<8} {'time':>9} {'peak':>8}")
+    results = run_scaling(args.sizes, modes=args.modes, folder=args.keep, tickers=args.tickers)
+    if args.json_out:
+        with open(args.json_out, 'w', encoding='utf-8') as fh:
+            json.dump(results, fh, indent=1)
+    failed = [r for r in results if r['failures']]
+    if failed:
+        print(f'{len(failed)} of {len(results)} run(s) exceeded their bounds')
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,200 @@
+import argparse
+import base64
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, Optional
+from urllib.parse import parse_qs, urlparse
+
+# The service never opens windows; always render with the non-interactive backend
+import matplotlib
+matplotlib.use('Agg')
+
+from data.analyzer import get_current_price
+from data.pipeline import MAX_ROWS, VALUATION_TTL, cached_pipeline
+from data.market_calendar import FreshnessPolicy
+from data.price_cache import PriceCache
+from utils.memory_cache import DEFAULT_MAX_BYTES, MemoryCache, content_hash
+from visualization.pie_charts import build_pie_figure, figure_to_bytes
+
+# pyplot keeps global state, so figure rendering is serialized across request threads
+_render_lock = threading.Lock()
+
+CHART_FORMATS = {'png': 'image/png', 'svg': 'image/svg+xml'}
+# A 1M-row detailed CSV is ~50 MB; refuse anything much bigger before reading it
+MAX_BODY_BYTES = 128 * 1024 * 1024
+
+
+def _truthy(value) -> bool:
+    return str(value).strip().lower() in ('1', 'true', 'yes', 'on')
+
+
+def valuate_payload(body: bytes, content_type: str, options: Dict[str, str], price_fetcher: Callable[[str, str], float],
+                    cache: Optional[MemoryCache] = None, valuation_ttl: float = VALUATION_TTL, max_rows: Optional[int] = MAX_ROWS,
+                    fx=None) -> dict:
+    """
+    Value a CSV or JSON holdings payload and return the distributions as a JSON-ready dict.
+
+    - CSV bodies use the same columns as the CLI (detailed or, with `simple`, Asset/Category/Amount).
+    - JSON bodies are either a list of holding rows or `{"holdings": [...], <options>}`;
+      options in the JSON object override query-string options.
+    - `base_currency` (default USD) converts live prices via batched, cached FX rates:
+      `fx` (a `data.fx.FxRates`), or the process-wide `data.fx.fx_rates` when None.
+    - `chart=png|svg` adds a base64-encoded rendering of the pie charts.
+    - Payloads with more than `max_rows` holdings are rejected with ValueError.
+
+    With a `cache`, the holdings and valuation are kept as in `data.pipeline.cached_pipeline`
+    (live valuations for `valuation_ttl` seconds), and the rendered chart by a hash of the
+    distributions it draws plus render options.
+    """
+    cache = cache if cache is not None else MemoryCache(0)
+    options = dict(options)
+    is_json = 'json' in (content_type or '').lower()
+    if is_json:
+        payload = json.loads(body.decode('utf-8') or 'null')
+        if isinstance(payload, dict):
+            records = payload.get('holdings')
+            options.update({k: v for k, v in payload.items() if k != 'holdings'})
+        else:
+            records = payload
+        if not isinstance(records, list):
+            raise ValueError("JSON payload must be a list of holdings or an object with a 'holdings' list")
+    else:
+        records = None
+
+    # Live mode also returns asset/category/bucket/account P&L from the same pricing pass
+    simple = _truthy(options.get('simple', False))
+    base_currency = str(options.get('base_currency', 'USD') or 'USD').strip().upper()
+    portfolio = cached_pipeline(body, simple=simple, base_currency=base_currency, cache=cache, price_fetcher=price_fetcher,
+                                ttl=valuation_ttl, records=records, fx=fx, max_rows=max_rows)
+    rows = portfolio.store
+    # Shallow copy: the cached result must not pick up this request's chart
+    response = dict(portfolio.result)
+    asset_values = response['asset_values']
+    category_distribution = response['category_distribution']
+    bucket_distribution = response['bucket_distribution']
+
+    chart = str(options.get('chart', '') or '').strip().lower()
+    if chart:
+        if chart not in CHART_FORMATS:
+            raise ValueError(f"Unsupported chart format '{chart}'. Use one of: {', '.join(CHART_FORMATS)}")
+        # Only draw the Buckets pie when the input actually had a Bucket column
+        buckets = bucket_distribution if rows.has_bucket else None
+        detailed = _truthy(options.get('detailed', False))
+
+        def render():
+            with _render_lock:
+                fig = build_pie_figure(asset_values, category_distribution, bucket_distribution=buckets, detailed=detailed)
+                return figure_to_bytes(fig, fmt=chart)
+
+        image = cache.get_or_compute(('chart', content_hash(asset_values, category_distribution, buckets, detailed, chart)), render)
+        response['chart'] = {'format': chart, 'content_type': CHART_FORMATS[chart], 'data': base64.b64encode(image).decode('ascii')}
+
+    return response
+
+
+class ValuationHandler(BaseHTTPRequestHandler):
+    """
+    Routes:
+      GET  /health   -> service status, price cache and memory cache stats
+      POST /valuate  -> distributions for a CSV (text/csv) or JSON (application/json) body
+    """
+
+    server_version = 'BetBoard'
+
+    def _send_json(self, status: int, payload: dict):
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        path = urlparse(self.path).path
+        if path == '/health':
+            self._send_json(200, {'status': 'ok', 'price_cache': self.server.price_cache.stats(),
+                                  'memory_cache': self.server.memory_cache.stats()})
+        else:
+            self._send_json(404, {'error': f'Unknown route: {path}'})
+
+    def do_POST(self):
+        parsed = urlparse(self.path)
+        if parsed.path != '/valuate':
+            self._send_json(404, {'error': f'Unknown route: {parsed.path}'})
+            return
+
+        length = int(self.headers.get('Content-Length') or 0)
+        if length > self.server.max_body_bytes:
+            # The body is left unread, so the connection cannot be reused
+            self.close_connection = True
+            self._send_json(413, {'error': f'Payload of {length:,} bytes exceeds the {self.server.max_body_bytes:,}-byte limit'})
+            return
+        body = self.rfile.read(length) if length > 0 else b''
+        options = {k: v[-1] for k, v in parse_qs(parsed.query).items()}
+        try:
+            result = valuate_payload(body, self.headers.get('Content-Type', ''), options, self.server.price_cache,
+                                     cache=self.server.memory_cache, valuation_ttl=self.server.valuation_ttl,
+                                     max_rows=self.server.max_rows, fx=self.server.fx)
+        except (ValueError, KeyError, UnicodeDecodeError) as exc:
+            self._send_json(400, {'error': str(exc)})
+            return
+        except Exception as exc:
+            self._send_json(500, {'error': f'Failed to value portfolio: {exc}'})
+            return
+        self._send_json(200, result)
+
+    def log_message(self, format, *args):
+        if not self.server.quiet:
+            super().log_message(format, *args)
+
+
+def create_server(host: str = '127.0.0.1', port: int = 8000, price_fetcher: Optional[Callable[[str, str], float]] = None, ttl: float = 60.0, quiet: bool = False,
+                  cache_bytes: int = DEFAULT_MAX_BYTES, max_rows: int = MAX_ROWS, max_body_bytes: int = MAX_BODY_BYTES,
+                  fx=None) -> ThreadingHTTPServer:
+    """
+    Build (but do not start) the valuation service.
+    `price_fetcher` is injectable for testing; it is wrapped in a process-wide PriceCache
+    so every request shares the same warm prices. `fx` (a `data.fx.FxRates`, injectable
+    like `price_fetcher`) converts into the requested base currency; None uses the
+    process-wide `data.fx.fx_rates`. `ttl` applies while a ticker's market is
+    open; closed-session prices stay warm until the next open. Parsed inputs, valuations
+    and charts share one LRU MemoryCache capped at `cache_bytes` (0 disables it).
+    Bodies over `max_body_bytes` get 413 unread, and holdings over `max_rows` get 400.
+    """
+    server = ThreadingHTTPServer((host, port), ValuationHandler)
+    server.daemon_threads = True
+    server.price_cache = PriceCache(price_fetcher or get_current_price, ttl=ttl, policy=FreshnessPolicy(ttl=ttl, crypto_ttl=ttl))
+    server.memory_cache = MemoryCache(cache_bytes)
+    server.fx = fx
+    server.valuation_ttl = ttl
+    server.max_rows = max_rows
+    server.max_body_bytes = max_body_bytes
+    server.quiet = quiet
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="BetBoard valuation service")
+    parser.add_argument("--host", default="127.0.0.1", help="Interface to bind (default: 127.0.0.1)")
+    parser.add_argument("--port", type=int, default=8000, help="Port to listen on (default: 8000)")
+    parser.add_argument("--price-ttl", type=float, default=60.0, help="Seconds a fetched price stays warm while its market is open")
+    parser.add_argument("--cache-mb", type=float, default=DEFAULT_MAX_BYTES / 2**20, help="Memory budget in MB for cached inputs, valuations and charts (default: 256; 0 disables)")
+    parser.add_argument("--max-rows", type=int, default=MAX_ROWS, help="Reject portfolios with more holdings than this (default: 1,000,000, the largest size src/scaling.py checks)")
+    parser.add_argument("--max-body-mb", type=float, default=MAX_BODY_BYTES / 2**20, help="Reject request bodies larger than this many MB (default: 128)")
+    parser.add_argument("--quiet", action="store_true", help="Do not log each request")
+    args = parser.parse_args()
+
+    server = create_server(args.host, args.port, ttl=args.price_ttl, quiet=args.quiet, cache_bytes=int(args.cache_mb * 2**20),
+                           max_rows=args.max_rows, max_body_bytes=int(args.max_body_mb * 2**20))
+    print(f'Serving BetBoard on http://{args.host}:{args.port}')
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,8 @@
-def load_csv_data(file_path):
+def _normalize_detailed_frame(df):
     import pandas as pd
 
-    # Load the CSV file into a DataFrame
-    df = pd.read_csv(file_path)
-
     # Normalize column names
-    df.columns = [c.strip() for c in df.columns]
+    df.columns = [str(c).strip() for c in df.columns]
 
     # Ensure numeric columns are parsed
     if 'Quantity' in df.columns:
@@ -13,26 +10,18 @@ def load_csv_data(file_path):
     if 'Avg Buy Price' in df.columns:
         df['Avg Buy Price'] = pd.to_numeric(df['Avg Buy Price'], errors='coerce').fillna(0)
 
-    # Preserve optional Bucket column if present
-    if 'Bucket' in df.columns:
-        df['Bucket'] = df['Bucket'].astype(str).str.strip().replace({'': None})
+    # Preserve optional Bucket and Account columns if present
+    for col in ('Bucket', 'Account'):
+        if col in df.columns:
+            df[col] = df[col].astype(str).str.strip().replace({'': None})
 
-    # Convert the DataFrame to a list of dictionaries
-    data = df.to_dict(orient='records')
-
-    return data
+    return df
 
 
-def load_simple_csv(file_path):
-    """
-    Load a simple CSV with columns: Asset, Category, Amount
-    - Strips commas from Amount and coerces to numeric
-    - Returns list[dict] with keys 'Asset','Category','Amount'
-    """
+def _normalize_simple_frame(df):
     import pandas as pd
 
-    df = pd.read_csv(file_path)
-    df.columns = [c.strip() for c in df.columns]
+    df.columns = [str(c).strip() for c in df.columns]
 
     # Expect required columns; optional 'Bucket' allowed
     expected = {'asset', 'category', 'amount'}
@@ -66,4 +55,144 @@ def load_simple_csv(file_path):
                 break
         df['Bucket'] = df['Bucket'].astype(str).str.strip().replace({'': None})
 
-    return df.to_dict(orient='records')
\ No newline at end of file
+    # Normalize optional Account column (case-insensitive header, like Bucket)
+    for c in df.columns:
+        if c.strip().lower() == 'account':
+            df = df.rename(columns={c: 'Account'})
+            df['Account'] = df['Account'].astype(str).str.strip().replace({'': None})
+            break
+
+    return df
+
+
+def _synthesize_amount(df):
+    """
+    Give a detailed frame (Quantity + Avg Buy Price, no Amount) an Amount column equal to
+    Quantity * Avg Buy Price, so it can be used as a simple (values provided) input
+    without live price fetches.
+    """
+    import pandas as pd
+
+    col_map = {str(c).strip().lower(): c for c in df.columns}
+    abp_col = next((col_map[k] for k in ('avg buy price', 'avg_buy_price', 'avgbuyprice') if k in col_map), None)
+    if 'quantity' not in col_map or abp_col is None:
+        raise ValueError("Simple mode expects an 'Amount' column or Quantity+Avg Buy Price columns to compute amounts; no fallback to live mode.")
+    if 'asset' not in col_map or 'category' not in col_map:
+        raise ValueError("Simple mode requires 'Asset' and 'Category' columns when synthesizing Amount from Quantity and Avg Buy Price.")
+
+    def numeric(col):
+        return pd.to_numeric(df[col].astype(str).str.replace(',', ''), errors='coerce').fillna(0)
+
+    df = df.copy()
+    df['Amount'] = numeric(col_map['quantity']) * numeric(abp_col)
+    return df
+
+
+def frame_positions(df, simple=False, account=None):
+    """
+    Build a `PositionStore` from a raw holdings DataFrame (as read from a CSV).
+
+    With `simple`, a frame without an Amount column but with Quantity and Avg Buy Price
+    is valued at cost (Amount = Quantity * Avg Buy Price) instead of failing.
+    """
+    from data.positions import PositionStore
+
+    if simple:
+        if 'amount' not in {str(c).strip().lower() for c in df.columns}:
+            df = _synthesize_amount(df)
+        df = _normalize_simple_frame(df)
+    else:
+        df = _normalize_detailed_frame(df)
+    return PositionStore.from_frame(df, account=account)
+
+
+def load_csv_data(file_path):
+    import pandas as pd
+
+    # Load the CSV file into a DataFrame
+    df = pd.read_csv(file_path)
+    df = _normalize_detailed_frame(df)
+
+    # Convert the DataFrame to a list of dictionaries
+    data = df.to_dict(orient='records')
+
+    return data
+
+
+def load_simple_csv(file_path):
+    """
+    Load a simple CSV with columns: Asset, Category, Amount
+    - Strips commas from Amount and coerces to numeric
+    - Returns list[dict] with keys 'Asset','Category','Amount'
+    """
+    import pandas as pd
+
+    df = pd.read_csv(file_path)
+    df = _normalize_simple_frame(df)
+
+    return df.to_dict(orient='records')
+
+
+def load_positions(file_path, account=None):
+    """
+    Load a detailed CSV straight into a compact `PositionStore` (no per-row dicts).
+    Rows without an Account column value are assigned to `account`.
+    """
+    import pandas as pd
+
+    return frame_positions(pd.read_csv(file_path), account=account)
+
+
+def load_simple_positions(file_path, account=None):
+    """
+    Load a simple CSV (Asset, Category, Amount[, Bucket][, Account]) into a `PositionStore`.
+    A detailed CSV is valued at cost instead (see `frame_positions`).
+    """
+    import pandas as pd
+
+    return frame_positions(pd.read_csv(file_path), simple=True, account=account)
+
+
+def account_name(file_path):
+    """Account label for a holdings file (or uploaded file): its name without directory or extension."""
+    import os
+
+    return os.path.splitext(os.path.basename(os.path.normpath(str(getattr(file_path, 'name', file_path)))))[0]
+
+
+def account_names(file_paths):
+    """
+    Labels for several holdings files or folders, one per path (see `account_name`).
+    Names shared by several paths are qualified with the parent folder, so
+    fidelity/holdings.csv and schwab/holdings.csv become 'fidelity/holdings' and
+    'schwab/holdings' instead of merging. Raises ValueError if names still clash.
+    """
+    import os
+    from collections import Counter
+
+    names = [account_name(p) for p in file_paths]
+    counts = Counter(names)
+    for i, (path, name) in enumerate(zip(file_paths, names)):
+        if counts[name] > 1:
+            parent = os.path.dirname(os.path.abspath(os.path.normpath(str(getattr(path, 'name', path)))))
+            names[i] = f'{os.path.basename(parent)}/{name}'
+    clashes = sorted(n for n, c in Counter(names).items() if c > 1)
+    if clashes:
+        raise ValueError(f"Several holdings files map to the same name: {', '.join(clashes)}")
+    return names
+
+
+def load_accounts(file_paths, simple=False):
+    """
+    Consolidate several account files (one per brokerage) into a single `PositionStore`.
+
+    Each file's rows are tagged with an Account taken from the file name, unless the
+    file has its own Account column; files with the same name are told apart by folder
+    (see `account_names`). The same ticker held in several accounts stays as separate
+    positions, and the analyzer prices it once for all of them.
+    """
+    from data.positions import PositionStore
+
+    loader = load_simple_positions if simple else load_positions
+    file_paths = list(file_paths)
+    return PositionStore.concat([loader(path, account=name) for path, name in zip(file_paths, account_names(file_paths))])
@@ -0,0 +1,140 @@
+import hashlib
+import json
+import sys
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional
+
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+
+def content_hash(*parts) -> str:
+    """
+    SHA-256 over `parts`: bytes are hashed as-is, anything else as canonical JSON (sorted
+    keys), so equal distributions or option dicts give equal keys.
+    """
+    h = hashlib.sha256()
+    for part in parts:
+        if isinstance(part, (bytes, bytearray, memoryview)):
+            h.update(part)
+        else:
+            h.update(json.dumps(part, sort_keys=True, default=str).encode('utf-8'))
+        h.update(b'\x00')
+    return h.hexdigest()
+
+
+def estimate_size(obj, _seen=None) -> int:
+    """
+    Approximate bytes held by `obj`: NumPy buffers, DataFrames (deep), Plotly figures
+    (as JSON), and containers/slotted objects (recursively). Shared objects are counted
+    once.
+    """
+    seen = _seen if _seen is not None else set()
+    if id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+
+    import numpy as np
+
+    if isinstance(obj, np.ndarray):
+        # An array that owns its buffer already reports it in getsizeof; a view holds only its header
+        return max(sys.getsizeof(obj, 0), int(obj.nbytes)) if obj.base is None else sys.getsizeof(obj, 0)
+    if isinstance(obj, (bytes, bytearray, str)):
+        return sys.getsizeof(obj)
+    module = type(obj).__module__
+    if module.startswith('pandas'):
+        try:
+            usage = obj.memory_usage(deep=True)
+            return int(usage.sum() if hasattr(usage, 'sum') else usage)
+        except Exception:
+            return sys.getsizeof(obj)
+    if module.startswith('plotly'):
+        return len(obj.to_json())
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(estimate_size(k, seen) + estimate_size(v, seen) for k, v in obj.items())
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        size += sum(estimate_size(v, seen) for v in obj)
+    elif hasattr(obj, '__slots__'):
+        size += sum(estimate_size(getattr(obj, s, None), seen) for s in obj.__slots__)
+    elif hasattr(obj, '__dict__'):
+        size += estimate_size(vars(obj), seen)
+    return size
+
+
+class MemoryCache:
+    """
+    Thread-safe in-process LRU cache bounded by total (estimated) bytes.
+
+    Long-running front ends (Streamlit servers, the HTTP service) use it for parsed
+    portfolios, valuations and rendered figures. Keys are content hashes plus options
+    (see `content_hash`). Each entry's size is measured once, on insert. The least
+    recently used entries are evicted until the total fits `max_bytes`, so popular
+    inputs stay in memory without RSS growing without limit. An entry bigger than the
+    whole budget is not stored. Entries may carry a `ttl` (seconds), e.g. for live
+    valuations that go stale with prices.
+    """
+
+    def __init__(self, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.max_bytes = int(max_bytes)
+        self._lock = threading.Lock()
+        self._entries: 'OrderedDict[Hashable, tuple]' = OrderedDict()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[2] is not None and time.time() >= entry[2]:
+                self._drop(key)
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return default
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key: Hashable, value: Any, nbytes: Optional[int] = None, ttl: Optional[float] = None) -> bool:
+        """Store `value` (size estimated unless `nbytes` is given). Returns False if it is too big to cache."""
+        size = int(nbytes if nbytes is not None else estimate_size(value))
+        if size > self.max_bytes:
+            return False
+        expires = time.time() + ttl if ttl else None
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = (value, size, expires)
+            self.bytes += size
+            while self.bytes > self.max_bytes and self._entries:
+                self._drop(next(iter(self._entries)))
+                self.evictions += 1
+        return True
+
+    def get_or_compute(self, key: Hashable, compute: Callable[[], Any], ttl: Optional[float] = None) -> Any:
+        """Return the cached value for `key`, or compute, store and return it."""
+        sentinel = object()
+        value = self.get(key, sentinel)
+        if value is sentinel:
+            value = compute()
+            self.put(key, value, ttl=ttl)
+        return value
+
+    def _drop(self, key: Hashable) -> None:
+        _, size, _ = self._entries.pop(key)
+        self.bytes -= size
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.bytes = 0
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {'entries': len(self._entries), 'bytes': self.bytes, 'max_bytes': self.max_bytes,
+                    'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions,
+                    'hit_rate': self.hits / lookups if lookups else 0.0}
@@ -0,0 +1,107 @@
+import json
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+
+class Profiler:
+    """
+    Wall-clock stage timer used by `--profile` and the Streamlit timing expanders.
+
+    `stage(name)` times a block; `lap(name)` closes a span that started at the previous
+    lap or stage (handy for straight-line scripts such as the Streamlit apps); `add(name, seconds)`
+    records a pre-measured span (e.g. import time, or per-request price source time). Spans are kept in order so they can
+    be printed as a breakdown or exported as a Chrome trace (`chrome://tracing`,
+    Perfetto, speedscope).
+    """
+
+    def __init__(self):
+        self.origin = time.perf_counter()
+        self._last_lap = self.origin
+        self._lock = threading.Lock()
+        self.spans: List[dict] = []
+
+    @contextmanager
+    def stage(self, name: str, category: str = 'stage'):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            end = time.perf_counter()
+            self.add(name, end - start, start=start, category=category)
+            # A following lap() starts here, so stage time is not counted twice
+            self._last_lap = end
+
+    def lap(self, name: str) -> None:
+        now = time.perf_counter()
+        self.add(name, now - self._last_lap, start=self._last_lap)
+        self._last_lap = now
+
+    def add(self, name: str, seconds: float, start: Optional[float] = None, category: str = 'stage') -> None:
+        if start is None:
+            start = time.perf_counter() - seconds
+        with self._lock:
+            self.spans.append({'name': name, 'cat': category, 'start': start, 'seconds': seconds,
+                               'tid': threading.get_ident()})
+
+    def totals(self, category: Optional[str] = None) -> Dict[str, Dict[str, float]]:
+        """Aggregate spans by name: {'name': {'seconds': total, 'calls': n}} in first-seen order."""
+        out: Dict[str, Dict[str, float]] = {}
+        with self._lock:
+            spans = list(self.spans)
+        for span in spans:
+            if category is not None and span['cat'] != category:
+                continue
+            row = out.setdefault(span['name'], {'seconds': 0.0, 'calls': 0})
+            row['seconds'] += span['seconds']
+            row['calls'] += 1
+        return out
+
+    def rows(self) -> List[dict]:
+        """Stage rows for tabular display; price sources are indented under their stage."""
+        stages = self.totals('stage')
+        total = sum(r['seconds'] for r in stages.values()) or 1.0
+        rows = []
+        for name, r in stages.items():
+            rows.append({'Stage': name, 'Seconds': r['seconds'], 'Calls': r['calls'], '% of total': r['seconds'] / total * 100.0})
+        for name, r in self.totals('source').items():
+            rows.append({'Stage': f'  source: {name}', 'Seconds': r['seconds'], 'Calls': r['calls'], '% of total': r['seconds'] / total * 100.0})
+        return rows
+
+    def report(self) -> str:
+        lines = ['PROFILE', f"{'stage':<28}{'seconds':>10}{'calls':>7}{'%':>7}"]
+        for row in self.rows():
+            lines.append(f"{row['Stage']:<28}{row['Seconds']:>10.4f}{row['Calls']:>7}{row['% of total']:>6.1f}%")
+        return '\n'.join(lines)
+
+    def write_trace(self, path: str) -> None:
+        """Write spans as Chrome trace-event JSON (complete 'X' events, microseconds)."""
+        with self._lock:
+            spans = list(self.spans)
+        events = [{
+            'name': s['name'], 'cat': s['cat'], 'ph': 'X', 'pid': 1, 'tid': s['tid'],
+            'ts': (s['start'] - self.origin) * 1e6, 'dur': s['seconds'] * 1e6,
+        } for s in spans]
+        with open(path, 'w', encoding='utf-8') as fh:
+            json.dump({'traceEvents': events, 'displayTimeUnit': 'ms'}, fh)
+
+
+class _NullProfiler:
+    """Stand-in used when profiling is off, so callers need no conditionals."""
+
+    @contextmanager
+    def stage(self, name: str, category: str = 'stage'):
+        yield
+
+    def lap(self, name: str) -> None:
+        pass
+
+    def add(self, name: str, seconds: float, start: Optional[float] = None, category: str = 'stage') -> None:
+        pass
+
+    def totals(self, category: Optional[str] = None) -> Dict[str, Dict[str, float]]:
+        return {}
+
+
+NULL_PROFILER = _NullProfiler()
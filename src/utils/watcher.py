@@ -0,0 +1,61 @@
+import fnmatch
+import hashlib
+import os
+from typing import Dict, List, Tuple
+
+
+def file_digest(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, 'rb') as fh:
+        for chunk in iter(lambda: fh.read(1 << 20), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+class FolderWatcher:
+    """
+    Detect added, changed and removed holdings files in a folder by polling.
+
+    A cheap (mtime, size) stat check runs every poll; only files whose stat changed are
+    hashed, and a file is reported as changed only when its content hash differs. Touches
+    and identical re-exports are ignored, and large folders cost one `os.scandir` per poll.
+    """
+
+    def __init__(self, folder: str, pattern: str = '*.csv'):
+        self.folder = folder
+        self.pattern = pattern
+        self._stats: Dict[str, Tuple[float, int]] = {}
+        self._digests: Dict[str, str] = {}
+
+    def _scan(self) -> Dict[str, Tuple[float, int]]:
+        found = {}
+        with os.scandir(self.folder) as entries:
+            for entry in entries:
+                if entry.is_file() and fnmatch.fnmatch(entry.name, self.pattern):
+                    st = entry.stat()
+                    found[entry.path] = (st.st_mtime_ns, st.st_size)
+        return found
+
+    def poll(self) -> Tuple[List[str], List[str]]:
+        """Return (changed_or_added_paths, removed_paths) since the previous poll."""
+        current = self._scan()
+        removed = sorted(p for p in self._stats if p not in current)
+        for path in removed:
+            self._stats.pop(path, None)
+            self._digests.pop(path, None)
+
+        changed = []
+        for path, stat in sorted(current.items()):
+            if self._stats.get(path) == stat:
+                continue
+            self._stats[path] = stat
+            try:
+                digest = file_digest(path)
+            except OSError:
+                # Vanished or locked mid-write; forget the stat so the next poll retries
+                self._stats.pop(path, None)
+                continue
+            if self._digests.get(path) != digest:
+                self._digests[path] = digest
+                changed.append(path)
+        return changed, removed
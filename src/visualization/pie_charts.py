@@ -1,6 +1,6 @@
 from matplotlib import pyplot as plt
 from matplotlib import font_manager as fm
-from typing import Dict, Tuple
+from typing import Dict, List, Tuple
 import os
 import io
 
@@ -60,11 +60,11 @@ def ensure_lora_font():
 
 
 
-def plot_pie(data: Dict[str, float], title: str, ax=None, combine_threshold: float = 0.02, direction: str = 'clockwise', legend_anchor: float = 1.0) -> Tuple[plt.Figure, plt.Axes]:
+def prepare_pie_slices(data: Dict[str, float], combine_threshold: float = 0.02) -> Tuple[List[str], List[float]]:
     """
-    Plot a pie chart with strategies to reduce label overlap.
-
-    - combine_threshold: fractions < this (of total) will be grouped into an 'Other' slice.
+    Return (labels, sizes) for a pie: slices below `combine_threshold` of the total are
+    grouped into 'Other' (or an existing 'Other' label), Cash is always kept, and the
+    result is ordered by descending size.
     """
     labels = list(data.keys())
     sizes = [float(v) for v in data.values()]
@@ -119,6 +119,24 @@ def plot_pie(data: Dict[str, float], title: str, ax=None, combine_threshold: flo
         labels = list(labels)
         sizes = list(sizes)
 
+    return labels, sizes
+
+
+def plot_pie(data: Dict[str, float], title: str, ax=None, combine_threshold: float = 0.02, direction: str = 'clockwise', legend_anchor: float = 1.0) -> Tuple[plt.Figure, plt.Axes]:
+    """
+    Plot a pie chart with strategies to reduce label overlap.
+
+    - combine_threshold: fractions < this (of total) will be grouped into an 'Other' slice.
+    """
+    labels, sizes = prepare_pie_slices(data, combine_threshold)
+    return draw_pie(labels, sizes, title, ax=ax, combine_threshold=combine_threshold, direction=direction, legend_anchor=legend_anchor)
+
+
+def draw_pie(labels: List[str], sizes: List[float], title: str, ax=None, combine_threshold: float = 0.02, direction: str = 'clockwise', legend_anchor: float = 1.0) -> Tuple[plt.Figure, plt.Axes]:
+    """
+    Draw already-prepared slices (see `prepare_pie_slices`); `combine_threshold` only
+    hides percentage labels on slices below it.
+    """
     # Try to ensure Lora font is available; if so, use it for titles and legend
     lora_ok = ensure_lora_font()
     if lora_ok:
@@ -173,36 +191,48 @@ def plot_pie(data: Dict[str, float], title: str, ax=None, combine_threshold: flo
     return fig, ax
 
 
-def generate_pie_charts(asset_values: Dict[str, float], category_distribution: Dict[str, float], bucket_distribution: Dict[str, float] = None, detailed: bool = False):
+def build_pie_figure(asset_values: Dict[str, float], category_distribution: Dict[str, float], bucket_distribution: Dict[str, float] = None, detailed: bool = False, profiler=None) -> plt.Figure:
     """
-    Create side-by-side pie charts for assets, categories, and buckets.
+    Build the side-by-side asset/category/bucket pie figure without showing or saving it.
     If `bucket_distribution` is None, the Buckets pie is omitted.
-    This function shows the charts; for testing you can call `plot_pie`.
+    `profiler` (see `utils.profiling.Profiler`) times slice preparation and drawing.
     """
+    from utils.profiling import NULL_PROFILER
+    profiler = profiler or NULL_PROFILER
+
+    # If detailed is True, do not combine small asset slices (show all individually)
+    asset_threshold = 0 if detailed else 0.02
+    with profiler.stage('pie preparation'):
+        asset_slices = prepare_pie_slices(asset_values, asset_threshold)
+        category_slices = prepare_pie_slices(category_distribution)
+        bucket_slices = prepare_pie_slices(bucket_distribution) if bucket_distribution else None
+
+    with profiler.stage('figure build'):
+        fig = _draw_pie_figure(asset_slices, category_slices, bucket_slices, asset_threshold)
+    return fig
+
+
+def _draw_pie_figure(asset_slices, category_slices, bucket_slices, asset_threshold: float) -> plt.Figure:
     # Choose layout depending on whether bucket distribution is provided
-    if bucket_distribution:
+    if bucket_slices:
         fig, axes = plt.subplots(1, 3, figsize=(18, 6))
         fig.subplots_adjust(wspace=0.6)
     else:
         fig, axes = plt.subplots(1, 2, figsize=(12, 6))
         fig.subplots_adjust(wspace=0.6)
 
-    # If detailed is True, do not combine small asset slices (show all individually)
-    if detailed:
-        plot_pie(asset_values, "Asset Distribution", ax=axes[0], combine_threshold=0, legend_anchor=-0.05)
-    else:
-        plot_pie(asset_values, "Asset Distribution", ax=axes[0], legend_anchor=-0.05)
+    draw_pie(*asset_slices, "Asset Distribution", ax=axes[0], combine_threshold=asset_threshold, legend_anchor=-0.05)
 
     # When buckets are present, axes[1] is categories; otherwise axes[1] is categories too
-    if bucket_distribution:
-        plot_pie(category_distribution, "Category Distribution", ax=axes[1], legend_anchor=1.05)
-        plot_pie(bucket_distribution, "Bucket Distribution", ax=axes[2], legend_anchor=1.8)
+    if bucket_slices:
+        draw_pie(*category_slices, "Category Distribution", ax=axes[1], legend_anchor=1.05)
+        draw_pie(*bucket_slices, "Bucket Distribution", ax=axes[2], legend_anchor=1.8)
     else:
-        plot_pie(category_distribution, "Category Distribution", ax=axes[1], legend_anchor=1.05)
+        draw_pie(*category_slices, "Category Distribution", ax=axes[1], legend_anchor=1.05)
 
     # After drawing, slightly shift the axes to avoid label/legend overlap.
     try:
-        if bucket_distribution:
+        if bucket_slices:
             left_pos = axes[0].get_position().bounds
             mid_pos = axes[1].get_position().bounds
             right_pos = axes[2].get_position().bounds
@@ -219,6 +249,52 @@ def generate_pie_charts(asset_values: Dict[str, float], category_distribution: D
         pass
 
     plt.tight_layout()
+    return fig
+
+
+def figure_to_bytes(fig: plt.Figure, fmt: str = 'png', dpi: int = 100) -> bytes:
+    """
+    Render a figure to an in-memory image (used by the HTTP service) and release it.
+    """
+    buf = io.BytesIO()
+    try:
+        fig.savefig(buf, format=fmt, dpi=dpi, bbox_inches='tight')
+    finally:
+        plt.close(fig)
+    return buf.getvalue()
+
+
+def save_figure(fig: plt.Figure, out_path: str = None) -> str:
+    """
+    Save the figure as a 300 DPI PNG (default: `results/Portfolio-YYYY-MM-DD.png`) and
+    return the path.
+    """
+    import os
+    from datetime import date
+
+    if out_path is None:
+        # Ensure results directory exists at repo root
+        results_dir = os.path.join(os.getcwd(), 'results')
+        os.makedirs(results_dir, exist_ok=True)
+        filename = date.today().strftime('Portfolio-%Y-%m-%d.png')
+        out_path = os.path.join(results_dir, filename)
+    # Save a high-resolution PNG (300 DPI) for crisp viewing/printing
+    try:
+        fig.savefig(out_path, dpi=300, bbox_inches='tight')
+        # concise hip message
+        print(f'Saved ➜ {out_path}')
+    except Exception:
+        # Fallback to a simple save if high-res fails
+        fig.savefig(out_path)
+        print(f'Saved ➜ {out_path} (fallback)')
+    return out_path
+
+
+def show_or_save_figure(fig: plt.Figure):
+    """
+    Show the figure on interactive backends; on headless backends save it to
+    `results/Portfolio-YYYY-MM-DD.png` instead.
+    """
     # Only call plt.show() when using an interactive backend. For headless/backends like 'Agg'
     # save the figure to a PNG so users running on servers still get the output.
     try:
@@ -228,23 +304,16 @@ def generate_pie_charts(asset_values: Dict[str, float], category_distribution: D
         backend = ''
 
     if backend.startswith('agg') or backend in ('template', ''):
-        # Ensure results directory exists at repo root
-        import os
-        from datetime import date
+        save_figure(fig)
+    else:
+        plt.show()
 
-        results_dir = os.path.join(os.getcwd(), 'results')
-        os.makedirs(results_dir, exist_ok=True)
 
-        filename = date.today().strftime('Portfolio-%Y-%m-%d.png')
-        out_path = os.path.join(results_dir, filename)
-        # Save a high-resolution PNG (300 DPI) for crisp viewing/printing
-        try:
-            fig.savefig(out_path, dpi=300, bbox_inches='tight')
-            # concise hip message
-            print(f'Saved ➜ {out_path}')
-        except Exception:
-            # Fallback to a simple save if high-res fails
-            fig.savefig(out_path)
-            print(f'Saved ➜ {out_path} (fallback)')
-    else:
-        plt.show()
\ No newline at end of file
+def generate_pie_charts(asset_values: Dict[str, float], category_distribution: Dict[str, float], bucket_distribution: Dict[str, float] = None, detailed: bool = False):
+    """
+    Create side-by-side pie charts for assets, categories, and buckets.
+    If `bucket_distribution` is None, the Buckets pie is omitted.
+    This function shows the charts; for testing you can call `plot_pie`.
+    """
+    fig = build_pie_figure(asset_values, category_distribution, bucket_distribution=bucket_distribution, detailed=detailed)
+    show_or_save_figure(fig)
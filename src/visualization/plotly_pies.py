@@ -0,0 +1,111 @@
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+# Upper bound on slices sent to the browser per pie in compact rendering mode
+DEFAULT_MAX_SLICES = 50
+
+
+def prepare_pie_data(data_dict: Dict[str, float], combine_threshold: float, respect_existing_other: bool = True) -> Tuple[List[str], List[float]]:
+    """
+    Return labels and values applying combining logic similar to plot_pie.
+    If combine_threshold == 0, do not combine.
+    """
+    items = [(k, float(v)) for k, v in data_dict.items() if float(v) > 0]
+    total = sum(v for _, v in items)
+    if total == 0:
+        return [], []
+
+    # detect existing other
+    existing_other = None
+    for k, _ in items:
+        if 'other' in str(k).strip().lower():
+            existing_other = k
+            break
+
+    # split
+    if combine_threshold and combine_threshold > 0:
+        big = []
+        small_sum = 0.0
+        for k, v in items:
+            # Always keep 'Cash' separate regardless of threshold
+            if str(k).strip().lower() == 'cash':
+                big.append((k, v))
+                continue
+            if v / total < combine_threshold:
+                small_sum += v
+            else:
+                big.append((k, v))
+        if small_sum > 0:
+            if existing_other is not None:
+                # add to existing other
+                for i, (k, v) in enumerate(big):
+                    if 'other' in str(k).strip().lower():
+                        big[i] = (k, v + small_sum)
+                        break
+                else:
+                    big.append((existing_other, small_sum))
+            else:
+                big.append(('Other', small_sum))
+        labels = [k for k, _ in big]
+        values = [v for _, v in big]
+    else:
+        labels = [k for k, _ in items]
+        values = [v for _, v in items]
+
+    # sort descending
+    pairs = list(zip(labels, values))
+    pairs.sort(key=lambda x: x[1], reverse=True)
+    labels, values = zip(*pairs) if pairs else ([], [])
+    return list(labels), list(values)
+
+
+def cap_slices(labels: List[str], values: List[float], max_slices: int = DEFAULT_MAX_SLICES) -> Tuple[List[str], List[float]]:
+    """
+    Keep at most `max_slices` slices of descending-sorted pie data: the largest
+    `max_slices - 1` are kept and the tail is merged into 'Other' (or an existing
+    'Other' slice). Use 0 to disable.
+    """
+    if not max_slices or max_slices <= 0 or len(labels) <= max_slices:
+        return labels, values
+
+    keep_labels = list(labels[:max_slices - 1])
+    keep_values = list(values[:max_slices - 1])
+    tail = float(sum(values[max_slices - 1:]))
+    for i, lbl in enumerate(keep_labels):
+        if 'other' in str(lbl).strip().lower():
+            keep_values[i] += tail
+            break
+    else:
+        other_label = next((lbl for lbl in labels[max_slices - 1:] if 'other' in str(lbl).strip().lower()), 'Other')
+        keep_labels.append(other_label)
+        keep_values.append(tail)
+
+    pairs = sorted(zip(keep_labels, keep_values), key=lambda x: x[1], reverse=True)
+    return [k for k, _ in pairs], [v for _, v in pairs]
+
+
+def compact_values(values: List[float]) -> np.ndarray:
+    """
+    Pack pie values as a NumPy array so Plotly serializes them as base64 typed arrays
+    instead of decimal JSON text. float32 is used when it still shows the one-decimal
+    hover values exactly; otherwise float64.
+    """
+    arr = np.asarray(values, dtype=np.float64)
+    small = arr.astype(np.float32)
+    if np.all(np.abs(small.astype(np.float64) - arr) < 0.05):
+        return small
+    return arr
+
+
+def pie_slices(data_dict: Dict[str, float], combine_threshold: float, max_slices: int = 0):
+    """
+    Labels and values for one Plotly pie (see `prepare_pie_data`). With `max_slices`
+    (compact rendering) the pie is capped to that many slices (see `cap_slices`) and the
+    values are packed as a typed array (see `compact_values`).
+    """
+    labels, values = prepare_pie_data(data_dict, combine_threshold)
+    if max_slices:
+        labels, values = cap_slices(labels, values, max_slices)
+        values = compact_values(values)
+    return labels, values
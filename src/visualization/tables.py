@@ -0,0 +1,32 @@
+# Rows of a distribution table sent to the browser per page in compact rendering mode
+TABLE_PAGE_SIZE = 200
+NUMBER_COLUMNS = ('Value', 'Cost', 'P&L', 'P&L %')
+
+
+def table_html(df) -> str:
+    """
+    Classic rendering: the whole table as centered HTML without the index column,
+    numbers to one decimal place.
+    """
+    return (
+        "<style>table.dataframe td, table.dataframe th { text-align: center; }</style>"
+        + df.to_html(index=False, float_format='%.1f', na_rep='n/a')
+    )
+
+
+def show_table(df, key: str, page_size: int = TABLE_PAGE_SIZE) -> None:
+    """
+    Render a distribution table in Streamlit as a virtualized data grid, one page at a
+    time, so only `page_size` rows are sent to the browser per rerun. `key` identifies
+    the page selector and must be unique per table on the page.
+    """
+    import streamlit as st
+
+    pages = max(1, -(-len(df) // page_size))
+    page = 1
+    if pages > 1:
+        page = st.number_input(f'Page (of {pages})', min_value=1, max_value=pages, value=1, step=1, key=key)
+    window = df.iloc[(page - 1) * page_size: page * page_size]
+    number = st.column_config.NumberColumn(format='%.1f')
+    st.dataframe(window, hide_index=True, use_container_width=True,
+                 column_config={c: number for c in window.columns if c in NUMBER_COLUMNS})
@@ -9,16 +9,36 @@ SRC = os.path.join(ROOT, 'src')
 if SRC not in sys.path:
     sys.path.insert(0, SRC)
 
-from utils.csv_loader import load_csv_data, load_simple_csv
-from data.analyzer import (
-    calculate_asset_values,
-    calculate_category_distribution,
-    calculate_from_values,
-    get_current_price,
-)
+from data.analyzer import get_current_price, missing_fx_message
+from data.market_calendar import FreshnessPolicy
+from data.pipeline import bucket_breakdown, cached_pipeline
+from data.price_cache import PriceCache
+from data.price_replay import SourceTimer
+from utils.memory_cache import MemoryCache, content_hash
+from utils.profiling import Profiler
+from visualization.plotly_pies import DEFAULT_MAX_SLICES, pie_slices
+from visualization.tables import show_table, table_html
 
 st.set_page_config(page_title='BetBoard', layout='wide')
 
+
+@st.cache_resource
+def get_price_cache():
+    # One warm cache per server process, shared by all sessions. Closed-session prices
+    # are reused until the market reopens instead of being refetched on every rerun.
+    return PriceCache(get_current_price, policy=FreshnessPolicy())
+
+
+@st.cache_resource
+def get_memory_cache():
+    # Parsed uploads, valuations and pie figures keyed by content hash, shared by all
+    # sessions and LRU-evicted past the byte budget
+    return MemoryCache()
+
+
+price_fetcher = get_price_cache()
+memory_cache = get_memory_cache()
+
 st.title('BetBoard')
 
 st.sidebar.header('Input')
@@ -46,329 +66,152 @@ detailed = st.sidebar.checkbox('Detailed Asset Chart', value=False)
 # Show integer percent steps from 0..20 (whole numbers only). Convert to fraction for internal use.
 combine_pct = st.sidebar.slider('Combine threshold (%)', 0, 20, 2, step=1)
 combine_threshold = float(combine_pct) / 100.0
+# Live prices are converted into this currency (quote currencies are detected per ticker)
+base_currency = st.sidebar.selectbox('Base currency', ['USD', 'EUR', 'GBP', 'INR', 'JPY', 'CAD', 'AUD', 'CHF'])
+# Compact rendering keeps the page payload bounded for very large portfolios: pies send at
+# most `max_slices` slices as binary arrays and tables become paginated data grids.
+compact = st.sidebar.checkbox('Compact rendering (large portfolios)', value=True)
+max_slices = st.sidebar.number_input('Max pie slices', min_value=5, max_value=500, value=DEFAULT_MAX_SLICES, step=5, disabled=not compact)
 
 if csv_path:
     # st.header('Portfolio')
+    # Per-rerun stage timings, shown in the 'Timings' expander at the bottom
+    profiler = Profiler()
     try:
-        # Handle Simple vs Live mode. If user selected Simple but their CSV doesn't contain
-        # an 'Amount' column, fall back to Live mode (using Ticker/Quantity) and warn.
-        rows = None
-        data = None
-        if mode.startswith('Simple'):
-            # Peek at CSV headers to ensure 'Amount' exists; if not, fallback to live
-            try:
-                # If csv_path is a Streamlit uploaded file (file-like), ensure pointer is at 0
-                if not isinstance(csv_path, str):
-                    try:
-                        csv_path.seek(0)
-                    except Exception:
-                        pass
-                peek_cols = {c.strip().lower() for c in pd.read_csv(csv_path, nrows=0).columns}
-            except Exception:
-                peek_cols = set()
-
-            if 'amount' not in peek_cols:
-                # Try to synthesize Amount from Quantity * Avg Buy Price without performing live price fetches
-                # If csv_path is a file-like uploaded object, reset pointer first
-                if not isinstance(csv_path, str):
-                    try:
-                        csv_path.seek(0)
-                    except Exception:
-                        pass
-                df_peek = pd.read_csv(csv_path)
-                # normalize column lookup by lowercasing stripped names
-                col_map = {c.strip().lower(): c for c in df_peek.columns}
-                if 'quantity' in col_map and ('avg buy price' in col_map or 'avg_buy_price' in col_map or 'avgbuyprice' in col_map):
-                    # find the actual Avg Buy Price column name
-                    abp_key = None
-                    for key in ('avg buy price', 'avg_buy_price', 'avgbuyprice'):
-                        if key in col_map:
-                            abp_key = col_map[key]
-                            break
-                    qty_col = col_map['quantity']
-                    try:
-                        df_peek[qty_col] = pd.to_numeric(df_peek[qty_col].astype(str).str.replace(',', ''), errors='coerce').fillna(0)
-                        df_peek[abp_key] = pd.to_numeric(df_peek[abp_key].astype(str).str.replace(',', ''), errors='coerce').fillna(0)
-                        df_peek['Amount'] = df_peek[qty_col] * df_peek[abp_key]
-                        # Build simple rows expected by calculate_from_values
-                        # Ensure we have Asset and Category columns
-                        if 'asset' in col_map and 'category' in col_map:
-                            asset_col = col_map['asset']
-                            category_col = col_map['category']
-                            simple_df = df_peek[[asset_col, category_col, 'Amount']].rename(columns={asset_col: 'Asset', category_col: 'Category'})
-                            # Preserve optional Bucket column if present
-                            if 'bucket' in col_map:
-                                simple_df['Bucket'] = df_peek[col_map['bucket']].astype(str).str.strip().replace({'': None})
-                            rows = simple_df.to_dict(orient='records')
-                            result = calculate_from_values(rows)
-                            asset_values = result['asset_values']
-                            category_distribution = result['category_distribution']
-                        else:
-                            raise ValueError("Simple mode requires 'Asset' and 'Category' columns when synthesizing Amount from Quantity and Avg Buy Price.")
-                    except Exception as exc:
-                        raise ValueError(f"Failed to synthesize Amount from Quantity and Avg Buy Price: {exc}")
-                else:
-                    raise ValueError("Simple mode expects an 'Amount' column or Quantity+Avg Buy Price columns to compute amounts; no fallback to live mode.")
-            else:
-                # Ensure file pointer reset for loader if necessary
-                if not isinstance(csv_path, str):
-                    try:
-                        csv_path.seek(0)
-                    except Exception:
-                        pass
-                rows = load_simple_csv(csv_path)
-                result = calculate_from_values(rows)
-                asset_values = result['asset_values']
-                category_distribution = result['category_distribution']
-        else:
-            # Reset file pointer for loader if necessary
-            if not isinstance(csv_path, str):
-                try:
-                    csv_path.seek(0)
-                except Exception:
-                    pass
-            data = load_csv_data(csv_path)
-            # default: live fetcher uses get_current_price which will hit network
-            asset_values = calculate_asset_values(data, price_fetcher=get_current_price)
-            category_distribution = calculate_category_distribution(data, price_fetcher=get_current_price)
-
-    # Show distributions in tables (with headers) and format numbers to 1 decimal place
-        # Use HTML output to reliably hide the index column and center-align text
-        assets_df = pd.DataFrame(sorted(asset_values.items(), key=lambda x: x[1], reverse=True), columns=['Asset', 'Value'])
-        # Append Total row summing the Value column
-        try:
-            assets_total = float(assets_df['Value'].sum()) if not assets_df.empty else 0.0
-        except Exception:
-            assets_total = 0.0
-        assets_df = pd.concat([assets_df, pd.DataFrame([{'Asset': 'Total', 'Value': assets_total}])], ignore_index=True)
-        assets_html = (
-            "<style>table.dataframe td, table.dataframe th { text-align: center; }</style>"
-            + assets_df.to_html(index=False, float_format='%.1f')
-        )
-
-        cats_df = pd.DataFrame(sorted(category_distribution.items(), key=lambda x: x[1], reverse=True), columns=['Category', 'Value'])
-        # Append Total row summing the Value column
-        try:
-            cats_total = float(cats_df['Value'].sum()) if not cats_df.empty else 0.0
-        except Exception:
-            cats_total = 0.0
-        cats_df = pd.concat([cats_df, pd.DataFrame([{'Category': 'Total', 'Value': cats_total}])], ignore_index=True)
-        cats_html = (
-            "<style>table.dataframe td, table.dataframe th { text-align: center; }</style>"
-            + cats_df.to_html(index=False, float_format='%.1f')
-        )
-
-        # Determine source rows and whether an actual 'Bucket' column exists
-        source_rows = rows if mode.startswith('Simple') else data
-        has_bucket_column = False
-        try:
-            for entry in source_rows:
-                if isinstance(entry, dict) and 'Bucket' in entry and entry.get('Bucket') not in (None, '', 'None'):
-                    has_bucket_column = True
-                    break
-        except Exception:
-            has_bucket_column = False
-
-        # Bucket distribution (only compute if Bucket column is present)
-        bucket_distribution = {}
-        if has_bucket_column:
-            if mode.startswith('Simple'):
-                try:
-                    bucket_distribution = result.get('bucket_distribution', {})
-                except Exception:
-                    bucket_distribution = {}
-            else:
-                try:
-                    from data.analyzer import calculate_bucket_distribution
-                    bucket_distribution = calculate_bucket_distribution(data, price_fetcher=get_current_price)
-                except Exception:
-                    bucket_distribution = {}
-
-        buckets_df = pd.DataFrame(sorted(bucket_distribution.items(), key=lambda x: x[1], reverse=True), columns=['Bucket', 'Value']) if bucket_distribution else pd.DataFrame(columns=['Bucket', 'Value'])
-        # Append Total row for buckets as well (show 0.0 if empty)
-        try:
-            buckets_total = float(buckets_df['Value'].sum()) if not buckets_df.empty else 0.0
-        except Exception:
-            buckets_total = 0.0
-        if has_bucket_column:
-            buckets_df = pd.concat([buckets_df, pd.DataFrame([{'Bucket': 'Total', 'Value': buckets_total}])], ignore_index=True)
-            buckets_html = (
-                "<style>table.dataframe td, table.dataframe th { text-align: center; }</style>"
-                + buckets_df.to_html(index=False, float_format='%.1f')
-            )
+        # The pipeline reads the CSV once. In Simple mode a CSV without an 'Amount' column is
+        # valued at cost (Quantity * Avg Buy Price) rather than falling back to live prices.
+        # Unrealized P&L is only available in Live mode (Simple CSVs carry no cost basis).
+        # Parsed input and valuation are reused across reruns and sessions by content hash.
+        simple = mode.startswith('Simple')
+        if isinstance(csv_path, str):
+            with open(csv_path, 'rb') as f:
+                data = f.read()
         else:
-            buckets_html = ""
-
+            data = csv_path.getvalue()
+        with SourceTimer(profiler):
+            portfolio = cached_pipeline(data, simple=simple, base_currency=base_currency, cache=memory_cache,
+                                        price_fetcher=price_fetcher, profiler=profiler)
+        profiler.lap('memory cache')
+        if portfolio.result.get('missing_fx'):
+            st.warning(missing_fx_message(portfolio.result['missing_fx']))
+        asset_values = portfolio.result['asset_values']
+        category_distribution = portfolio.result['category_distribution']
+
+        # Bucket distribution (only when the CSV has a Bucket column)
+        has_bucket_column = portfolio.store.has_bucket
+        bucket_distribution = portfolio.result['bucket_distribution'] if has_bucket_column else {}
+
+        # Show distributions in tables (with headers) and format numbers to 1 decimal place.
         # Render tables: show 3 columns only if bucket data exists; otherwise show 2 columns
+        tables = [('Asset Distribution', 'asset'), ('Category Distribution', 'category')]
         if has_bucket_column:
-            col1, col2, col3 = st.columns([1, 1, 1])
-            with col1:
-                st.subheader('Asset Distribution')
-                st.markdown(assets_html, unsafe_allow_html=True)
-            with col2:
-                st.subheader('Category Distribution')
-                st.markdown(cats_html, unsafe_allow_html=True)
-            with col3:
-                st.subheader('Bucket Distribution')
-                st.markdown(buckets_html, unsafe_allow_html=True)
-        else:
-            col1, col2 = st.columns([1, 1])
-            with col1:
-                st.subheader('Asset Distribution')
-                st.markdown(assets_html, unsafe_allow_html=True)
-            with col2:
-                st.subheader('Category Distribution')
-                st.markdown(cats_html, unsafe_allow_html=True)
+            tables.append(('Bucket Distribution', 'bucket'))
+        for col, (title, key) in zip(st.columns([1] * len(tables)), tables):
+            with col:
+                st.subheader(title)
+                if compact:
+                    show_table(portfolio.tables[key], key=f'{key}_page')
+                else:
+                    st.markdown(table_html(portfolio.tables[key]), unsafe_allow_html=True)
+
+        profiler.lap('table render')
 
         # Prepare and render Plotly pies directly for better Streamlit UX
         import plotly.graph_objects as go
         from plotly.subplots import make_subplots
 
-        def prepare_pie_data(data_dict, combine_threshold, respect_existing_other=True):
-            """
-            Return labels and values applying combining logic similar to plot_pie.
-            If combine_threshold == 0, do not combine.
-            """
-            items = [(k, float(v)) for k, v in data_dict.items() if float(v) > 0]
-            total = sum(v for _, v in items)
-            if total == 0:
-                return [], []
-
-            # detect existing other
-            existing_other = None
-            for k, _ in items:
-                if 'other' in str(k).strip().lower():
-                    existing_other = k
-                    break
-
-            # split
-            if combine_threshold and combine_threshold > 0:
-                big = []
-                small_sum = 0.0
-                for k, v in items:
-                    # Always keep 'Cash' separate regardless of threshold
-                    if str(k).strip().lower() == 'cash':
-                        big.append((k, v))
-                        continue
-                    if v / total < combine_threshold:
-                        small_sum += v
-                    else:
-                        big.append((k, v))
-                if small_sum > 0:
-                    if existing_other is not None:
-                        # add to existing other
-                        for i, (k, v) in enumerate(big):
-                            if 'other' in str(k).strip().lower():
-                                big[i] = (k, v + small_sum)
-                                break
-                        else:
-                            big.append((existing_other, small_sum))
-                    else:
-                        big.append(('Other', small_sum))
-                labels = [k for k, _ in big]
-                values = [v for _, v in big]
-            else:
-                labels = [k for k, _ in items]
-                values = [v for _, v in items]
-
-            # sort descending
-            pairs = list(zip(labels, values))
-            pairs.sort(key=lambda x: x[1], reverse=True)
-            labels, values = zip(*pairs) if pairs else ([], [])
-            return list(labels), list(values)
-
         # apply combine threshold to assets unless detailed view is requested
         asset_threshold = 0 if detailed else combine_threshold
-        a_labels, a_values = prepare_pie_data(asset_values, asset_threshold)
-        c_labels, c_values = prepare_pie_data(category_distribution, combine_threshold)
-
-        # Create subplots: include bucket pie if we have bucket data
-        # We will render the main three pies on the first row, and two bucket-specific
-        # asset-breakdown pies on the second row (Long-Term & Speculative) centered.
-        # Prepare per-bucket asset breakdowns so we can show asset-level pies for each bucket.
-        bucket_asset_breakdowns = {}
-        try:
-            # pick source rows depending on mode
-            source_rows = rows if mode.startswith('Simple') else data
-            for entry in source_rows:
-                b = (entry.get('Bucket') or 'Unbucketed') if isinstance(entry, dict) else 'Unbucketed'
-                asset = (entry.get('Asset') or '') if isinstance(entry, dict) else ''
-                if mode.startswith('Simple'):
-                    value = float(entry.get('Amount') or 0)
-                else:
-                    qty = float(entry.get('Quantity') or 0)
-                    ticker = entry.get('Ticker') or asset
-                    # use the same price fetcher used earlier
-                    price = get_current_price(ticker, asset)
-                    value = qty * price
-                bucket_asset_breakdowns.setdefault(b, {})
-                bucket_asset_breakdowns[b][asset] = bucket_asset_breakdowns[b].get(asset, 0.0) + value
-        except Exception:
-            bucket_asset_breakdowns = {}
-
-        # Create subplots conditionally: include bucket-related charts only when bucket data exists
-        if has_bucket_column and bucket_distribution and sum(bucket_distribution.values()) > 0:
-            # Full layout: top row (Assets, Categories, Buckets), bottom row (per-bucket asset breakdowns)
-            # reduce vertical_spacing so plots sit closer to the tables above
-            # Dynamically choose bottom-row per-bucket pies. Prefer 'Long-Term' if present,
-            # otherwise pick the top two buckets by size. This handles renames like 'Speculative' -> 'Trade'.
-            sorted_bucket_names = [k for k, _ in sorted(bucket_distribution.items(), key=lambda x: x[1], reverse=True)]
-            primary_bucket = 'Long-Term' if 'Long-Term' in sorted_bucket_names else (sorted_bucket_names[0] if sorted_bucket_names else None)
-            secondary_bucket = None
-            for name in sorted_bucket_names:
-                if name != primary_bucket:
-                    secondary_bucket = name
-                    break
-            # Build subplot titles dynamically so labels match actual bucket names
-            bottom_primary_title = primary_bucket or ''
-            bottom_secondary_title = secondary_bucket or ''
-
-            fig = make_subplots(rows=2, cols=3,
-                                specs=[[{'type': 'domain'}, {'type': 'domain'}, {'type': 'domain'}],
-                                       [{'type': 'domain'}, {'type': 'domain'}, {'type': 'domain'}]],
-                                row_heights=[0.60, 0.40],
-                                vertical_spacing=0.04,
-                                subplot_titles=['Assets', 'Categories', 'Buckets', '', bottom_primary_title, bottom_secondary_title])
-
-            # Top row
-            fig.add_trace(go.Pie(labels=a_labels, values=a_values, name='Assets'), 1, 1)
-            fig.add_trace(go.Pie(labels=c_labels, values=c_values, name='Categories'), 1, 2)
-            b_labels, b_values = prepare_pie_data(bucket_distribution, combine_threshold)
-            fig.add_trace(go.Pie(labels=b_labels, values=b_values, name='Buckets'), 1, 3)
-
-            # Bottom row: only add per-bucket pies if there is asset-level data for those buckets
-            target_buckets = [b for b in (primary_bucket, secondary_bucket) if b]
-            for idx, bname in enumerate(target_buckets):
-                col = 2 + idx  # places in column 2 and 3 on the bottom row
-                items = bucket_asset_breakdowns.get(bname, {}) if bucket_asset_breakdowns else {}
-                blabels, bvalues = prepare_pie_data(items, combine_threshold)
-                if blabels and sum(bvalues) > 0:
-                    fig.add_trace(go.Pie(labels=blabels, values=bvalues, name=bname), 2, col)
-        else:
-            # Simpler layout: only Assets and Categories
-            # Use a tighter layout and smaller height when buckets are absent
-            fig = make_subplots(rows=1, cols=2, specs=[[{'type': 'domain'}, {'type': 'domain'}]],
-                                subplot_titles=['Assets', 'Categories'])
-            fig.add_trace(go.Pie(labels=a_labels, values=a_values, name='Assets'), 1, 1)
-            fig.add_trace(go.Pie(labels=c_labels, values=c_values, name='Categories'), 1, 2)
-
-        # show label + percent with one decimal, and hover shows value with one decimal
-        fig.update_traces(textinfo='none',
-                          texttemplate='%{label}<br>%{percent:.1%}',
-                          hovertemplate='%{label}<br>%{value:,.1f} (%{percent:.1%})')
-
-        # Choose a more compact figure height and smaller top margin so pies sit closer to the tables
-        if has_bucket_column and bucket_distribution and sum(bucket_distribution.values()) > 0:
-            fig_height = 700
-            top_margin = 40
-        else:
-            fig_height = 520
-            top_margin = 16
-        fig.update_layout(height=fig_height, margin=dict(t=top_margin, b=24, l=16, r=16))
+        # In compact mode every pie, including the per-bucket ones, is capped and packed
+        slice_cap = int(max_slices) if compact else 0
+
+        def build_figure():
+            a_labels, a_values = pie_slices(asset_values, asset_threshold, slice_cap)
+            c_labels, c_values = pie_slices(category_distribution, combine_threshold, slice_cap)
+
+            # Create subplots: include bucket pie if we have bucket data
+            # We will render the main three pies on the first row, and two bucket-specific
+            # asset-breakdown pies on the second row (Long-Term & Speculative) centered.
+
+            # Create subplots conditionally: include bucket-related charts only when bucket data exists
+            if has_bucket_column and bucket_distribution and sum(bucket_distribution.values()) > 0:
+                # Full layout: top row (Assets, Categories, Buckets), bottom row (per-bucket asset breakdowns)
+                # reduce vertical_spacing so plots sit closer to the tables above
+                # Dynamically choose bottom-row per-bucket pies. Prefer 'Long-Term' if present,
+                # otherwise pick the top two buckets by size. This handles renames like 'Speculative' -> 'Trade'.
+                sorted_bucket_names = [k for k, _ in sorted(bucket_distribution.items(), key=lambda x: x[1], reverse=True)]
+                primary_bucket = 'Long-Term' if 'Long-Term' in sorted_bucket_names else (sorted_bucket_names[0] if sorted_bucket_names else None)
+                secondary_bucket = None
+                for name in sorted_bucket_names:
+                    if name != primary_bucket:
+                        secondary_bucket = name
+                        break
+                # Build subplot titles dynamically so labels match actual bucket names
+                bottom_primary_title = primary_bucket or ''
+                bottom_secondary_title = secondary_bucket or ''
+
+                fig = make_subplots(rows=2, cols=3,
+                                    specs=[[{'type': 'domain'}, {'type': 'domain'}, {'type': 'domain'}],
+                                           [{'type': 'domain'}, {'type': 'domain'}, {'type': 'domain'}]],
+                                    row_heights=[0.60, 0.40],
+                                    vertical_spacing=0.04,
+                                    subplot_titles=['Assets', 'Categories', 'Buckets', '', bottom_primary_title, bottom_secondary_title])
+
+                # Top row
+                fig.add_trace(go.Pie(labels=a_labels, values=a_values, name='Assets'), 1, 1)
+                fig.add_trace(go.Pie(labels=c_labels, values=c_values, name='Categories'), 1, 2)
+                b_labels, b_values = pie_slices(bucket_distribution, combine_threshold, slice_cap)
+                fig.add_trace(go.Pie(labels=b_labels, values=b_values, name='Buckets'), 1, 3)
+
+                # Bottom row: only add per-bucket pies if there is asset-level data for those buckets
+                target_buckets = [b for b in (primary_bucket, secondary_bucket) if b]
+                for idx, bname in enumerate(target_buckets):
+                    col = 2 + idx  # places in column 2 and 3 on the bottom row
+                    # Asset-level values within the bucket, from the pipeline's per-position values (no refetching)
+                    items = bucket_breakdown(portfolio, bname)
+                    blabels, bvalues = pie_slices(items, combine_threshold, slice_cap)
+                    if blabels and sum(bvalues) > 0:
+                        fig.add_trace(go.Pie(labels=blabels, values=bvalues, name=bname), 2, col)
+            else:
+                # Simpler layout: only Assets and Categories
+                # Use a tighter layout and smaller height when buckets are absent
+                fig = make_subplots(rows=1, cols=2, specs=[[{'type': 'domain'}, {'type': 'domain'}]],
+                                    subplot_titles=['Assets', 'Categories'])
+                fig.add_trace(go.Pie(labels=a_labels, values=a_values, name='Assets'), 1, 1)
+                fig.add_trace(go.Pie(labels=c_labels, values=c_values, name='Categories'), 1, 2)
+
+            # show label + percent with one decimal, and hover shows value with one decimal
+            fig.update_traces(textinfo='none',
+                              texttemplate='%{label}<br>%{percent:.1%}',
+                              hovertemplate='%{label}<br>%{value:,.1f} (%{percent:.1%})')
+
+            # Choose a more compact figure height and smaller top margin so pies sit closer to the tables
+            if has_bucket_column and bucket_distribution and sum(bucket_distribution.values()) > 0:
+                fig_height = 700
+                top_margin = 40
+            else:
+                fig_height = 520
+                top_margin = 16
+            fig.update_layout(height=fig_height, margin=dict(t=top_margin, b=24, l=16, r=16))
+
+            # Ensure legend/font sizes are comfortable
+            fig.update_layout(legend=dict(font=dict(size=11)))
+            return fig
 
-        # Ensure legend/font sizes are comfortable
-        fig.update_layout(legend=dict(font=dict(size=11)))
+        # Per-bucket breakdowns depend on the holdings as well as the totals, hence the input key
+        figure_key = content_hash(portfolio.key, asset_values, category_distribution, bucket_distribution,
+                                  asset_threshold, combine_threshold, slice_cap)
+        fig = memory_cache.get_or_compute(('figure', figure_key), build_figure)
+        profiler.lap('figure build')
 
         st.plotly_chart(fig, use_container_width=True)
+        profiler.lap('render')
+
+        with st.expander('Timings'):
+            st.dataframe(pd.DataFrame(profiler.rows()), hide_index=True)
+            stats = memory_cache.stats()
+            st.caption(f"Memory cache: {stats['entries']} entries, {stats['bytes'] / 2**20:.1f} of "
+                       f"{stats['max_bytes'] / 2**20:.0f} MB, {stats['hits']} hits / {stats['misses']} misses, "
+                       f"{stats['evictions']} evictions")
     except Exception as e:
         st.error(f'Failed to load or render CSV: {e}')
@@ -0,0 +1,68 @@
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Modules import each other as top-level packages (`from data.x import ...`), the way
+# src/main.py runs them, so put src/ on the path (and the repo root for the apps)
+for path in (ROOT, os.path.join(ROOT, 'src')):
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+# Never open plot windows from tests
+os.environ.setdefault('MPLBACKEND', 'Agg')
+
+
+def pytest_addoption(parser):
+    parser.addoption('--runslow', action='store_true', default=False, help='also run tests marked slow (e.g. the scaling run)')
+
+
+def pytest_configure(config):
+    config.addinivalue_line('markers', 'slow: long-running test, skipped unless --runslow is given')
+
+
+def pytest_collection_modifyitems(config, items):
+    if config.getoption('--runslow'):
+        return
+    skip = pytest.mark.skip(reason='slow: pass --runslow to run')
+    for item in items:
+        if 'slow' in item.keywords:
+            item.add_marker(skip)
+
+
+PRICES = {'AAPL': 200.0, 'VTI': 250.0, 'GOOGL': 150.0, 'BTC': 60000.0, 'ETH': 3000.0}
+
+
+class StubPrices:
+    """Price fetcher with fixed prices that counts lookups per ticker (no network)."""
+
+    def __init__(self, prices=None):
+        self.prices = dict(PRICES if prices is None else prices)
+        self.calls = []
+
+    def __call__(self, ticker, asset):
+        self.calls.append(ticker)
+        if str(asset).upper() == 'CASH':
+            return 1.0
+        return self.prices.get(str(ticker).lstrip('$').strip().upper(), 0.0)
+
+
+@pytest.fixture
+def stub_prices():
+    return StubPrices()
+
+
+DETAILED_CSV = (
+    'Asset,Ticker,Quantity,Category,Avg Buy Price,Bucket\n'
+    'Apple,AAPL,10,Taxable equity,150,Long-Term\n'
+    'VTI,VTI,4,401K,200,Long-Term\n'
+    'Bitcoin,BTC,0.5,Crypto,30000,Trade\n'
+    'Apple,$aapl,5,IRA,100,Trade\n'
+    'CASH,CASH,1000,Savings,1,Cash\n'
+)
+
+
+@pytest.fixture
+def detailed_csv():
+    return DETAILED_CSV
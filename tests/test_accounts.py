@@ -0,0 +1,48 @@
+import pytest
+
+import main
+from data.pipeline import run_pipeline
+from utils.csv_loader import account_names, load_accounts
+
+HEADER = 'Asset,Ticker,Quantity,Category,Avg Buy Price\n'
+
+
+@pytest.fixture
+def brokers(tmp_path):
+    """fidelity/holdings.csv and schwab/holdings.csv, both holding Apple."""
+    paths = []
+    for broker, rows in (('fidelity', 'Apple,AAPL,10,Eq,150\nVTI,VTI,4,Fund,200\n'),
+                         ('schwab', 'Apple,$aapl,5,Eq,100\n')):
+        (tmp_path / broker).mkdir()
+        path = tmp_path / broker / 'holdings.csv'
+        path.write_text(HEADER + rows)
+        paths.append(str(path))
+    return paths
+
+
+def test_accounts_with_the_same_file_name_stay_apart(brokers, stub_prices):
+    store = load_accounts(brokers)
+    assert list(store.account.labels) == ['fidelity/holdings', 'schwab/holdings']
+
+    portfolio = run_pipeline(brokers, price_fetcher=stub_prices)
+    assert portfolio.result['account_distribution'] == {'fidelity/holdings': 3000.0, 'schwab/holdings': 1000.0}
+    assert portfolio.result['asset_values']['Apple'] == 3000.0
+    # Apple is held in both files but priced once
+    assert sorted(stub_prices.calls) == ['AAPL', 'VTI']
+
+
+def test_distinct_file_names_are_kept_as_is(tmp_path):
+    assert account_names([str(tmp_path / 'a' / 'fidelity.csv'), str(tmp_path / 'b' / 'schwab.csv')]) == ['fidelity', 'schwab']
+    with pytest.raises(ValueError, match='same name'):
+        account_names([str(tmp_path / 'a' / 'x.csv'), str(tmp_path / 'a' / 'x.csv')])
+
+
+def test_snapshot_portfolio_names_do_not_overwrite_each_other(tmp_path):
+    (tmp_path / 'family').mkdir()
+    (tmp_path / 'family' / 'joint.csv').write_text(HEADER)
+    (tmp_path / 'csv').mkdir()
+    (tmp_path / 'csv' / 'family.csv').write_text(HEADER)
+    sources = main._snapshot_sources([str(tmp_path / 'family'), str(tmp_path / 'csv' / 'family.csv')])
+    assert len(sources) == 2
+    assert sources[f'{tmp_path.name}/family'] == [str(tmp_path / 'family' / 'joint.csv')]
+    assert sources['csv/family'] == [str(tmp_path / 'csv' / 'family.csv')]
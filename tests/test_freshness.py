@@ -0,0 +1,86 @@
+from datetime import date, datetime
+from zoneinfo import ZoneInfo
+
+from data.fx import FxRates
+from data.market_calendar import FreshnessPolicy, fx_is_open, fx_last_close, is_open, last_close, last_session, US
+
+
+def ts(text, tz='America/New_York'):
+    return datetime.fromisoformat(text).replace(tzinfo=ZoneInfo(tz)).timestamp()
+
+
+# 2026-10-16 is a Friday
+FRIDAY_CLOSE = ts('2026-10-16 16:00')
+
+
+def test_sessions_and_last_close():
+    assert is_open(US, ts('2026-10-16 10:00'))
+    assert not is_open(US, ts('2026-10-17 10:00'))
+    assert last_close(US, ts('2026-10-18 12:00')) == FRIDAY_CLOSE
+    assert last_close(US, ts('2026-10-19 09:00')) == FRIDAY_CLOSE
+    assert last_close(US, ts('2026-10-16 15:59')) == ts('2026-10-15 16:00')
+
+
+def test_last_session_of_the_held_exchanges():
+    assert last_session(['AAPL', 'BTC'], now=ts('2026-10-17 12:00')) == date(2026, 10, 16)
+    assert last_session(['BTC', 'INRUSD=X'], now=ts('2026-10-19 09:00')) == date(2026, 10, 16)
+    # NSE has closed for Monday (06:00 New York) before the US opens
+    assert last_session(['AAPL', 'SWIGGY.NS'], now=ts('2026-10-19 08:00')) == date(2026, 10, 19)
+    assert last_session(['AAPL'], now=ts('2026-10-19 08:00')) == date(2026, 10, 16)
+    assert last_session(['AAPL'], now=ts('2026-10-19 17:00'), holidays={'US': [date(2026, 10, 19)]}) == date(2026, 10, 16)
+
+
+def test_equity_close_stays_fresh_over_the_weekend():
+    policy = FreshnessPolicy(ttl=60)
+    fetched = FRIDAY_CLOSE + 1800
+    assert policy.is_fresh('AAPL', 'Apple', fetched, now=ts('2026-10-18 20:00'))
+    assert not policy.is_fresh('AAPL', 'Apple', fetched, now=ts('2026-10-19 09:31'))
+    # Fetched before the close settled: refetch once the market is shut
+    assert not policy.is_fresh('AAPL', 'Apple', FRIDAY_CLOSE + 60, now=ts('2026-10-17 12:00'))
+    # Open market: plain TTL
+    assert policy.is_fresh('AAPL', 'Apple', ts('2026-10-19 10:00'), now=ts('2026-10-19 10:00:30'))
+    assert not policy.is_fresh('AAPL', 'Apple', ts('2026-10-19 10:00'), now=ts('2026-10-19 10:02'))
+
+
+def test_crypto_cash_and_foreign_exchanges():
+    policy = FreshnessPolicy(ttl=60, crypto_ttl=30)
+    now = ts('2026-10-17 12:00')
+    assert policy.is_fresh('CASH', 'CASH', 0, now=now)
+    assert not policy.is_fresh('BTC', 'Bitcoin', now - 31, now=now)
+    # NSE closed 15:30 IST on Friday; a later fetch is good all weekend
+    assert policy.is_fresh('SWIGGY.NS', 'Swiggy', ts('2026-10-16 16:00', 'Asia/Kolkata'), now=now)
+
+
+def test_fx_session():
+    assert fx_is_open(ts('2026-10-16 16:59'))
+    assert not fx_is_open(ts('2026-10-16 17:00'))
+    assert not fx_is_open(ts('2026-10-17 12:00'))
+    assert fx_is_open(ts('2026-10-18 17:00'))
+    assert fx_last_close(ts('2026-10-18 12:00')) == ts('2026-10-16 17:00')
+    assert fx_last_close(ts('2026-10-16 12:00')) == ts('2026-10-09 17:00')
+
+    policy = FreshnessPolicy(fx_ttl=3600)
+    weekend_rate = ts('2026-10-16 18:00')
+    assert policy.is_fresh('INRUSD=X', '', weekend_rate, now=ts('2026-10-18 16:00'))
+    assert not policy.is_fresh('INRUSD=X', '', weekend_rate, now=ts('2026-10-18 18:00'))
+
+
+def test_fx_rates_persist_and_reuse_weekend_rates(tmp_path, monkeypatch):
+    path = str(tmp_path / 'fx.json')
+    batches = []
+
+    def fetcher(symbols):
+        batches.append(list(symbols))
+        return {s: 0.012 for s in symbols}
+
+    import data.fx as fx
+    monkeypatch.setattr(fx.time, 'time', lambda: ts('2026-10-17 12:00'))
+    first = FxRates(fetcher, policy=FreshnessPolicy(), path=path)
+    assert first.rates(['INR'], 'USD') == {'INR': 0.012}
+    first.save()
+
+    # A later cold run on Sunday reads the saved Saturday rate and makes no request
+    monkeypatch.setattr(fx.time, 'time', lambda: ts('2026-10-18 10:00'))
+    second = FxRates(fetcher, policy=FreshnessPolicy(), path=path)
+    assert second.rates(['INR'], 'USD') == {'INR': 0.012}
+    assert batches == [['INRUSD=X']]
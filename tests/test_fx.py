@@ -0,0 +1,83 @@
+import warnings
+
+import numpy as np
+import pytest
+
+from data.analyzer import calculate_valuation, fx_factors
+from data.fx import FxRates, quote_currency, unknown_suffix
+from data.positions import PositionStore
+
+
+class StubFx:
+    """Batched FX fetcher with fixed rates that records each batch."""
+
+    def __init__(self, rates):
+        self.rates = rates
+        self.batches = []
+
+    def __call__(self, symbols):
+        self.batches.append(list(symbols))
+        return {s: self.rates[s] for s in symbols if s in self.rates}
+
+
+def test_quote_currency_and_unknown_suffix():
+    assert quote_currency('SWIGGY.NS', 'Swiggy') == 'INR'
+    assert quote_currency('VOD.L', 'Vodafone') == 'GBp'
+    assert quote_currency('BTC', 'Bitcoin') == 'USD'
+    assert unknown_suffix('SWIGGY.NS', 'Swiggy') is None
+    assert unknown_suffix('BRK.B', 'Berkshire') is None
+    assert unknown_suffix('AAPL', 'Apple') is None
+    assert unknown_suffix('FOO.XX', 'Foo') == '.XX'
+
+
+def test_rates_batch_once_and_scale_minor_units():
+    fetcher = StubFx({'INRUSD=X': 0.012, 'GBPUSD=X': 1.25})
+    fx = FxRates(fetcher)
+
+    rates = fx.rates(['INR', 'GBp', 'USD'], 'usd')
+    assert rates == {'INR': 0.012, 'GBp': pytest.approx(0.0125), 'USD': 1.0}
+    assert fetcher.batches == [['GBPUSD=X', 'INRUSD=X']]
+    fx.rates(['INR'], 'USD')
+    assert len(fetcher.batches) == 1
+
+
+def test_failed_batch_leaves_currencies_unresolved():
+    def failing(symbols):
+        raise OSError('offline')
+
+    assert FxRates(failing).rates(['INR'], 'USD') == {'INR': 0.0}
+
+
+def test_unresolved_pairs_are_reported_not_silent(stub_prices):
+    store = PositionStore.from_records([
+        {'Asset': 'Swiggy', 'Ticker': 'SWIGGY.NS', 'Quantity': 10, 'Avg Buy Price': 300},
+        {'Asset': 'Apple', 'Ticker': 'AAPL', 'Quantity': 1, 'Avg Buy Price': 100},
+    ])
+    stub_prices.prices['SWIGGY.NS'] = 400.0
+    fx = FxRates(StubFx({}))
+
+    factors, missing = fx_factors(store, 'USD', fx=fx)
+    assert factors.tolist() == [0.0, 1.0]
+    assert missing == ['INR/USD']
+
+    result = calculate_valuation(store, stub_prices, base_currency='USD', fx=fx)
+    assert result['missing_fx'] == ['INR/USD']
+    assert result['asset_values'] == {'Swiggy': 0.0, 'Apple': 200.0}
+
+
+def test_unknown_suffix_warns(stub_prices):
+    store = PositionStore.from_records([{'Asset': 'Foo', 'Ticker': 'FOO.XX', 'Quantity': 1}])
+    with pytest.warns(UserWarning, match='FOO.XX'):
+        factors, missing = fx_factors(store, 'USD', fx=FxRates(StubFx({})))
+    assert factors.tolist() == [1.0] and missing == []
+
+
+def test_resolved_pairs_convert_value_and_cost(stub_prices):
+    store = PositionStore.from_records([{'Asset': 'Swiggy', 'Ticker': 'SWIGGY.NS', 'Quantity': 10, 'Avg Buy Price': 300}])
+    stub_prices.prices['SWIGGY.NS'] = 400.0
+    with warnings.catch_warnings():
+        warnings.simplefilter('error')
+        result = calculate_valuation(store, stub_prices, base_currency='USD', fx=FxRates(StubFx({'INRUSD=X': 0.01})))
+    assert result['missing_fx'] == []
+    assert np.isclose(result['asset_pnl']['Swiggy']['value'], 40.0)
+    assert np.isclose(result['asset_pnl']['Swiggy']['cost'], 30.0)
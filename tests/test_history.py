@@ -0,0 +1,133 @@
+import argparse
+import os
+from datetime import datetime
+from types import SimpleNamespace
+from zoneinfo import ZoneInfo
+
+import numpy as np
+import pytest
+
+import data.fx as fx
+import data.market_calendar as market_calendar
+import data.risk as risk
+from data.history import COLUMNS, AllocationHistory
+
+
+def result(**assets):
+    return {
+        'asset_values': assets,
+        'category_distribution': {'Equity': sum(assets.values())},
+        'bucket_distribution': {'Long-Term': sum(assets.values())},
+        'account_distribution': {'Default': sum(assets.values())},
+    }
+
+
+def test_append_read_and_has(tmp_path):
+    history = AllocationHistory(str(tmp_path))
+    assert not history.has('2026-10-16', 'nsh')
+    assert history.append('2026-10-16', 'nsh', result(Apple=100.0, VTI=50.0), currency='USD') == 5
+    history.append('2026-11-02', 'nsh', result(Apple=120.0), currency='USD')
+    history.append('2026-10-16', 'family', result(Apple=10.0))
+
+    assert history.has('2026-10-16', 'nsh')
+    assert not history.has('2026-10-15', 'nsh')
+    assert [os.path.basename(p) for p in history.partitions()] == ['2026-10', '2026-11']
+    assert [os.path.basename(p) for p in history.partitions(start='2026-11-01')] == ['2026-11']
+
+    rows = history.read(portfolio='nsh', dimension='asset')
+    assert rows['label'].tolist() == ['Apple', 'VTI', 'Apple']
+    assert rows['value'].tolist() == [100.0, 50.0, 120.0]
+    assert set(rows['currency']) == {'USD'}
+    assert set(history.read(end='2026-10-31')['portfolio']) == {'nsh', 'family'}
+
+
+def test_frame_adds_portfolios_per_date(tmp_path):
+    history = AllocationHistory(str(tmp_path))
+    history.append('2026-10-16', 'nsh', result(Apple=100.0, VTI=50.0))
+    history.append('2026-10-16', 'family', result(Apple=10.0))
+    history.append('2026-10-19', 'nsh', result(Apple=110.0))
+
+    frame = history.frame('asset')
+    assert frame.loc[np.datetime64('2026-10-16'), 'Apple'] == 110.0
+    assert frame.loc[np.datetime64('2026-10-19')].tolist() == [110.0, 0.0]
+    assert history.frame('asset', portfolio='family').shape == (1, 1)
+    assert history.frame('category', start='2026-10-17')['Equity'].tolist() == [110.0]
+
+
+def test_partial_row_is_hidden_and_trimmed(tmp_path):
+    history = AllocationHistory(str(tmp_path))
+    history.append('2026-10-16', 'nsh', result(Apple=100.0))
+    part = history.partitions()[0]
+    # An append killed after writing some columns of one extra row
+    for name in ('date', 'portfolio', 'dimension'):
+        with open(os.path.join(part, f'{name}.bin'), 'ab') as fh:
+            fh.write(b'\x01' * COLUMNS[name].itemsize)
+    assert len(history.read()['value']) == 4
+
+    history.append('2026-10-19', 'nsh', result(Apple=110.0))
+    rows = history.read(dimension='asset')
+    assert rows['value'].tolist() == [100.0, 110.0]
+    sizes = {name: os.path.getsize(os.path.join(part, f'{name}.bin')) // dtype.itemsize for name, dtype in COLUMNS.items()}
+    assert set(sizes.values()) == {8}
+
+
+@pytest.fixture
+def saturday(monkeypatch, tmp_path):
+    """Run --snapshot on Saturday 2026-10-17 against stubbed daily closes."""
+    now = datetime(2026, 10, 17, 12, 0, tzinfo=ZoneInfo('America/New_York')).timestamp()
+    monkeypatch.setattr(market_calendar, 'time', SimpleNamespace(time=lambda: now))
+    closes = {
+        'AAPL': {'2026-10-15': 190.0, '2026-10-16': 200.0},
+        'SWIGGY.NS': {'2026-10-16': 400.0},
+        'INRUSD=X': {'2026-10-15': 0.011, '2026-10-16': 0.012},
+        # Crypto trades on the weekend; the snapshot wants Friday's close
+        'BTC-USD': {'2026-10-16': 60000.0, '2026-10-17': 70000.0},
+    }
+    requests = []
+
+    def fetch(symbols, period='1y'):
+        requests.append(list(symbols))
+        return {s: closes[s] for s in symbols if s in closes}
+
+    def no_live_fx(symbols):
+        raise AssertionError(f'live FX requested for {symbols}')
+
+    monkeypatch.setattr(risk, 'fetch_price_history', fetch)
+    monkeypatch.setattr(fx.fx_rates, 'fetcher', no_live_fx)
+    monkeypatch.chdir(tmp_path)
+    csv = tmp_path / 'nsh.csv'
+    csv.write_text('Asset,Ticker,Quantity,Category\nApple,AAPL,10,Equity\nSwiggy,SWIGGY.NS,5,India\n'
+                   'Bitcoin,BTC,0.1,Crypto\n')
+    args = argparse.Namespace(csv_path=[str(csv)], snapshot=str(tmp_path / 'history'), simple=False,
+                              base_currency='USD', record=None, replay=None, refresh_prices=False)
+    return args, requests
+
+
+def test_snapshot_uses_session_closes_and_skips_recorded_sessions(saturday):
+    from main import snapshot
+
+    args, requests = saturday
+    assert snapshot(args) == 0
+    assert requests == [['AAPL', 'BTC-USD', 'INRUSD=X', 'SWIGGY.NS']]
+    history = AllocationHistory(args.snapshot)
+    frame = history.frame('asset')
+    assert frame.index.tolist() == [np.datetime64('2026-10-16')]
+    assert frame.iloc[0].to_dict() == pytest.approx({'Apple': 2000.0, 'Bitcoin': 6000.0, 'Swiggy': 24.0})
+
+    # Same session again: nothing fetched, nothing appended
+    assert snapshot(args) == 0
+    assert len(requests) == 1
+    assert len(history.read()['value']) == 8
+
+
+def test_session_closes_take_the_last_close_up_to_the_session():
+    from data.snapshot import session_closes
+
+    dates = np.array(['2026-10-15', '2026-10-16', '2026-10-17'], dtype='datetime64[D]')
+    matrix = np.array([[10.0, 1.0, np.nan],
+                       [np.nan, 2.0, np.nan],
+                       [12.0, 3.0, 5.0]])
+    history = SimpleNamespace(frame=lambda symbols, refresh: (dates, matrix))
+    # Saturday's crypto close is after the session; a gap falls back to the day before
+    assert session_closes(['AAPL', 'BTC-USD', 'NEW'], '2026-10-16', history) == {'AAPL': 10.0, 'BTC-USD': 2.0}
+    assert session_closes([], '2026-10-16', history) == {}
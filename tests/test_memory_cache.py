@@ -0,0 +1,92 @@
+import numpy as np
+import pytest
+
+import utils.memory_cache as memory_cache
+from utils.memory_cache import MemoryCache, content_hash, estimate_size
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(memory_cache.time, 'time', lambda: now[0])
+    return now
+
+
+def test_least_recently_used_entry_is_evicted_first():
+    cache = MemoryCache(max_bytes=300)
+    for key in 'abc':
+        assert cache.put(key, key, nbytes=100)
+    assert cache.get('a') == 'a'  # 'b' is now the least recently used
+    cache.put('d', 'd', nbytes=100)
+    assert cache.get('b') is None
+    assert [cache.get(k) for k in 'acd'] == ['a', 'c', 'd']
+    assert cache.bytes == 300
+    assert cache.evictions == 1
+
+
+def test_replacing_a_key_frees_its_old_size():
+    cache = MemoryCache(max_bytes=300)
+    cache.put('a', 1, nbytes=200)
+    cache.put('a', 2, nbytes=50)
+    assert cache.bytes == 50
+    assert cache.get('a') == 2
+
+
+def test_entry_bigger_than_the_budget_is_not_stored():
+    cache = MemoryCache(max_bytes=100)
+    cache.put('small', 1, nbytes=60)
+    assert cache.put('big', 2, nbytes=101) is False
+    assert cache.get('big') is None
+    assert cache.get('small') == 1
+    assert cache.evictions == 0
+
+
+def test_expired_entry_is_a_miss_and_frees_its_bytes(clock):
+    cache = MemoryCache(max_bytes=1000)
+    cache.put('live', 1, nbytes=10, ttl=60)
+    cache.put('forever', 2, nbytes=10)
+    clock[0] += 59
+    assert cache.get('live') == 1
+    clock[0] += 1
+    assert cache.get('live', 'gone') == 'gone'
+    assert cache.get('forever') == 2
+    assert cache.bytes == 10
+    assert cache.stats()['entries'] == 1
+
+
+def test_get_or_compute_computes_once_until_expiry(clock):
+    cache = MemoryCache()
+    calls = []
+
+    def compute():
+        calls.append(1)
+        return len(calls)
+
+    assert cache.get_or_compute('k', compute, ttl=5) == 1
+    assert cache.get_or_compute('k', compute, ttl=5) == 1
+    clock[0] += 5
+    assert cache.get_or_compute('k', compute, ttl=5) == 2
+    stats = cache.stats()
+    assert (stats['hits'], stats['misses']) == (1, 2)
+    assert stats['hit_rate'] == pytest.approx(1 / 3)
+
+
+def test_clear_empties_the_cache():
+    cache = MemoryCache()
+    cache.put('a', 1, nbytes=10)
+    cache.clear()
+    assert cache.stats()['entries'] == 0
+    assert cache.bytes == 0
+    assert cache.get('a') is None
+
+
+def test_content_hash_is_order_independent_for_dicts():
+    assert content_hash({'a': 1, 'b': 2}, 0.02) == content_hash({'b': 2, 'a': 1}, 0.02)
+    assert content_hash({'a': 1}, 0.02) != content_hash({'a': 1}, 0.05)
+    assert content_hash(b'ab', b'c') != content_hash(b'a', b'bc')
+
+
+def test_estimate_size_counts_array_buffers_once():
+    arr = np.zeros(10_000)
+    assert arr.nbytes <= estimate_size(arr) < 1.1 * arr.nbytes
+    assert estimate_size([arr, arr]) < 2 * arr.nbytes
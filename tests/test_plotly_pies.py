@@ -0,0 +1,38 @@
+import json
+
+import numpy as np
+import plotly.graph_objects as go
+
+from visualization.plotly_pies import cap_slices, compact_values, pie_slices, prepare_pie_data
+
+
+def test_prepare_combines_small_slices_but_keeps_cash():
+    labels, values = prepare_pie_data({'A': 90.0, 'B': 4.0, 'Cash': 1.0, 'C': 5.0}, 0.06)
+    assert labels == ['A', 'Other', 'Cash']
+    assert values == [90.0, 9.0, 1.0]
+
+
+def test_cap_slices_merges_tail_into_other():
+    labels = [f'L{i}' for i in range(10)]
+    values = [float(10 - i) for i in range(10)]
+    capped_labels, capped_values = cap_slices(labels, values, 4)
+    assert capped_labels == ['Other', 'L0', 'L1', 'L2']
+    assert sum(capped_values) == sum(values)
+    assert cap_slices(labels, values, 0) == (labels, values)
+
+
+def test_pie_slices_compact_mode_sends_typed_arrays():
+    data = {f'Asset {i}': float(i + 1) for i in range(5000)}
+    labels, values = pie_slices(data, 0, max_slices=50)
+    assert len(labels) == 50 and isinstance(values, np.ndarray)
+    trace = json.loads(go.Figure(go.Pie(labels=labels, values=values)).to_json())['data'][0]
+    # Plotly >= 6 encodes NumPy arrays as base64 typed arrays
+    assert 'bdata' in trace['values']
+
+    labels, values = pie_slices(data, 0)
+    assert len(labels) == 5000 and isinstance(values, list)
+
+
+def test_compact_values_keeps_one_decimal_precision():
+    assert compact_values([1.5, 2.25]).dtype == np.float32
+    assert compact_values([123456789.2]).dtype == np.float64
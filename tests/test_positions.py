@@ -0,0 +1,137 @@
+import io
+
+import numpy as np
+import pytest
+
+from data.analyzer import calculate_bucket_distribution, calculate_category_distribution, calculate_valuation, price_key
+from data.pipeline import bucket_breakdown, build_tables, read_input, run_pipeline
+from data.positions import PositionStore, group_sum
+
+
+def test_store_interns_labels_and_defaults():
+    store = PositionStore.from_records([
+        {'Asset': 'Apple', 'Ticker': 'AAPL', 'Quantity': 2, 'Category': 'IRA'},
+        {'Asset': 'Apple', 'Ticker': 'AAPL', 'Quantity': 3},
+        {'Asset': 'Gold', 'Quantity': 1, 'Bucket': 'Hedge'},
+    ])
+
+    assert len(store) == 3
+    assert store.asset.labels == ('Apple', 'Gold')
+    assert store.ticker.values() == ['AAPL', 'AAPL', 'Gold']
+    assert store.category.values() == ['IRA', 'Uncategorized', 'Uncategorized']
+    assert store.bucket.values() == ['Unbucketed', 'Unbucketed', 'Hedge']
+    assert store.account.values() == ['Default'] * 3
+    assert store.has_bucket
+
+
+def test_store_merges_every_spelling_of_missing():
+    import pandas as pd
+
+    df = pd.DataFrame({
+        'Asset': ['Apple', 'Gold', 'Apple', 'Oil'],
+        'Ticker': ['AAPL', None, 'AAPL', 'nan'],
+        'Category': ['', 'Metals', float('nan'), 'None'],
+        'Bucket': [float('nan'), 'NaN', None, ''],
+    })
+    store = PositionStore.from_frame(df, account='IRA')
+    assert store.ticker.values() == ['AAPL', 'Gold', 'AAPL', 'Oil']
+    assert store.category.labels == ('Uncategorized', 'Metals')
+    assert store.category.codes.tolist() == [0, 1, 0, 0]
+    assert store.bucket.labels == ('Unbucketed',)
+    assert not store.has_bucket
+    assert store.account.values() == ['IRA'] * 4
+
+
+def test_group_sum_and_concat():
+    a = PositionStore.from_records([{'Asset': 'X', 'Quantity': 1}, {'Asset': 'Y', 'Quantity': 2}], account='A')
+    b = PositionStore.from_records([{'Asset': 'Y', 'Quantity': 4}], account='B')
+    store = PositionStore.concat([a, b])
+
+    assert group_sum(store.asset, store.quantity) == {'X': 1.0, 'Y': 6.0}
+    assert group_sum(store.account, store.quantity) == {'A': 3.0, 'B': 4.0}
+
+
+def test_price_key_normalizes_tickers():
+    assert price_key('$aapl ', 'Apple') == price_key('AAPL', 'Apple Inc') == ('AAPL', '')
+    assert price_key('anything', 'cash') == ('', 'CASH')
+    assert price_key('Other', 'x') == ('', 'OTHER')
+
+
+def test_valuation_pnl(detailed_csv, stub_prices):
+    store = read_input(io.StringIO(detailed_csv))
+    result = calculate_valuation(store, stub_prices)
+
+    assert result['category_pnl']['Crypto'] == {'value': 30000.0, 'cost': 15000.0, 'pnl': 15000.0, 'pnl_pct': 100.0,
+                                                'no_basis': 0.0}
+    assert result['bucket_pnl']['Cash']['pnl'] == 0.0
+    assert np.isclose(sum(v['pnl'] for v in result['asset_pnl'].values()), 3000 - 2000 + 1000 - 800 + 15000)
+
+
+def test_pnl_skips_positions_without_a_price(stub_prices):
+    store = read_input(io.StringIO('Asset,Ticker,Quantity,Category,Avg Buy Price\n'
+                                   'Apple,AAPL,10,Eq,150\nMicrosoft,MSFT,1,Eq,300\n'))
+    result = calculate_valuation(store, stub_prices)
+    # A failed lookup is not a -100% loss
+    assert result['asset_pnl']['Microsoft']['pnl'] is None
+    assert result['asset_pnl']['Microsoft']['pnl_pct'] is None
+    assert result['category_pnl']['Eq'] == {'value': 2000.0, 'cost': 1500.0, 'pnl': 500.0, 'pnl_pct': pytest.approx(33.33, abs=0.01),
+                                            'no_basis': 0.0}
+    table = build_tables(result)['category']
+    assert table['P&L'].tolist() == [500.0, 500.0]
+
+
+def test_pnl_skips_positions_without_a_cost_basis(stub_prices):
+    store = read_input(io.StringIO('Asset,Ticker,Quantity,Category,Avg Buy Price\n'
+                                   'Apple,AAPL,10,Eq,\nMicrosoft,MSFT,1,Eq,300\nVTI,VTI,4,Fund,200\n'))
+    result = calculate_valuation(store, stub_prices)
+    # Neither Eq position has both a price and a cost basis
+    assert result['category_pnl']['Eq'] == {'value': 2000.0, 'cost': 0.0, 'pnl': None, 'pnl_pct': None, 'no_basis': 2000.0}
+    assert result['asset_pnl']['Apple']['pnl'] is None
+    table = build_tables(result)['category'].set_index('Category')
+    assert np.isnan(table.loc['Eq', 'P&L'])
+    assert table.loc['Total', 'P&L'] == 200.0
+    assert table.loc['Total', 'Cost'] == 800.0
+
+
+def test_pipeline_tables_and_bucket_breakdown(detailed_csv, stub_prices):
+    portfolio = run_pipeline(io.StringIO(detailed_csv), price_fetcher=stub_prices)
+
+    table = portfolio.tables['category']
+    assert table['Category'].tolist()[-1] == 'Total'
+    assert table['Value'].iloc[-1] == sum(portfolio.result['category_distribution'].values())
+    assert {'Cost', 'P&L', 'P&L %'} <= set(table.columns)
+    assert bucket_breakdown(portfolio, 'Trade') == {'Apple': 1000.0, 'Bitcoin': 30000.0}
+    assert bucket_breakdown(portfolio, 'Missing') == {}
+
+
+def test_distribution_helpers_match_the_valuation(detailed_csv, stub_prices):
+    store = read_input(io.StringIO(detailed_csv))
+    result = calculate_valuation(store, stub_prices)
+    assert calculate_category_distribution(store, stub_prices) == result['category_distribution']
+    rows = store.to_records()
+    assert calculate_bucket_distribution(rows, stub_prices) == result['bucket_distribution']
+
+
+def test_cached_pipeline_prices_once_per_ttl(detailed_csv, stub_prices, monkeypatch):
+    import utils.memory_cache as memory_cache
+    from data.pipeline import cached_pipeline
+
+    now = [1000.0]
+    monkeypatch.setattr(memory_cache.time, 'time', lambda: now[0])
+    cache = memory_cache.MemoryCache()
+    raw = detailed_csv.encode('utf-8')
+    first = cached_pipeline(raw, base_currency='USD', cache=cache, price_fetcher=stub_prices, ttl=60)
+    calls = len(stub_prices.calls)
+    assert cached_pipeline(raw, base_currency='USD', cache=cache, price_fetcher=stub_prices, ttl=60) is first
+    assert len(stub_prices.calls) == calls
+    assert first.key and first.result['asset_values']['Apple'] == 3000.0
+
+    # Expired: priced again, but the parsed holdings are reused
+    now[0] += 60
+    again = cached_pipeline(raw, base_currency='USD', cache=cache, price_fetcher=stub_prices, ttl=60)
+    assert again is not first and again.store is first.store
+    assert len(stub_prices.calls) == 2 * calls
+    # Simple mode is keyed separately and never expires
+    simple = cached_pipeline(raw, simple=True, cache=cache, price_fetcher=stub_prices)
+    assert simple.key != first.key
+    assert simple.result['asset_values']['Apple'] == 2000.0
@@ -0,0 +1,86 @@
+import json
+
+import pytest
+
+import data.analyzer as analyzer
+import data.fx as fx
+from data.analyzer import get_current_price
+from data.risk import PriceHistory, calculate_risk
+from data.positions import PositionStore
+from data.price_replay import PriceRecorder, PriceReplayer, SourceTimer, _SourcePatch
+from utils.profiling import Profiler
+
+
+@pytest.fixture
+def fake_sources(monkeypatch):
+    """Replace the network sources with deterministic fakes."""
+    monkeypatch.setattr(analyzer, 'fetch_coingecko_price', lambda cg_id: {'bitcoin': 60000.0}[cg_id])
+    monkeypatch.setattr(analyzer, 'fetch_yfinance_close', lambda t: {'AAPL': 200.0}.get(t))
+
+    def yahoo(t):
+        raise OSError('offline')
+
+    monkeypatch.setattr(analyzer, 'fetch_yahoo_quote', yahoo)
+    monkeypatch.setattr(fx.fx_rates, 'fetcher', lambda symbols: {s: 0.012 for s in symbols})
+
+
+def test_source_patch_is_abstract():
+    with pytest.raises(TypeError):
+        _SourcePatch()
+
+
+def test_record_then_replay_without_network(tmp_path, fake_sources, monkeypatch):
+    path = str(tmp_path / 'prices.json')
+    with PriceRecorder(path):
+        assert get_current_price('AAPL', 'Apple') == 200.0
+        assert get_current_price('BTC', 'Bitcoin') == 60000.0
+        assert get_current_price('NOPE', 'Nope') == 0.0
+        fx.fx_rates.fetcher(['INRUSD=X'])
+
+    calls = json.load(open(path))['calls']
+    assert [c['source'] for c in calls] == ['yfinance', 'coingecko', 'yfinance', 'yahoo_http', 'fx']
+    assert calls[3]['error'] == 'OSError: offline'
+
+    # Every source now fails loudly; the replay must not reach them
+    def boom(*args):
+        raise AssertionError('network used during replay')
+
+    for name in ('fetch_coingecko_price', 'fetch_yfinance_close', 'fetch_yahoo_quote'):
+        monkeypatch.setattr(analyzer, name, boom)
+    with PriceReplayer(path) as replayer:
+        assert get_current_price('AAPL', 'Apple') == 200.0
+        assert get_current_price('BTC', 'Bitcoin') == 60000.0
+        assert get_current_price('NOPE', 'Nope') == 0.0
+        # Not in the fixture: a LookupError the price chain treats as a failed source
+        assert get_current_price('MSFT', 'Microsoft') == 0.0
+    assert ('yfinance', ['MSFT']) in replayer.misses
+    # Patches are removed on exit
+    assert analyzer.fetch_yfinance_close is boom
+
+
+def test_replayer_rejects_bad_fixtures(tmp_path):
+    path = tmp_path / 'old.json'
+    path.write_text(json.dumps({'version': 0, 'calls': []}))
+    with pytest.raises(ValueError, match='version'):
+        PriceReplayer(str(path))
+    path.write_text(json.dumps({'version': 1, 'calls': []}))
+    with pytest.raises(ValueError, match='latency'):
+        PriceReplayer(str(path), latency='slow')
+
+
+def test_source_timer_reports_each_call(fake_sources):
+    profiler = Profiler()
+    with SourceTimer(profiler):
+        get_current_price('AAPL', 'Apple')
+    assert 'yfinance' in profiler.report()
+
+
+def test_replay_without_history_treats_it_as_missing(tmp_path):
+    path = tmp_path / 'prices.json'
+    path.write_text(json.dumps({'version': 1, 'calls': []}))
+    store = PositionStore.from_records([{'Asset': 'Apple', 'Ticker': 'AAPL', 'Quantity': 1}])
+    with PriceReplayer(str(path)) as replayer:
+        risk = calculate_risk(store, store.quantity.copy(), PriceHistory())
+    assert ('history', [['AAPL'], '1y']) in replayer.misses
+    assert risk['missing'] == ['AAPL']
+    assert risk['volatility'] == 0.0
@@ -0,0 +1,80 @@
+import numpy as np
+import pytest
+
+from data.positions import PositionStore
+from data.rebalance import WhatIf, load_targets, rebalance_trades
+
+
+@pytest.fixture
+def book():
+    store = PositionStore.from_records([
+        {'Asset': 'Apple', 'Ticker': 'AAPL', 'Quantity': 1, 'Category': 'Equity', 'Bucket': 'Long-Term'},
+        {'Asset': 'Vanguard', 'Ticker': 'VTI', 'Quantity': 1, 'Category': 'Equity', 'Bucket': 'Long-Term'},
+        {'Asset': 'Bitcoin', 'Ticker': 'BTC', 'Quantity': 1, 'Category': 'Crypto', 'Bucket': 'Trade'},
+    ])
+    return store, np.array([600.0, 200.0, 200.0])
+
+
+def test_targets_must_add_up_to_100():
+    with pytest.raises(ValueError, match='add up to 100'):
+        rebalance_trades({'A': 50.0, 'B': 50.0}, {'A': 60.0, 'B': 30.0})
+    # Unrounded current weights (as the app seeds them) pass the check
+    weights = {'A': 100 / 3, 'B': 200 / 3}
+    trades = rebalance_trades({'A': 1.0, 'B': 2.0}, weights)
+    assert trades['A']['trade'] == pytest.approx(0.0)
+
+
+def test_trades_reach_targets_after_cash_flow():
+    trades = rebalance_trades({'A': 800.0, 'B': 200.0}, {'A': 50.0, 'B': 50.0}, cash_flow=1000.0)
+    assert trades['A']['current_pct'] == pytest.approx(80.0)
+    assert trades['A']['target_value'] == pytest.approx(1000.0)
+    assert trades['A']['trade'] == pytest.approx(200.0)
+    assert trades['B']['trade'] == pytest.approx(800.0)
+
+
+def test_untargeted_groups_are_sold_and_new_ones_bought():
+    trades = rebalance_trades({'A': 600.0, 'B': 400.0}, {'A': 80.0, 'C': 20.0})
+    assert trades['B']['target_pct'] == 0.0
+    assert trades['B']['trade'] == pytest.approx(-400.0)
+    assert trades['C']['value'] == 0.0
+    assert trades['C']['trade'] == pytest.approx(200.0)
+
+
+def test_whatif_trade_updates_every_distribution(book):
+    store, value = book
+    whatif = WhatIf(store, value, dimension='bucket', targets={'Long-Term': 50.0, 'Trade': 50.0})
+    assert whatif.trades()['Trade']['trade'] == pytest.approx(300.0)
+
+    whatif.trade('Bitcoin', 300.0)
+    after = whatif.distributions()
+    assert after['asset_values']['Bitcoin'] == pytest.approx(500.0)
+    assert after['category_distribution']['Crypto'] == pytest.approx(500.0)
+    assert after['bucket_distribution'] == pytest.approx({'Long-Term': 800.0, 'Trade': 500.0})
+    assert whatif.trades()['Trade']['trade'] == pytest.approx(150.0)
+    # The baseline is untouched, and reset drops the trades
+    assert whatif.baseline('asset')['Bitcoin'] == pytest.approx(200.0)
+    whatif.reset()
+    assert whatif.distributions()['asset_values']['Bitcoin'] == pytest.approx(200.0)
+    assert whatif.applied == []
+
+
+def test_whatif_new_asset_needs_a_group(book):
+    store, value = book
+    whatif = WhatIf(store, value)
+    with pytest.raises(ValueError, match='needs a category or bucket'):
+        whatif.trade('Gold', 100.0)
+    whatif.trade('Gold', 100.0, category='Commodities', bucket='Long-Term')
+    after = whatif.distributions()
+    assert after['category_distribution']['Commodities'] == pytest.approx(100.0)
+    assert after['bucket_distribution']['Long-Term'] == pytest.approx(900.0)
+    with pytest.raises(ValueError, match='dimension'):
+        WhatIf(store, value, dimension='asset')
+
+
+def test_load_targets(tmp_path):
+    path = tmp_path / 'targets.csv'
+    path.write_text('Category, Target\nEquity,70%\nCrypto,30\n')
+    assert load_targets(str(path)) == ('category', {'Equity': 70.0, 'Crypto': 30.0})
+    path.write_text('Label,Target\nEquity,100\n')
+    with pytest.raises(ValueError, match='Bucket, Category or Account'):
+        load_targets(str(path))
@@ -0,0 +1,89 @@
+import numpy as np
+import pytest
+
+import data.risk as risk
+from data.positions import PositionStore
+from data.risk import PriceHistory, calculate_risk, daily_returns, history_symbol
+
+DAYS = np.arange(np.datetime64('2025-10-01'), np.datetime64('2026-10-01'))
+WEEKDAYS = DAYS[np.is_busday(DAYS)]
+
+
+def series(dates, returns):
+    closes = 100.0 * np.cumprod(1.0 + returns)
+    return {str(d): float(c) for d, c in zip(dates, closes)}
+
+
+@pytest.fixture
+def history(monkeypatch):
+    rng = np.random.default_rng(7)
+    data = {
+        'AAPL': series(WEEKDAYS, rng.normal(0, 0.02, len(WEEKDAYS))),
+        'BTC-USD': series(DAYS, rng.normal(0, 0.03, len(DAYS))),
+        # Flat in rupees, while the rupee moves against the dollar
+        'SWIGGY.NS': series(WEEKDAYS, np.zeros(len(WEEKDAYS))),
+        'INRUSD=X': {d: 0.012 * v / 100.0 for d, v in series(WEEKDAYS, rng.normal(0, 0.005, len(WEEKDAYS))).items()},
+    }
+    requests = []
+
+    def fetch(symbols, period='1y'):
+        requests.append(list(symbols))
+        return {s: data[s] for s in symbols if s in data}
+
+    monkeypatch.setattr(risk, 'fetch_price_history', fetch)
+    h = PriceHistory()
+    h.requests = requests
+    return h
+
+
+def book(*rows):
+    store = PositionStore.from_records([{'Asset': t, 'Ticker': t, 'Quantity': q} for t, q in rows])
+    return store, store.quantity.copy()
+
+
+def test_history_symbols():
+    assert history_symbol('BTC', 'Bitcoin') == 'BTC-USD'
+    assert history_symbol('$aapl', 'Apple') == 'AAPL'
+    assert history_symbol('CASH', 'CASH') is None
+
+
+def test_daily_returns_drop_dates_nobody_traded_and_count_periods():
+    closes = np.array([[100.0], [np.nan], [110.0], [121.0]])
+    dates = np.array(['2026-01-02', '2026-01-03', '2026-01-05', '2026-01-06'], dtype='datetime64[D]')
+    returns, per_year = daily_returns(closes, dates)
+    assert returns[:, 0] == pytest.approx([0.1, 0.1])
+    assert per_year == pytest.approx(2 * 365.25 / 4)
+
+
+def test_equity_volatility_unchanged_by_holding_crypto(history):
+    store, value = book(('AAPL', 1.0))
+    alone = calculate_risk(store, value, history)
+    # Every weekday of the year (the stub has no holidays)
+    assert alone['periods_per_year'] == pytest.approx(261, rel=0.01)
+
+    # A sliver of crypto puts weekend dates on the axis. AAPL's annualized variance
+    # must not shrink by 252/365 because of it.
+    store, value = book(('AAPL', 1.0), ('BTC', 1e-9))
+    mixed = calculate_risk(store, value, history)
+    assert mixed['periods_per_year'] == pytest.approx(365, rel=0.01)
+    assert mixed['volatility'] == pytest.approx(alone['volatility'], rel=0.02)
+    assert alone['volatility'] == pytest.approx(0.02 * 261 ** 0.5, rel=0.15)
+
+
+def test_base_currency_counts_fx_moves(history):
+    store, value = book(('SWIGGY.NS', 1.0))
+    converted = calculate_risk(store, value, history, base_currency='USD')
+    assert converted['volatility'] == pytest.approx(0.005 * 261 ** 0.5, rel=0.2)
+    assert converted['missing'] == []
+    # Instrument and FX pair came in one batched request
+    assert history.requests == [['INRUSD=X', 'SWIGGY.NS']]
+
+    assert calculate_risk(store, value, history)['volatility'] == 0.0
+
+
+def test_missing_history_and_concentration(history):
+    store, value = book(('AAPL', 3.0), ('NOPE', 1.0))
+    result = calculate_risk(store, value, history)
+    assert result['missing'] == ['NOPE']
+    assert result['hhi'] == pytest.approx(0.75 ** 2 + 0.25 ** 2)
+    assert sum(r['risk_share'] for r in result['category_risk'].values()) == pytest.approx(1.0)
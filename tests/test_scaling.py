@@ -0,0 +1,11 @@
+import pytest
+
+from scaling import run_scaling
+
+
+@pytest.mark.slow
+@pytest.mark.parametrize('rows', [1_000, 10_000])
+def test_cli_stays_within_bounds(rows, tmp_path):
+    results = run_scaling([rows], folder=str(tmp_path))
+    assert [r['mode'] for r in results] == ['no-show', 'render']
+    assert [r['failures'] for r in results] == [[], []]
@@ -0,0 +1,127 @@
+import json
+import threading
+import urllib.error
+import urllib.request
+
+import pytest
+
+from data.fx import FxRates
+from server import create_server, valuate_payload
+from utils.memory_cache import MemoryCache
+
+
+def test_valuate_csv_prices_each_ticker_once(detailed_csv, stub_prices):
+    result = valuate_payload(detailed_csv.encode('utf-8'), 'text/csv', {}, stub_prices)
+
+    assert result['asset_values'] == {'Apple': 3000.0, 'VTI': 1000.0, 'Bitcoin': 30000.0, 'CASH': 1000.0}
+    assert result['category_distribution']['Taxable equity'] == 2000.0
+    assert result['category_distribution']['IRA'] == 1000.0
+    assert result['bucket_distribution'] == {'Long-Term': 3000.0, 'Trade': 31000.0, 'Cash': 1000.0}
+    # $aapl and AAPL are one instrument
+    assert sorted(stub_prices.calls) == ['AAPL', 'BTC', 'CASH', 'VTI']
+    assert result['asset_pnl']['Apple'] == {'value': 3000.0, 'cost': 2000.0, 'pnl': 1000.0, 'pnl_pct': 50.0, 'no_basis': 0.0}
+    assert result['base_currency'] == 'USD'
+
+
+def test_valuate_json_object_options_and_simple_mode(stub_prices):
+    body = json.dumps({'simple': True, 'holdings': [
+        {'Asset': 'House', 'Category': 'Real estate', 'Amount': 500},
+        {'Asset': 'Fund', 'Category': 'Equity', 'Amount': 250},
+        {'Asset': 'Fund', 'Category': 'Equity', 'Amount': 250},
+    ]}).encode('utf-8')
+
+    result = valuate_payload(body, 'application/json', {}, stub_prices)
+
+    assert result['asset_values'] == {'House': 500.0, 'Fund': 500.0}
+    assert result['category_distribution'] == {'Real estate': 500.0, 'Equity': 500.0}
+    assert 'asset_pnl' not in result
+    assert stub_prices.calls == []
+
+
+def test_valuate_rejects_bad_payloads(stub_prices):
+    with pytest.raises(ValueError):
+        valuate_payload(b'{"holdings": 3}', 'application/json', {}, stub_prices)
+    with pytest.raises(ValueError, match='more than 2 rows'):
+        valuate_payload(b'Asset,Category,Amount\na,x,1\nb,x,1\nc,x,1\n', 'text/csv', {'simple': '1'}, stub_prices, max_rows=2)
+    with pytest.raises(ValueError, match='Unsupported chart format'):
+        valuate_payload(b'Asset,Category,Amount\na,x,1\n', 'text/csv', {'simple': '1', 'chart': 'gif'}, stub_prices)
+
+
+def test_valuate_reuses_cached_valuation_and_chart(detailed_csv, stub_prices):
+    cache = MemoryCache()
+    body = detailed_csv.encode('utf-8')
+
+    first = valuate_payload(body, 'text/csv', {'chart': 'svg'}, stub_prices, cache=cache)
+    calls = len(stub_prices.calls)
+    second = valuate_payload(body, 'text/csv', {'chart': 'svg'}, stub_prices, cache=cache)
+
+    assert len(stub_prices.calls) == calls
+    assert second == first
+    assert first['chart']['content_type'] == 'image/svg+xml'
+    # The chart is added to a copy, never to the cached valuation
+    assert 'chart' not in valuate_payload(body, 'text/csv', {}, stub_prices, cache=cache)
+
+
+@pytest.fixture
+def server(stub_prices):
+    srv = create_server(port=0, price_fetcher=stub_prices, quiet=True, max_body_bytes=4096)
+    thread = threading.Thread(target=srv.serve_forever, daemon=True)
+    thread.start()
+    yield srv
+    srv.shutdown()
+    srv.server_close()
+
+
+def _request(server, path, body=None, content_type='text/csv'):
+    host, port = server.server_address[:2]
+    req = urllib.request.Request(f'http://{host}:{port}{path}', data=body, headers={'Content-Type': content_type})
+    try:
+        with urllib.request.urlopen(req, timeout=10) as resp:
+            return resp.status, json.loads(resp.read())
+    except urllib.error.HTTPError as exc:
+        return exc.code, json.loads(exc.read())
+
+
+def test_server_round_trip(server, detailed_csv, stub_prices):
+    status, result = _request(server, '/valuate', detailed_csv.encode('utf-8'))
+    assert status == 200
+    assert result['asset_values']['Apple'] == 3000.0
+
+    # Warm process-wide price cache: the second request looks up nothing
+    calls = len(stub_prices.calls)
+    status, again = _request(server, '/valuate?base_currency=usd', detailed_csv.encode('utf-8'))
+    assert status == 200 and again['asset_values'] == result['asset_values']
+    assert len(stub_prices.calls) == calls
+
+    status, health = _request(server, '/health')
+    assert status == 200 and health['status'] == 'ok'
+    assert health['memory_cache']['entries'] > 0
+
+
+def test_server_errors(server):
+    assert _request(server, '/nope')[0] == 404
+    status, body = _request(server, '/valuate', b'{"holdings": 3}', 'application/json')
+    assert status == 400 and 'holdings' in body['error']
+    status, body = _request(server, '/valuate', b'x' * 5000)
+    assert status == 413 and '4,096-byte limit' in body['error']
+
+
+def test_server_converts_with_its_own_fx_rates(detailed_csv, stub_prices):
+    requested = []
+
+    def fetcher(symbols):
+        requested.append(sorted(symbols))
+        return {s: 0.5 for s in symbols}
+
+    srv = create_server(port=0, price_fetcher=stub_prices, quiet=True, fx=FxRates(fetcher))
+    thread = threading.Thread(target=srv.serve_forever, daemon=True)
+    thread.start()
+    try:
+        status, result = _request(srv, '/valuate?base_currency=eur', detailed_csv.encode('utf-8'))
+    finally:
+        srv.shutdown()
+        srv.server_close()
+    assert status == 200
+    assert result['base_currency'] == 'EUR'
+    assert result['asset_values']['Apple'] == 1500.0
+    assert requested == [['USDEUR=X']]
@@ -0,0 +1,86 @@
+import argparse
+import json
+import os
+
+import pytest
+
+import main
+from data.fx import FxRates
+from utils.watcher import FolderWatcher
+
+HEADER = 'Asset,Ticker,Quantity,Category\n'
+
+
+def write(path, text, mtime):
+    path.write_text(text)
+    os.utime(path, ns=(mtime, mtime))
+
+
+def test_only_content_changes_are_reported(tmp_path):
+    a, b = tmp_path / 'a.csv', tmp_path / 'b.csv'
+    write(a, HEADER + 'Apple,AAPL,1,Eq\n', 1_000)
+    write(b, HEADER + 'VTI,VTI,1,Fund\n', 1_000)
+    (tmp_path / 'notes.txt').write_text('ignored')
+    watcher = FolderWatcher(str(tmp_path))
+    assert watcher.poll() == ([str(a), str(b)], [])
+    assert watcher.poll() == ([], [])
+
+    # A touch and an identical re-export change the stat but not the content
+    os.utime(a, ns=(2_000, 2_000))
+    write(b, HEADER + 'VTI,VTI,1,Fund\n', 2_000)
+    assert watcher.poll() == ([], [])
+
+    write(a, HEADER + 'Apple,AAPL,2,Eq\n', 3_000)
+    assert watcher.poll() == ([str(a)], [])
+
+    b.unlink()
+    assert watcher.poll() == ([], [str(b)])
+
+
+class Prices:
+    """Stub price cache: fixed prices, a save() like PriceCache, and a lookup count."""
+
+    def __init__(self):
+        self.calls = 0
+
+    def __call__(self, ticker, asset):
+        self.calls += 1
+        return {'AAPL': 200.0, 'VTI': 250.0}.get(ticker, 0.0)
+
+    def save(self):
+        pass
+
+
+class Stop(Exception):
+    pass
+
+
+def test_watch_loop_revalues_on_change_and_removal(tmp_path, monkeypatch):
+    folder = tmp_path / 'exports'
+    folder.mkdir()
+    a, b = folder / 'fidelity.csv', folder / 'schwab.csv'
+    write(a, HEADER + 'Apple,AAPL,1,Eq\n', 1_000)
+    write(b, HEADER + 'VTI,VTI,2,Fund\n', 1_000)
+    out = tmp_path / 'out.json'
+    snapshots = []
+    # Between polls: nothing, then a content change, then a removal, then stop
+    steps = [lambda: None, lambda: write(a, HEADER + 'Apple,AAPL,3,Eq\n', 2_000), b.unlink]
+
+    def sleep(seconds):
+        snapshots.append(json.loads(out.read_text()) if out.exists() else None)
+        out.unlink(missing_ok=True)
+        if not steps:
+            raise Stop
+        steps.pop(0)()
+
+    monkeypatch.setattr(main.time, 'sleep', sleep)
+    args = argparse.Namespace(simple=False, json_out=str(out), no_show=True, interval=0)
+    with pytest.raises(Stop):
+        main._watch_loop(args, FolderWatcher(str(folder)), {}, Prices(), FxRates(lambda symbols: {}), None)
+
+    first, unchanged, changed, removed = snapshots
+    assert first['account_distribution'] == {'fidelity': 200.0, 'schwab': 500.0}
+    # No change, no rewrite
+    assert unchanged is None
+    assert changed['asset_values'] == {'Apple': 600.0, 'VTI': 500.0}
+    assert removed['account_distribution'] == {'fidelity': 600.0}